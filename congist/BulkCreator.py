@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+
+"""
+BulkCreator maps a directory tree or a manifest file to many gists.
+"""
+
+import os
+import threading
+import time
+from collections import namedtuple
+from os.path import abspath, basename, dirname, isdir, join, relpath, splitext
+
+import yaml
+
+from congist.utils import File
+from congist.Gist import Gist
+
+
+"""BulkItem represents a gist to create, files map names to paths."""
+
+BulkItem = namedtuple('BulkItem', ['key', 'description', 'public', 'files'])
+
+
+class BulkCreator:
+    FRONT_MATTER = '---'
+    DESC = 'description'
+    TITLE = 'title'
+    SUBTITLE = 'subtitle'
+    TAGS = 'tags'
+    PUBLIC = 'public'
+    FILES = 'files'
+    MANIFEST_EXTS = ('.yml', '.yaml', '.json')
+
+    def __init__(self, interval=0):
+        self._interval = interval
+        self._next_time = 0
+        self._lock = threading.Lock()
+
+    def plan(self, paths, public=False, tags=()):
+        """Yield a BulkItem for each gist to create."""
+        for path in paths:
+            path = abspath(os.path.expanduser(path))
+            if isdir(path):
+                yield from self._plan_tree(path, public, tags)
+            elif splitext(path)[1] in self.MANIFEST_EXTS:
+                yield from self._plan_manifest(path, public, tags)
+            else:
+                yield self._plan_file(path, dirname(path), public, tags)
+
+    def _plan_tree(self, root, public, tags):
+        for parent, dirs, names in os.walk(root):
+            dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+            for name in sorted(names):
+                if not name.startswith('.'):
+                    yield self._plan_file(join(parent, name), root, public,
+                                          tags)
+
+    def _plan_file(self, path, root, public, tags):
+        """One gist per file, tagged by its directories under root."""
+        meta = self.read_front_matter(path)[0]
+        dir_tags = relpath(dirname(path), root).split(os.sep)
+        item_tags = [t for t in dir_tags if t != os.curdir]
+        return BulkItem(path, self._describe(
+            meta, splitext(basename(path))[0], item_tags + list(tags)),
+            meta.get(self.PUBLIC, public), {basename(path): path})
+
+    def _plan_manifest(self, path, public, tags):
+        with open(path, 'r') as f:
+            entries = yaml.load(f, yaml.SafeLoader) or []
+        base = dirname(path)
+        for i, entry in enumerate(entries):
+            if not isinstance(entry, dict) or not entry.get(self.FILES):
+                raise ValueError("{} entry #{} has no {}".format(
+                    path, i, self.FILES))
+            files = [join(base, os.path.expanduser(p))
+                     for p in entry[self.FILES]]
+            yield BulkItem("{}#{}".format(path, i), self._describe(
+                entry, splitext(basename(files[0]))[0], list(tags)),
+                entry.get(self.PUBLIC, public),
+                {basename(p): p for p in files})
+
+    def _describe(self, meta, title, tags):
+        if meta.get(self.DESC):
+            return meta[self.DESC]
+        meta_tags = meta.get(self.TAGS) or []
+        if isinstance(meta_tags, str):  # e.g. "tags: python, web"
+            meta_tags = [t.strip() for t in meta_tags.split(',')
+                         if t.strip()]
+        return Gist.make_description(
+            meta.get(self.TITLE, title), meta.get(self.SUBTITLE, ""),
+            [str(t) for t in meta_tags] + tags)
+
+    @classmethod
+    def read_front_matter(cls, path):
+        """Return (front matter, body) of a text file, None body if binary."""
+        content = File.read_text(path)
+        if content is None:
+            return {}, None
+        lines = content.split('\n')
+        if lines[0].strip() != cls.FRONT_MATTER:
+            return {}, content
+        for i in range(1, len(lines)):
+            if lines[i].strip() == cls.FRONT_MATTER:
+                try:
+                    meta = yaml.load('\n'.join(lines[1:i]), yaml.SafeLoader)
+                except yaml.YAMLError:
+                    break
+                if isinstance(meta, dict):
+                    return meta, '\n'.join(lines[i + 1:])
+                break
+        return {}, content
+
+    def read_files(self, item):
+        """Return files data of the item for API, None if any is binary."""
+        files = {}
+        for name, path in item.files.items():
+            body = self.read_front_matter(path)[1]
+            if not body:  # binary, or empty which API rejects
+                return None
+            files[name] = {File.FILE_KEY: body}
+        return files
+
+    def wait(self):
+        """Space out creation requests by the configured interval."""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_time)
+            self._next_time = start + self._interval
+        if start > now:
+            time.sleep(start - now)
@@ -4,22 +4,98 @@
 Congist is the core worker.
 """
 
+import heapq
 import json
 import os
+import re
+import shutil
+import tempfile
+import time
 
-from os.path import expanduser, isdir, join
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from itertools import chain, islice, repeat
+from os.path import basename, dirname, expanduser, isdir, isfile, join
 
-from congist.utils import String, File, Time, Type
+from congist.utils import String, File, Git, Journal, Time, Type
 from congist.Gist import GistUser, Gist
+from congist.BulkCreator import BulkCreator
+from congist.local.LocalSearch import LocalSearch
+from congist.Matcher import Matcher
+from congist.local.TagIndex import TagIndex
+from congist.local.BlobStore import BlobStore
+from congist.local.Manifest import Manifest
+from congist.local.Snapshot import Snapshot
+from congist.local.History import History
+from congist.local.RevisionGist import RevisionGist
+from congist.Metrics import Metrics
+from congist.Mirror import Poller
+from congist import completion
 
 
 class Congist:
     LOCAL_BASE = 'local_base'
     METADATA_BASE = 'metadata_base'
     INDEX_FILE = 'index_file'
+    TAG_INDEX_FILE = 'tag_index_file'
+    BLOB_STORE = 'blob_store'
+    HASH_FILE = 'hash_file'
+    SHARED_REPO = 'shared_repo'
+    DEDUP_ON_SYNC = 'dedup_on_sync'
+    GIT_DIR = '.git'
+    MANIFEST_FILE = 'manifest_file'
+    SYNC_JOURNAL_FILE = 'sync_journal_file'
+    COMPLETION_CACHE = 'completion_cache'
+    METRICS = 'metrics'
+    TEXTFILE = 'textfile'
+    PORT = 'port'
+    ADDRESS = 'address'
+    METRICS_FILE = 'metrics_file'
+    GIT_COMMAND_PATTERN = re.compile(r'\bgit (\w[\w-]*)')
+    RESUME = 'resume'
+    MIRROR = 'mirror'
+    MIN_INTERVAL = 'min_interval'
+    MAX_INTERVAL = 'max_interval'
+    FULL_INTERVAL = 'full_interval'
+    RESERVE = 'reserve'
+    ONCE = 'once'
+    HISTORY = 'history'
+    SORT = 'sort'
+    LIMIT = 'limit'
+    REVISION = 'revision'
+    REVISION_HISTORY = 'revision_history'
+    SNAPSHOT = 'snapshot'
+    NO_PULL = 'no_pull'
+    FORCE = 'force'
+    CLONED = 'cloned'
+    PULLED = 'pulled'
+    COMMITTED = 'committed'
+    PUSHED = 'pushed'
+    API = 'api'
+    API_UPLOAD = 'api_upload'
+    BULK_CREATE = 'bulk_create'
+    JOURNAL_FILE = 'journal_file'
+    WORKERS = 'workers'
+    INTERVAL = 'interval'
+    FLUSH_SIZE = 'flush_size'
+    MAX_SIZE = 'max_size'
+    MIN_SIZE = 'min_size'
+    HEAD = 'head'
+    TAIL = 'tail'
+    BYTES = 'bytes'
+    CONTENT_FETCH = 'content_fetch'
+    BUDGET = 'budget'
+    CLONE = 'clone'
+    DEPTH = 'depth'
+    FILTER = 'filter'
+    SIZE_CUTOFF = 'size_cutoff'
+    DEEPEN = 'deepen'
     DISABLE_FILTER = '_disable_filter'
     AGENTS = 'agents'
     LOCAL = 'local'
+    HYBRID = 'hybrid'
+    # for configs written before hybrid agents were added
+    HYBRID_AGENT = 'congist.local.HybridAgent.HybridAgent'
     REPOS = 'repos'
     HOST = 'host'
     USERS = 'users'
@@ -28,6 +104,9 @@ class Congist:
     FILE_NAME = 'file_name'
     DEFAULT_FILENAME = 'default_filename'
     KEYWORD = 'keyword'
+    ANY = 'any'
+    _MATCHER = '_matcher'
+    HYDRATE = '_hydrate'
     CREATED = 'created'
     MODIFIED = 'modified'
     BINARY = 'binary'
@@ -51,6 +130,8 @@ class Congist:
         self._local_dirs = {}
         self._host_agents = {}
         self._local_agents = {}
+        self._hybrid_agents = {False: {}, True: {}}
+        self._tag_indexes = {}
         self.default_host = None
         self._default_users = {}
         try:
@@ -73,6 +154,51 @@ class Congist:
         self._metadata_base = join(local_base, config[self.METADATA_BASE])
         File.mkdir(self._metadata_base)
         self._index_file = join(self._metadata_base, config[self.INDEX_FILE])
+        self._tag_index_file = join(self._metadata_base,
+                                    config[self.TAG_INDEX_FILE])
+        blob_store = config[self.BLOB_STORE]
+        self._blob_store = BlobStore(
+            join(self._metadata_base, blob_store[self.HASH_FILE]),
+            join(self._metadata_base, blob_store[self.SHARED_REPO]),
+            local_base)
+        self._dedup_on_sync = blob_store[self.DEDUP_ON_SYNC]
+        self._manifest_file = join(self._metadata_base,
+                                   config[self.MANIFEST_FILE])
+        self._manifest = Manifest(self._manifest_file)
+        self._api_upload_size = config[self.API_UPLOAD][self.MAX_SIZE]
+        self._sync_journal = Journal(
+            join(self._metadata_base, config[self.SYNC_JOURNAL_FILE]))
+        self._sync_phases = None
+        self._completion_cache = completion.cache_path(
+            config[self.COMPLETION_CACHE])
+        metrics = config[self.METRICS]
+        self._metrics_file = config.get(self.METRICS_FILE) or \
+            metrics[self.TEXTFILE]
+        self._metrics_port = metrics[self.PORT]
+        self._metrics_address = metrics.get(self.ADDRESS, Metrics.ADDRESS)
+        mirror = config[self.MIRROR]
+        self._mirror_intervals = (mirror[self.MIN_INTERVAL],
+                                  mirror[self.MAX_INTERVAL],
+                                  mirror[self.FULL_INTERVAL])
+        self._mirror_reserve = mirror[self.RESERVE]
+        self._snapshot_workers = config[self.SNAPSHOT][self.WORKERS]
+        history = config[self.REVISION_HISTORY]
+        self._history = History(join(self._metadata_base,
+                                     history[self.INDEX_FILE]))
+        self._history_workers = history[self.WORKERS]
+        content_fetch = config[self.CONTENT_FETCH]
+        self._fetch_workers = content_fetch[self.WORKERS]
+        self._fetch_budget = content_fetch[self.BUDGET]
+        bulk_create = config[self.BULK_CREATE]
+        self._bulk_journal_file = join(self._metadata_base,
+                                       bulk_create[self.JOURNAL_FILE])
+        self._bulk_workers = bulk_create[self.WORKERS]
+        self._bulk_interval = bulk_create[self.INTERVAL]
+        self._bulk_flush_size = bulk_create[self.FLUSH_SIZE]
+        clone = config[self.CLONE]
+        self._clone_depth = clone[self.DEPTH]
+        self._clone_filter = clone[self.FILTER]
+        self._clone_size_cutoff = clone[self.SIZE_CUTOFF]
         commit = config[self.COMMIT]
         self._commit_command = commit[self.COMMAND]
         self._commit_message = commit[self.MESSAGE]
@@ -92,7 +218,11 @@ class Congist:
 
             host_agents = self._host_agents[host] = {}
             local_agents = self._local_agents[host] = {}
+            for cached, hybrid_agents in self._hybrid_agents.items():
+                hybrid_agents[host] = {}
             index_file = self._index_file.format(host=host)
+            self._tag_indexes[host] = TagIndex(
+                self._tag_index_file.format(host=host))
             if not self.default_host:
                 self._default_host = host
             for user in settings[self.USERS]:
@@ -114,6 +244,12 @@ class Congist:
                                                local_base=user_local_base,
                                                index_file=index_file)
                 local_agents[username] = local_agent
+                hybrid_agent_type = Type.get_type(
+                    agent_types.get(self.HYBRID, self.HYBRID_AGENT))
+                for cached, hybrid_agents in self._hybrid_agents.items():
+                    hybrid_agents[host][username] = hybrid_agent_type(
+                        remote_agent=agent, local_agent=local_agent,
+                        cached=cached)
 
             if host not in self._default_users:
                 raise ConfigurationError(
@@ -131,6 +267,10 @@ class Congist:
     def metadata_base(self):
         return self._metadata_base
 
+    @property
+    def dedup_on_sync(self):
+        return self._dedup_on_sync
+
     def get_local_host_base(self, host, username):
         return join(self.local_base, host, username)
 
@@ -146,8 +286,10 @@ class Congist:
     def _get_local_agent(self, gist):
         return self._local_agents[gist.host][gist.username]
 
-    def get_agents(self, host, local=False):
+    def get_agents(self, host, local=False, hybrid=False):
         try:
+            if hybrid:
+                return self._hybrid_agents[local][host]
             return (self._local_agents if local else self._host_agents)[host]
         except KeyError:
             raise ParameterError("Host " + host + " not yet supported")
@@ -180,55 +322,367 @@ class Congist:
     def get_files(self, **args):
         yield from self.get_gists_or_files(True, **args)
 
+    def read_files(self, **args):
+        """Yield filtered files, whose gists' contents are loaded together."""
+        yield from self.get_files(**dict(args, **{self.HYDRATE: True}))
+
     def get_gists_or_files(self, is_file, **args):
+        """Yield filtered gists or files, by sort(latest/largest first,
+        descriptions in order) and no more than limit if given."""
+        if args.get(self.KEYWORD):  # shared by all files
+            args[self._MATCHER] = self._get_matcher(**args)
+        sort, limit = args.get(self.SORT), args.get(self.LIMIT)
+        agents = list(self._get_user_agents(**args))
+        streams = [self._query(agent, is_file, **args) for agent in agents]
+        if sort is None:
+            items = chain.from_iterable(streams)
+        else:
+            def key(item):
+                if is_file:
+                    return item.size if sort == 'size' else \
+                        item.gist.sort_key(sort)
+                return item.sort_key(sort)
+
+            reverse = sort not in Gist.ASCENDING_SORTS
+            if all(self._is_ordered(agent, is_file, **args)
+                   for agent in agents):  # stop reading at the limit
+                items = heapq.merge(*streams, key=key, reverse=reverse)
+            elif limit:  # bounded heap
+                items = (heapq.nlargest if reverse else heapq.nsmallest)(
+                    limit, chain.from_iterable(streams), key=key)
+            else:
+                items = sorted(chain.from_iterable(streams), key=key,
+                               reverse=reverse)
+        yield from islice(items, limit)
+
+    def _query(self, agent, is_file, **args):
+        gists = self._select_gists(agent, **args)
+        if args.get(self.REVISION):
+            gists = self._at_revision(gists, **args)
+        mode = self._query_mode(**args)
+        if mode == self.HISTORY:
+            yield from self._search_history(gists, is_file, **args)
+        elif mode == self.LOCAL:
+            yield from self._search_gists(gists, is_file, **args)
+        elif mode == self.CONTENT_FETCH:
+            yield from self._fetch_gists(gists, is_file, **args)
+        else:
+            for gist in gists:
+                yield from self._filter_gist_files(gist, is_file, **args)
+
+    def _query_mode(self, **args):
+        """Return how keywords are matched: in HISTORY, LOCAL clones or
+        CONTENT_FETCH, None without keywords."""
+        if not args.get(self.KEYWORD) or self.DISABLE_FILTER in args:
+            return None
+        if args.get(self.HISTORY):
+            return self.HISTORY
+        if args.get(self.LOCAL) and not args.get(self.HYBRID) and \
+                not args.get(self.REVISION):
+            return self.LOCAL
+        return self.CONTENT_FETCH
+
+    def _is_ordered(self, agent, is_file, **args):
+        """Check whether the agent's query yields items by the sort."""
+        sort = args[self.SORT]
+        if is_file and sort == 'size':  # gists are sorted by total size
+            return False
+        if self._query_mode(**args) in (self.HISTORY, self.CONTENT_FETCH):
+            return False  # in the order of completion
+        if self._use_local_index(**args):
+            return True
+        return sort in agent.orders
+
+    def _select_gists(self, agent, **args):
+        """Yield the agent's gists which pass gist-level filters."""
+        sort = args.get(self.SORT)
+        if self.DISABLE_FILTER in args:
+            yield from agent.get_gists()
+        elif self._use_local_index(**args):
+            tags = args[self.TAGS]
+            tagged = None
+            if tags:  # tag postings spare the index when nothing is tagged
+                tagged = self._tag_indexes[agent.host].lookup(
+                    agent.username, tags)
+                if tagged is not None and not tagged:
+                    return
+            yield from agent.select_gists(
+                ids=args[self.ID], exact=self._exact,
+                description=args[self.DESC],
+                case_sensitive=args[self.CASE_SENSITIVE],
+                tags=None if tagged else tags, public=args[self.PUBLIC],
+                star=args[self.STAR], created=args[self.CREATED],
+                modified=args[self.MODIFIED], sort=sort, tagged=tagged)
+        else:
+            gists = agent.get_gists(sort) if sort in agent.orders else \
+                agent.get_gists()
+            for gist in gists:
+                if self._match_gist(gist, **args):
+                    yield gist
+
+    def _use_local_index(self, **args):
+        return (args.get(self.LOCAL) and not args.get(self.HYBRID)
+                and self.DISABLE_FILTER not in args)
+
+    def _get_user_agents(self, **args):
         host = args[self.HOST]
         hosts = self.hosts if host is None else [host]
         local = args.get(self.LOCAL, False)
+        hybrid = args.get(self.HYBRID, False)
         for host in hosts:
-            agents = self.get_agents(host, local)
+            agents = self.get_agents(host, local, hybrid)
             username = args[self.USER]
             users = [username] if username else self.get_users(host)
             for u in users:
                 if args[self.VERBOSE]:
                     print("username", u)  # TODO: change to callback
-                agent = self._get_agent(agents, u, self._exact)
-                for gist in agent.get_gists():
-                    yield from self._filter_gist(gist, is_file, **args)
+                yield self._get_agent(agents, u, self._exact)
 
-    def _filter_gist(self, gist, is_file, **args):
-        if self.DISABLE_FILTER in args:
-            yield gist
-            return
+    def grep_files(self, **args):
+        """Search local gist files in parallel, yield (file, matches)."""
+        if not args[self.KEYWORD]:
+            raise ParameterError("Please specify the keyword to search")
+
+        args = dict(args, **{self.LOCAL: True, self.HYBRID: False})
+        for agent in self._get_user_agents(**args):
+            yield from self._search_files(self._select_gists(agent, **args),
+                                          False, **args)
+
+    def _search_gists(self, gists, is_file, **args):
+        last_gist = None
+        for gist_file, _ in self._search_files(gists, True, **args):
+            if is_file:
+                yield gist_file
+            elif gist_file.gist is not last_gist:
+                last_gist = gist_file.gist
+                yield last_gist
+
+    def _search_files(self, gists, first_only, **args):
+        search_args = dict(args, **{self.KEYWORD: None})
+        candidates = (f for gist in gists
+                      for f in self._filter_gist_files(gist, True,
+                                                       **search_args)
+                      if not f.binary)
+        searched = deque()
+
+        def paths():
+            for f in candidates:
+                searched.append(f)
+                yield f.path
+
+        search = LocalSearch(self._get_matcher(**args), first_only)
+        for matches in search.search(paths()):
+            gist_file = searched.popleft()
+            if matches:
+                yield gist_file, matches
+
+    def _at_revision(self, gists, **args):
+        """Yield the gists as of the revision, for those whose local clone
+        has it."""
+        revision = args[self.REVISION]
+        for gist in gists:
+            local_dir = self._get_local_gist_dir(gist)
+            resolved = isdir(local_dir) and self._history.resolve(
+                local_dir, revision)
+            if resolved:
+                yield RevisionGist(gist, local_dir, *resolved, self._history)
+            elif args[self.VERBOSE]:
+                print("skip gist without revision {}:".format(revision),
+                      gist.id)
+
+    def _search_history(self, gists, is_file, **args):
+        """Search all revisions of the gists' local clones in parallel,
+        yield each matched gist as of its newest matched revision(or the
+        newest matched version of each file)."""
+        matcher = args[self._MATCHER]
+
+        def accept_path(path):
+            return String.match(path, args[self.FILE_NAME],
+                                args[self.CASE_SENSITIVE])
+
+        def search(gist):
+            local_dir = self._get_local_gist_dir(gist)
+            if not isdir(local_dir):
+                return gist, local_dir, []
+            return gist, local_dir, self._history.search(
+                local_dir, matcher, accept_path, not is_file)
+
+        executor = ThreadPoolExecutor(self._history_workers)
+        futures = []
+        try:
+            for gist in gists:
+                futures.append(executor.submit(search, gist))
+            for future in as_completed(futures):
+                gist, local_dir, hits = future.result()
+                if not hits:
+                    continue
+                if not is_file:
+                    commit, commit_time, _ = hits[0]
+                    yield RevisionGist(gist, local_dir, commit, commit_time,
+                                       self._history)
+                    continue
+
+                found = set()
+                for commit, commit_time, path in hits:
+                    if path in found:
+                        continue
+                    found.add(path)
+                    revision_gist = RevisionGist(gist, local_dir, commit,
+                                                 commit_time, self._history)
+                    yield from (f for f in revision_gist.file_entries
+                                if f.name == path)
+        finally:
+            self._shutdown(executor, futures)
+            self._history.save()
+
+    def _fetch_gists(self, gists, is_file, **args):
+        """Fetch candidate files concurrently(smallest gists first, within
+        the byte budget) and yield gists or files matching keywords as soon
+        as they are fetched."""
+        # contents are loaded by the pool within the budget only
+        fetch_args = dict(args, **{self.KEYWORD: None, self.HYDRATE: None})
+        units = []  # candidate files per gist
+        for gist in gists:
+            files = []
+            for f in self._filter_gist_files(gist, True, **fetch_args):
+                if f.binary:
+                    continue
+                if f.truncated:  # the host would serve part of it only
+                    if args[self.VERBOSE]:
+                        print("skip truncated file(sync and search with "
+                              "--local):", f.name)
+                    continue
+                files.append(f)
+            if files:
+                units.append(files)
+        units.sort(key=lambda files: sum(f.size for f in files))
+        budget = args.get(self.BUDGET) or self._fetch_budget
+        if budget:
+            total = 0
+            for i, files in enumerate(units):
+                total += sum(f.size for f in files)
+                if total > budget:
+                    if args[self.VERBOSE]:
+                        print("skip {} gist(s) over the budget".format(
+                            len(units) - i))
+                    del units[i:]
+                    break
+
+        matcher = self._get_matcher(**args)
+
+        def match(files):
+            self._hydrate(files)
+            matched = []
+            for f in files:
+                if matched and not is_file:
+                    f.release()
+                elif matcher.match(f.content):
+                    matched.append(f)
+                else:
+                    f.release()
+            return matched
+
+        executor = ThreadPoolExecutor(self._fetch_workers)
+        try:
+            futures = [executor.submit(match, files) for files in units]
+            for future in as_completed(futures):
+                matched = future.result()
+                if not matched:
+                    continue
+                if is_file:
+                    yield from matched
+                else:
+                    matched[0].release()
+                    yield matched[0].gist
+        finally:
+            self._shutdown(executor, futures)
+
+    @staticmethod
+    def _shutdown(executor, futures):
+        """Shut down the executor, cancelling futures not started yet(left
+        by an early stop)."""
+        for future in futures:
+            future.cancel()
+        executor.shutdown()
+
+    @staticmethod
+    def _hydrate(files):
+        """Load text files of a gist by one request if several need it."""
+        unloaded = [f for f in files if not f.binary and not f.loaded]
+        if len(unloaded) > 1:
+            unloaded[0].gist.hydrate(unloaded)
+
+    def read_parts(self, **args):
+        """Yield (file, bytes) of the head, tail or byte range of filtered
+        files, fetched concurrently but in order."""
+        head, tail, byte_range = (args.get(self.HEAD), args.get(self.TAIL),
+                                  args.get(self.BYTES))
+        if bool(head) + bool(tail) + bool(byte_range) != 1:
+            raise ParameterError("Please specify one of head, tail or bytes")
+
+        def read(f):
+            if head:
+                return f.head(head)
+            if tail:
+                return f.tail(tail)
+            return f.get_range(*byte_range)
 
+        files = self.get_files(**args)
+        with ThreadPoolExecutor(self._fetch_workers) as executor:
+            # submit ahead of output but keep memory bounded
+            pending = deque()
+            for f in files:
+                pending.append((f, executor.submit(read, f)))
+                if len(pending) >= self._fetch_workers * 2:
+                    f, future = pending.popleft()
+                    yield f, future.result()
+            for f, future in pending:
+                yield f, future.result()
+
+    def _get_matcher(self, **args):
+        matcher = args.get(self._MATCHER)
+        if matcher is None:
+            matcher = Matcher(args[self.KEYWORD], args[self.CASE_SENSITIVE],
+                              not args.get(self.ANY))
+        return matcher
+
+    def _match_gist(self, gist, **args):
         gist_id = args[self.ID]
         if gist_id:
             if self._exact:
                 if gist.id not in gist_id:
-                    return
+                    return False
             else:
                 if all(gid not in gist.id for gid in gist_id):
-                    return
+                    return False
         desc = args[self.DESC]
         if not String.match(gist.description, desc, args[self.CASE_SENSITIVE]):
-            return
+            return False
         tags = args[self.TAGS]
         if tags and not gist.has_tags(tags):
-            return
+            return False
         public = args[self.PUBLIC]
         if (public is False and gist.public) or (public and not gist.public):
-            return
+            return False
         star = args[self.STAR]
         if (star is False and gist.starred) or (star and not gist.starred):
-            return
+            return False
         created = args[self.CREATED]
         if created:
             if not Time.check(gist.created, created):
-                return
+                return False
         modified = args[self.MODIFIED]
         if modified:
             if not Time.check(gist.updated, modified):
-                return
-        if is_file or args[self.FILE_NAME] or args[self.KEYWORD]:
+                return False
+        return True
+
+    def _filter_gist_files(self, gist, is_file, **args):
+        if self.DISABLE_FILTER in args:
+            yield gist
+        elif is_file or args[self.FILE_NAME] or args[self.KEYWORD] or \
+                args.get(self.MAX_SIZE) is not None or \
+                args.get(self.MIN_SIZE) is not None:
             yield from self._filter_file(gist, is_file, **args)
         else:
             yield gist
@@ -238,10 +692,31 @@ class Congist:
             yield gist.get_attrs()
 
     def list_tags(self, **args):
-        tags = set()
+        return sorted(self.count_tags(**args))
+
+    def count_tags(self, **args):
+        """Count filtered gists per tag, from tag index when possible."""
+        counts = Counter()
+        if self._use_local_index(**args) and not self._has_gist_filters(args):
+            for agent in self._get_user_agents(**args):
+                user_counts = self._tag_indexes[agent.host].count(
+                    agent.username, args[self.TAGS])
+                if user_counts is None:
+                    break
+                counts.update(user_counts)
+            else:
+                return counts
+
+            counts.clear()
         for gist in self.get_gists(**args):
-            tags.update(gist.tags)
-        return sorted(tags)
+            counts.update(gist.tags)
+        return counts
+
+    def _has_gist_filters(self, args):
+        return any(args.get(key) is not None for key in (
+            self.ID, self.DESC, self.PUBLIC, self.STAR, self.CREATED,
+            self.MODIFIED, self.FILE_NAME, self.KEYWORD, self.MAX_SIZE,
+            self.MIN_SIZE))
 
     def generate_full_index(self, **args):
         args = args.copy()
@@ -251,55 +726,341 @@ class Congist:
             index_file = self._index_file.format(host=host)
             if args[self.VERBOSE]:
                 print("generating index file:", index_file)
-            with open(index_file, 'w') as f:
-                self.generate_index(f, **args)
+            with Metrics.timer('phase_duration_seconds', phase='index'):
+                self._write_index(host, self._build_index(**args))
+
+    def generate_local_index(self, **args):
+        """Rebuild index files from local clones(scanned in parallel)
+        without any network access."""
+        for host in self.hosts:
+            index_file = self._index_file.format(host=host)
+            if args[self.VERBOSE]:
+                print("generating index file from local clones:", index_file)
+            try:
+                with open(index_file, 'r') as f:
+                    old_index = json.load(f)
+            except FileNotFoundError:
+                old_index = {}
+            index = {}
+            with Metrics.timer('phase_duration_seconds', phase='index'), \
+                    ThreadPoolExecutor() as executor:
+                for username, agent in self._local_agents[host].items():
+                    indexed = {attrs['id']: attrs for attrs in
+                               old_index.get(username, [])}
+                    dir_names = agent.clone_dirs()
+                    gist_attrs = executor.map(agent.scan_gist, dir_names,
+                                              repeat(indexed))
+                    scanned = {}  # id -> (rank, dir_name, attrs)
+                    for dir_name, attrs in zip(dir_names, gist_attrs):
+                        if attrs is None:
+                            if args[self.VERBOSE]:
+                                print("skip clone without gist remote:",
+                                      dir_name)
+                            continue
+                        # prefer the directory named by the description
+                        rank = (agent.is_current_dir(dir_name, attrs),
+                                attrs['updated'])
+                        kept = scanned.get(attrs['id'])
+                        if kept is None or rank > kept[0]:
+                            scanned[attrs['id']] = (rank, dir_name, attrs)
+                            skipped = kept and kept[1]
+                        else:
+                            skipped = dir_name
+                        if skipped and args[self.VERBOSE]:
+                            print("skip another clone of {}: {}".format(
+                                attrs['id'], skipped))
+                    # in the order of listings, recently updated first
+                    index[username] = sorted(
+                        (attrs for _, _, attrs in scanned.values()),
+                        key=lambda attrs: attrs['updated'], reverse=True)
+                self._write_index(host, index)
+
+    def _write_index(self, host, index):
+        with File.lock(self._index_file.format(host=host)):
+            self._save_index(host, index)
+
+    def _save_index(self, host, index):
+        # readers keep seeing the old index until it is atomically replaced
+        with File.atomic_open(self._index_file.format(host=host)) as f:
+            self._dump_index(f, index)
+        self._tag_indexes[host].save(index)
+        Metrics.set('index_gists', sum(len(gists) for gists in
+                                       index.values()), host=host)
+        self._save_completion(host, index)
+
+    def _save_completion(self, host, index):
+        cache = completion.load(self._completion_cache)
+        cache[host] = completion.build_section(index)
+        File.mkdir(dirname(self._completion_cache))
+        with File.atomic_open(self._completion_cache) as f:
+            completion.dump(cache, f)
+
+    @property
+    def completion_cache(self):
+        return self._completion_cache
+
+    def _update_index(self, host, username, gist_attrs, removed=()):
+        """Add or update the user's gist entries in the local index, and
+        drop those of removed ids."""
+        index_file = self._index_file.format(host=host)
+        with File.lock(index_file):
+            try:
+                with open(index_file, 'r') as f:
+                    index = json.load(f)
+            except FileNotFoundError:
+                index = {}
+            for user in self.get_users(host):
+                index.setdefault(user, [])
+            updated = {attrs['id']: attrs for attrs in gist_attrs}
+            removed = set(removed)
+            # attributes left out of updates are kept
+            user_index = [dict(attrs, **updated.pop(attrs['id'], {}))
+                          for attrs in index[username]
+                          if attrs['id'] not in removed]
+            index[username] = list(updated.values()) + user_index
+            self._save_index(host, index)
 
     def generate_index(self, file, **args):
+        """Dump filtered gists' attributes by user, or as one list tagged
+        with usernames if sorted(to keep the order across users)."""
+        if args.get(self.SORT):
+            index = [dict(gist.get_attrs(), username=gist.username)
+                     for gist in self.get_gists(**args)]
+        else:
+            index = self._build_index(**args)
+        self._dump_index(file, index)
+
+    def _build_index(self, **args):
         host = args[self.HOST]
         if host is None:
             host = self._default_host
         index = {u: [] for u in self.get_users(host)}
         for gist in self.get_gists(**args):
             index[gist.username].append(gist.get_attrs())
+        return index
+
+    @staticmethod
+    def _dump_index(file, index):
         json_output = json.dumps(index, indent=4)
         print(json_output, file=file)
 
     def _filter_file(self, gist, is_file, **args):
         binary = args.get(self.BINARY)
-        for f in gist.file_entries:
-            if not String.match(f.name, args[self.FILE_NAME],
-                                args[self.CASE_SENSITIVE]):
-                continue
-            if f.binary and not binary:
-                continue
-            keyword = args[self.KEYWORD]
-            if keyword and (f.binary or not String.match(
-                    f.content, keyword, args[self.CASE_SENSITIVE])):
+        files = [f for f in gist.file_entries
+                 if String.match(f.name, args[self.FILE_NAME],
+                                 args[self.CASE_SENSITIVE])
+                 and (binary or not f.binary)
+                 and self._match_size(f, **args)]  # before fetching content
+        if args.get(self.HYDRATE) or args[self.KEYWORD]:
+            self._hydrate(files)
+        for f in files:
+            if args[self.KEYWORD] and (f.binary or not self._get_matcher(
+                    **args).match(f.content)):
+                f.release()
                 continue
             if is_file:
                 yield f
             else:
+                f.release()
                 yield gist
                 return
 
+    def _match_size(self, gist_file, **args):
+        max_size = args.get(self.MAX_SIZE)
+        if max_size is not None and gist_file.size > max_size:
+            return False
+        min_size = args.get(self.MIN_SIZE)
+        return min_size is None or gist_file.size >= min_size
+
     def sync_gists(self, **args):
-        self.download_gists(**args)
-        self.upload_gists(**args)
+        self._sync(True, True, **args)
 
     def download_gists(self, **args):
+        self._sync(True, False, **args)
+
+    def upload_gists(self, **args):
+        self._sync(False, True, **args)
+
+    def _sync(self, downloading, uploading, **args):
+        """Download and/or upload gists, journaling each gist's completed
+        phase so that a resumed sync skips what is done."""
+        self._sync_phases = self._load_sync_journal(**args)
+        phase = "sync" if downloading and uploading else \
+            "download" if downloading else "upload"
+        try:
+            with Metrics.timer('phase_duration_seconds', phase=phase):
+                self._sync_gists(downloading, uploading, **args)
+        finally:
+            self._sync_phases = None
+            self._manifest.save()
+
+    def _sync_gists(self, downloading, uploading, **args):
         for gist in self.get_gists(**args):
-            self._download_gist(gist, **args)
+            phase = self._get_phase(gist)
+            if downloading and phase is None:
+                self._download_gist(gist, **args)
+            if not uploading or phase == self.PUSHED:
+                continue
+            if phase == self.COMMITTED:
+                self._push_gist(gist, **args)
+            else:
+                self._upload_gist(gist, **args)
+
+    def _load_sync_journal(self, **args):
+        if not args.get(self.RESUME):  # start over
+            if not args.get(self.DRY_RUN):
+                self._sync_journal.clear()
+            return {}
+
+        phases = {}
+        for record in self._sync_journal.load():
+            phases[(record['host'], record['id'])] = record
+        return phases
+
+    def _get_phase(self, gist):
+        """Return the phase journaled for the gist, None if the gist has
+        changed since."""
+        record = self._sync_phases.get((gist.host, gist.id))
+        if record is None or record['updated'] != gist.updated:
+            return None
+        return record['phase']
+
+    def _set_phase(self, gist, phase, **args):
+        if self._sync_phases is None or args.get(self.DRY_RUN):
+            return
+        Metrics.inc('gists_total', phase=phase)
+        record = {'host': gist.host, 'id': gist.id, 'updated': gist.updated,
+                  'phase': phase}
+        self._sync_phases[(gist.host, gist.id)] = record
+        self._sync_journal.append(record)
 
     def _download_gist(self, gist, **args):
-        local_parent = self._get_local_parent(gist)
-        local_agent = self._get_local_agent(gist)
-        local_dir = join(local_parent, local_agent.gist_dir(gist))
-        if isdir(local_dir):
-            self._pull_gists(local_dir, **args)
-        else:
-            self._clone_gists(gist, local_dir, **args)
+        local_dir = self._get_local_gist_dir(gist)
+        self._pull_or_clone(gist, local_dir, **args)
         return local_dir
 
+    def _get_local_gist_dir(self, gist):
+        return join(self._get_local_parent(gist),
+                    self._get_local_agent(gist).gist_dir(gist))
+
+    def _pull_or_clone(self, gist, local_dir, **args):
+        """Pull or clone the gist into local_dir, return if succeeded."""
+        if isdir(local_dir):
+            # local changes to upload must not be recorded as committed
+            clean = self._manifest.is_clean(local_dir)
+            if self._pull_gists(local_dir, **args):
+                if clean:
+                    self._manifest.record(local_dir)
+                self._set_phase(gist, self.PULLED, **args)
+                return True
+            if not args.get(self.DRY_RUN):
+                Metrics.inc('gist_failures_total', phase=self.PULLED)
+        elif not gist.pull_url:  # listed from the local index
+            if args[self.VERBOSE]:
+                print("skip gist not cloned yet(sync without -l to clone):",
+                      gist.id)
+        elif self._clone_gists(gist, local_dir, **args):
+            self._manifest.record(local_dir)
+            self._set_phase(gist, self.CLONED, **args)
+            return True
+        elif not args.get(self.DRY_RUN):
+            Metrics.inc('gist_failures_total', phase=self.CLONED)
+        return False
+
+    def mirror(self, **args):
+        """Keep local clones and index fresh: poll each account's listing
+        and pull only the gists changed since the last poll."""
+        port = args.get(self.PORT) or self._metrics_port
+        if port:
+            Metrics.serve(port, self._metrics_address)
+        args = dict(args, **{self.LOCAL: False, self.HYBRID: False})
+        pollers = [Poller(agent, self._load_known(agent),
+                          *self._mirror_intervals, self._mirror_reserve)
+                   for agent in self._get_user_agents(**args)]
+        if args.get(self.ONCE):
+            for poller in pollers:
+                self._mirror_account(poller, **args)
+            return
+
+        while True:
+            poller = min(pollers, key=lambda p: p.next_time)
+            delay = poller.next_time - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._mirror_account(poller, **args)
+
+    def _load_known(self, agent):
+        """Return {id: updated} of the account's indexed gists."""
+        try:
+            with open(self._index_file.format(host=agent.host), 'r') as f:
+                user_index = json.load(f).get(agent.username, [])
+        except FileNotFoundError:
+            user_index = []
+        return {attrs['id']: attrs['updated'] for attrs in user_index}
+
+    def _mirror_account(self, poller, **args):
+        agent = poller.agent
+        host, username = agent.host, agent.username
+        try:
+            changed, removed = poller.poll()
+        except OSError as e:  # retried at the next poll
+            Metrics.inc('mirror_polls_total', user=username, result='error')
+            if args[self.VERBOSE]:
+                print("failed to poll gists of", username, e)
+            poller.schedule(False)
+            return
+
+        Metrics.inc('mirror_polls_total', user=username,
+                    result='changed' if changed or removed else 'unchanged')
+        # starring leaves updated time alone, keep the indexed value
+        fmt = [f for f, key in Gist.format_map().items() if key != 'starred']
+        gist_attrs = []
+        for gist in changed:
+            if args[self.VERBOSE]:
+                print("pulling changed gist", gist.id)
+            if not self._pull_or_clone(gist, self._get_local_gist_dir(gist),
+                                       **args):
+                poller.retry(gist)
+                continue
+            gist_attrs.append(gist.get_attrs(
+                fmt if gist.id in poller.known else None))
+            poller.done(gist)
+        for gist_id in removed:
+            if args[self.VERBOSE]:
+                print("unindexing removed gist(local clone kept)", gist_id)
+            poller.remove(gist_id)
+        if gist_attrs or removed:
+            self._update_index(host, username, gist_attrs, removed)
+            self._manifest.save()
+        poller.schedule(bool(changed or removed))
+        Metrics.set('mirror_interval_seconds', poller.interval,
+                    user=username)
+        if self._metrics_file:
+            self.export_metrics(self.MIRROR, True)
+
+    def _run(self, cmd, **args):
+        """Run(or print for dry run) a shell command, return if succeeded."""
+        if args.get(self.DRY_RUN):
+            print(cmd)
+            return False
+
+        command = "+".join(dict.fromkeys(
+            self.GIT_COMMAND_PATTERN.findall(cmd))) or "other"
+        with Metrics.timer('git_command_duration_seconds', command=command):
+            succeeded = os.system(cmd) == 0
+        if not succeeded:
+            Metrics.inc('git_command_failures_total', command=command)
+        return succeeded
+
+    def export_metrics(self, command, success):
+        """Write metrics of this run to the textfile if configured."""
+        Metrics.set('last_run_timestamp_seconds', time.time(),
+                    command=command)
+        Metrics.set('last_run_success', int(success), command=command)
+        if self._metrics_file:
+            Metrics.write_textfile(
+                expanduser(self._metrics_file.format(command=command)))
+
     def _clone_gists(self, gist, local_dir, **args):
         ssh = args.get(self.SSH)
         if ssh is None:
@@ -308,26 +1069,180 @@ class Congist:
             gist_url = "git@" + gist.pull_url.replace('/', ':')[8:]
         else:
             gist_url = gist.pull_url
-        cmd = "git clone {verbose} {url} {local_dir}".format(
+        cmd = "git clone {verbose}{options} {url} {local_dir}".format(
             local_dir=local_dir, verbose=("" if args[self.VERBOSE] else " -q"),
-            url=gist_url)
-        if args[self.DRY_RUN]:
-            print(cmd)
-        else:
-            os.system(cmd)
+            options=self._clone_options(**args), url=gist_url)
+        return self._run(cmd, **args)
+
+    def export_snapshot(self, path, **args):
+        """Pack local clones into git bundles(in parallel) along with the
+        index and manifest files into one archive, return (exported,
+        skipped) counts of clones."""
+        args = dict(args, **{self.LOCAL: False, self.HYBRID: False})
+        repos, skipped = {}, 0
+        for agent in self._get_user_agents(**args):
+            user_dir = self.get_local_dir(agent.host, agent.username)
+            for name in sorted(os.listdir(user_dir)):
+                repo_dir = join(user_dir, name)
+                if not isdir(join(repo_dir, self.GIT_DIR)):
+                    continue
+                # bundles of shallow clones lack commits to clone from
+                url = Git.remote_url(repo_dir)
+                if url is None or Git.is_shallow(repo_dir):
+                    skipped += 1
+                    if args[self.VERBOSE]:
+                        print("skip shallow or remoteless clone", repo_dir)
+                    continue
+                repos["/".join((agent.host, agent.username, name))] = (
+                    repo_dir, url)
+        self._manifest.save()
+        metadata_files = [self._manifest_file] + [
+            pattern.format(host=host) for host in self.hosts
+            for pattern in (self._index_file, self._tag_index_file)]
+        if args.get(self.DRY_RUN):
+            for repo_dir, _ in repos.values():
+                print("bundle", repo_dir)
+            return 0, skipped
+
+        exported = 0
+        with Metrics.timer('phase_duration_seconds', phase='export'), \
+                tempfile.TemporaryDirectory() as tmp, \
+                Snapshot.create(path) as snapshot:
+            snapshot.add_info({'local_base': self.local_base, 'repos': {
+                repo: url for repo, (_, url) in repos.items()}})
+            for metadata_file in metadata_files:
+                if isfile(metadata_file):
+                    snapshot.add_metadata(metadata_file)
+
+            def bundle(repo, output):
+                cmd = "cd {}; git bundle create -q {} --all".format(
+                    repos[repo][0], output)
+                return self._run(cmd, **args)
+
+            executor = ThreadPoolExecutor(self._snapshot_workers)
+            try:
+                futures = {executor.submit(bundle, repo, join(
+                    tmp, str(i))): (repo, join(tmp, str(i)))
+                    for i, repo in enumerate(repos)}
+                for future in as_completed(futures):
+                    repo, output = futures[future]
+                    if not future.result():
+                        skipped += 1
+                        continue
+                    snapshot.add_bundle(repo, output)
+                    os.remove(output)
+                    exported += 1
+            finally:
+                self._shutdown(executor, futures)
+        return exported, skipped
+
+    def import_snapshot(self, path, **args):
+        """Clone local gists from the bundles of a snapshot archive(in
+        parallel), restore its index and manifest files, then pull only the
+        gists changed since. Return (imported, skipped) counts of clones."""
+        info = {'local_base': self.local_base, 'repos': {}}
+        futures, skipped = [], 0
+        with Metrics.timer('phase_duration_seconds', phase='import'), \
+                tempfile.TemporaryDirectory() as tmp, \
+                Snapshot.open(path) as snapshot, \
+                ThreadPoolExecutor(self._snapshot_workers) as executor:
+            for kind, name, value in snapshot.read(tmp):
+                if kind == Snapshot.INFO:
+                    info = value
+                elif kind == Snapshot.METADATA:
+                    self._restore_metadata(basename(name), value,
+                                           info['local_base'], **args)
+                elif self._is_repo_name(name) and \
+                        name in info['repos'] and \
+                        not isdir(join(self.local_base, name)):
+                    local_dir = join(self.local_base, name)
+                    futures.append((local_dir, executor.submit(
+                        self._clone_bundle, value, local_dir,
+                        info['repos'][name], **args)))
+                else:  # existing clones are kept
+                    skipped += 1
+                    if args[self.VERBOSE]:
+                        print("skip existing or unknown clone", name)
+            cloned = [local_dir for local_dir, future in futures
+                      if future.result()]
+        self._manifest = Manifest(self._manifest_file)  # restored
+        for local_dir in cloned:
+            self._manifest.record(local_dir)
+        self._manifest.save()
+        if not args.get(self.NO_PULL) and not args.get(self.DRY_RUN):
+            self.mirror(**dict(args, **{self.ONCE: True}))
+        return len(cloned), skipped + len(futures) - len(cloned)
+
+    @staticmethod
+    def _is_repo_name(name):
+        parts = name.split("/")
+        return len(parts) == 3 and all(
+            p and p not in (os.curdir, os.pardir) for p in parts)
+
+    def _restore_metadata(self, name, path, old_local_base, **args):
+        target = join(self.metadata_base, name)
+        if isfile(target) and not args.get(self.FORCE):
+            if args[self.VERBOSE]:
+                print("keep existing", target)
+            return
+        if args.get(self.DRY_RUN):
+            print("restore", target)
+            return
+
+        if target == self._manifest_file:  # keyed by clone paths
+            with open(path, 'r') as f:
+                entries = json.load(f)
+            entries = {self.local_base + local_dir[len(old_local_base):]
+                       if local_dir.startswith(old_local_base) else
+                       local_dir: files for local_dir, files in
+                       entries.items()}
+            with File.atomic_open(target) as f:
+                json.dump(entries, f)
+            return
+
+        for host in self.hosts:
+            if target == self._index_file.format(host=host):
+                # through the lock, tag index and completion of live ones
+                with open(path, 'r') as f:
+                    self._write_index(host, json.load(f))
+                os.remove(path)
+                return
+        shutil.move(path, target)
+
+    def _clone_bundle(self, bundle, local_dir, url, **args):
+        cmd = "git clone -q {bundle} {dir} && cd {dir} && " \
+            "git remote set-url origin {url}".format(
+                bundle=bundle, dir=local_dir, url=url)
+        succeeded = self._run(cmd, **args)
+        os.remove(bundle)
+        return succeeded
+
+    def _get_clone_depth(self, **args):
+        depth = args.get(self.DEPTH)
+        return self._clone_depth if depth is None else depth
+
+    def _clone_options(self, **args):
+        options = ""
+        depth = self._get_clone_depth(**args)
+        if depth:
+            options += " --depth {}".format(depth)
+        blob_filter = args.get(self.FILTER) or self._clone_filter
+        if not blob_filter and self._clone_size_cutoff:
+            blob_filter = "blob:limit={}".format(self._clone_size_cutoff)
+        if blob_filter:
+            options += " --filter=" + blob_filter
+        return options
 
     def _pull_gists(self, local_dir, **args):
         # TODO: put rebase option in arguments or setting
-        cmd = "cd {}; git pull {}".format(
-            local_dir, "" if args[self.VERBOSE] else " -q")
-        if args[self.DRY_RUN]:
-            print(cmd)
-        else:
-            os.system(cmd)
-
-    def upload_gists(self, **args):
-        for gist in self.get_gists(**args):
-            self._upload_gist(gist, **args)
+        quiet = "" if args[self.VERBOSE] else " -q"
+        fetch = ""
+        # a shallow clone stays shallow from its boundary: pulling with
+        # --depth would graft unrelated histories which never merge
+        if Git.is_shallow(local_dir) and args.get(self.DEEPEN):
+            fetch = "git fetch --unshallow{} && ".format(quiet)
+        cmd = "cd {}; {}git pull {}".format(local_dir, fetch, quiet)
+        return self._run(cmd, **args)
 
     def _upload_gist(self, gist, **args):
         local_dir = self.get_local_host_base(gist.host, gist.username)
@@ -341,15 +1256,125 @@ class Congist:
             subdir = join(local_dir, subdir)
             if not isdir(subdir):
                 continue
+            if self._manifest.is_clean(subdir):
+                self._set_phase(gist, self.PUSHED, **args)
+                continue
+            if args.get(self.API) and self._upload_by_api(gist, subdir,
+                                                          **args):
+                continue
             cmd = ("cd {subdir} &&" + self._commit_command).format(
                 subdir=subdir, comment=self._commit_message,
                 verbose=("" if args[self.VERBOSE] else "-q"))
-            if args.get(self.DRY_RUN):
-                print(cmd)
+            if self._run(cmd, **args):
+                self._manifest.record(subdir)
+                self._set_phase(gist, self.PUSHED, **args)
+            elif args.get(self.DRY_RUN):
+                continue
+            elif Git.head(subdir) != Git.upstream(subdir):  # push failed
+                self._set_phase(gist, self.COMMITTED, **args)
+                Metrics.inc('gist_failures_total', phase=self.PUSHED)
             else:
-                os.system(cmd)
+                Metrics.inc('gist_failures_total', phase=self.COMMITTED)
 
-    def create_gist(self, paths, **args):
+    def _push_gist(self, gist, **args):
+        """Push what an interrupted sync has committed."""
+        local_dir = join(self.get_local_host_base(gist.host, gist.username),
+                         self._get_local_agent(gist).gist_dir(gist))
+        quiet = "" if args[self.VERBOSE] else " -q"
+        # the manifest is left to the next upload, which may commit more
+        if self._run("cd {} && git push{}".format(local_dir, quiet), **args):
+            self._set_phase(gist, self.PUSHED, **args)
+        elif not args.get(self.DRY_RUN):
+            Metrics.inc('gist_failures_total', phase=self.PUSHED)
+
+    def _upload_by_api(self, gist, local_dir, **args):
+        """Upload small text changes by one API request, return if done."""
+        files = self._get_api_changes(local_dir)
+        if not files:
+            return False
+
+        if args.get(self.DRY_RUN):
+            print("update {} via API: {}".format(gist.id, ", ".join(files)))
+            return True
+        # the API would overwrite changes the clone has not pulled yet
+        quiet = "" if args[self.VERBOSE] else " -q"
+        fetch = "cd {} && git fetch{}".format(local_dir, quiet)
+        if not self._run(fetch, **args) or \
+                Git.head(local_dir) != Git.upstream(local_dir):
+            return False
+        if not self._get_agent_from_gist(gist).update_gist(gist, files):
+            return False
+
+        # the working tree already has the new revision's content
+        cmd = "{} && git add -A && git merge{} --ff-only @{{u}}".format(
+            fetch, quiet)
+        if self._run(cmd, **args):
+            self._manifest.record(local_dir)
+        elif args[self.VERBOSE]:
+            print("updated {} via API, but failed to fast-forward {}".format(
+                gist.id, local_dir))
+        self._set_phase(gist, self.PUSHED, **args)
+        return True
+
+    def _get_api_changes(self, local_dir):
+        changes = self._manifest.changes(local_dir)
+        if changes is None:
+            return None
+
+        modified, added, removed = changes
+        if sum(modified.values()) + sum(added.values()) > \
+                self._api_upload_size:
+            return None
+        files = {}
+        renamed = {self._manifest.digest(local_dir, name): name
+                   for name in removed}
+        for name in list(modified) + list(added):
+            if os.sep in name:  # gists have no directories
+                return None
+            path = join(local_dir, name)
+            old_name = renamed.pop(File.digest(path), None) \
+                if name in added else None
+            if old_name:
+                files[old_name] = {'filename': name}
+                continue
+            content = File.read_text(path)
+            if not content:  # binary, or empty which API rejects
+                return None
+            files[name] = {'content': content}
+        for name in renamed.values():
+            files[name] = None
+        return files
+
+    def _get_repo_dirs(self, **args):
+        args = dict(args, **{self.LOCAL: True, self.HYBRID: False})
+        for agent in self._get_user_agents(**args):
+            local_base = agent.local_base
+            if not isdir(local_base):
+                continue
+            for name in sorted(os.listdir(local_base)):
+                repo_dir = join(local_base, name)
+                if isdir(join(repo_dir, self.GIT_DIR)):
+                    yield repo_dir
+
+    def find_duplicates(self, **args):
+        """Return groups of local gist files with identical content."""
+        self._blob_store.update(self._get_repo_dirs(**args))
+        return self._blob_store.duplicates()
+
+    def dedup(self, **args):
+        """Share identical content among local clones, return (saved bytes,
+        number of duplicate files which could not be reflinked)."""
+        with Metrics.timer('phase_duration_seconds', phase='dedup'):
+            repo_dirs = list(self._get_repo_dirs(**args))
+            self._blob_store.update(repo_dirs)
+            if args.get(self.DRY_RUN):
+                return 0, 0
+
+            saved, unlinked = self._blob_store.link()
+            self._blob_store.share_objects(repo_dirs, args[self.VERBOSE])
+            return saved, unlinked
+
+    def _get_create_agent(self, **args):
         host = args[self.HOST]
         if host is None:
             host = self._default_host
@@ -357,23 +1382,95 @@ class Congist:
         username = args[self.USER]
         if username is None:
             username = self._default_users[host]  # at least 1
-        agent = self._get_agent(agents, username, self._exact)
+        return self._get_agent(agents, username, self._exact)
+
+    def create_gist(self, paths, **args):
+        agent = self._get_create_agent(**args)
         public = args[self.PUBLIC] or False
         desc = args[self.DESC] or self._default_description
         filename = args[self.FILE_NAME] or self._default_filename
         is_binary = args[self.BINARY]
-        files = File.file_map(paths, filename, is_binary)
         if is_binary:  # create placeholder file first
-            original_files = files
-            filename = next(iter(files))
-            files = File.dummy_file_map(filename)
+            file_paths = File.path_map(paths, filename)
+            files = File.dummy_file_map(next(iter(file_paths)))
+        else:
+            files = File.file_map(paths, filename)
         gist = agent.create_gist(files, desc, public)
         if is_binary:  # clone and push
             local_dir = self._download_gist(gist, **args)
-            File.copy_files(original_files, local_dir)
+            File.copy_files(file_paths, local_dir)
             self._upload_gist(gist, **args)
         return gist
 
+    def bulk_create(self, paths, **args):
+        """Create a gist per file in directory trees or per manifest entry,
+        concurrently and resumably, return (created, failed) counts."""
+        agent = self._get_create_agent(**args)
+        host, username = agent.host, agent.username
+        journal = Journal(self._bulk_journal_file.format(host=host))
+        records = journal.load()
+        # make sure the index has gists of an interrupted run
+        attrs_list = [r['attrs'] for r in records if 'attrs' in r]
+        if attrs_list:
+            self._update_index(host, username, attrs_list)
+        done = {r['key'] for r in records}
+        creator = BulkCreator(self._bulk_interval)
+        try:
+            items = [item for item in creator.plan(
+                paths, args[self.PUBLIC] or False, args[self.TAGS] or [])
+                if item.key not in done]
+        except ValueError as e:  # malformed manifest
+            raise ParameterError(e)
+        if args.get(self.DRY_RUN):
+            for item in items:
+                print("create gist:", item.description, list(item.files))
+            return 0, 0
+
+        def create(item):
+            files = creator.read_files(item)
+            if files is None:
+                raise ParameterError("binary or empty file in " + item.key)
+            creator.wait()
+            return agent.create_gist(files, item.description, item.public)
+
+        # starred is known for new gists, skip a request per gist
+        fmt = [f for f, key in Gist.format_map().items() if key != 'starred']
+        created, pending, failed = 0, [], 0
+        executor = ThreadPoolExecutor(self._bulk_workers)
+        try:
+            futures = {executor.submit(create, item): item for item in items}
+            for future in as_completed(futures):
+                item = futures[future]
+                try:
+                    gist = future.result()
+                except Exception as e:  # left to a rerun
+                    failed += 1
+                    if args[self.VERBOSE]:
+                        print("failed to create gist for", item.key, e)
+                    continue
+                attrs = gist.get_attrs(fmt)
+                attrs['starred'] = False
+                journal.append({'key': item.key, 'attrs': attrs})
+                done.add(item.key)
+                created += 1
+                pending.append(attrs)
+                if args[self.VERBOSE]:
+                    print("created gist", gist.id, "for", item.key)
+                if len(pending) >= self._bulk_flush_size:
+                    self._update_index(host, username, pending)
+                    pending = []
+        finally:
+            self._shutdown(executor, futures)
+            if pending:
+                self._update_index(host, username, pending)
+        # all gists created are in the index now: forget them once done,
+        # keep only their keys for the rerun of failed ones
+        if failed:
+            journal.replace({'key': key} for key in sorted(done))
+        else:
+            journal.clear()
+        return created, failed
+
 
 class ClientError(Exception):
     """Client-side error"""
@@ -3,6 +3,8 @@
 import re
 from collections import namedtuple
 
+from congist.utils import String
+
 
 """GistUser represents a gist user."""
 
@@ -15,6 +17,7 @@ GistUser = namedtuple('GistUser', ['username', 'access_token', 'ssh'])
 class Gist:
     TAGS = 'tags'
     TAG_MARK = '#'
+    TAG_PREFIX_MARK = '*'
     TITLE = 'title'
     SUBTITLE = 'subtitle'
     DESC_SPLIT = 'desc_split'
@@ -31,6 +34,8 @@ class Gist:
         'tags',
         'files'
     ]
+    SORTS = ('updated', 'created', 'description', 'size')
+    ASCENDING_SORTS = ('description',)  # others list latest/largest first
     _format_map = {}
 
     @staticmethod
@@ -135,6 +140,15 @@ class Gist:
     @property
     def file_entries(self): ...
 
+    @property
+    def size(self):
+        return sum(f.size for f in self.file_entries)
+
+    def sort_key(self, sort):
+        if sort == 'description':
+            return String.casefold(self.description)
+        return getattr(self, sort)
+
     @property
     def created(self): ...
 
@@ -159,26 +173,55 @@ class Gist:
         self.set_description(self._join_desc(desc))
 
     def has_tags(self, tags):
-        return all(t in self.tags for t in tags)
+        return all(self.has_tag(t) for t in tags)
+
+    def has_tag(self, tag):
+        if tag.endswith(self.TAG_PREFIX_MARK):  # prefix lookup
+            prefix = tag[:-1]
+            return any(t.startswith(prefix) for t in self.tags)
+        return tag in self.tags
 
-    def _split_desc(self, desc):
-        matched = self._desc_pattern.match(desc).groupdict()
+    @classmethod
+    def _split_desc(cls, desc):
+        matched = cls._desc_pattern.match(desc).groupdict()
         matched.update({k: v.strip() for k, v in matched.items()
                         if isinstance(v, str)})
-        tags = matched[self.TAGS]
-        tags = tags.split(self.TAG_MARK) if tags else []
-        matched[self.TAGS] = {t.strip() for t in tags if t.strip()}
+        tags = matched[cls.TAGS]
+        tags = tags.split(cls.TAG_MARK) if tags else []
+        matched[cls.TAGS] = {t.strip() for t in tags if t.strip()}
         return matched
 
-    def _join_desc(self, desc):
+    @classmethod
+    def parse_tags(cls, description):
+        return sorted(cls._split_desc(description)[cls.TAGS])
+
+    @classmethod
+    def _join_desc(cls, desc):
         format_desc = desc.copy()
-        tags = (" " + self.TAG_MARK).join(desc[self.TAGS])
+        tags = (" " + cls.TAG_MARK).join(desc[cls.TAGS])
         if tags:
-            tags = (" " + self.TAG_MARK) + tags
-        format_desc[self.TAGS] = tags
-        joined = self._desc_format.format(**format_desc)
-        if not desc[self.TITLE]:  # skip empty title
+            tags = (" " + cls.TAG_MARK) + tags
+        format_desc[cls.TAGS] = tags
+        joined = cls._desc_format.format(**format_desc)
+        if not desc[cls.TITLE]:  # skip empty title
             joined = joined[joined.find(' ') + 1:]
         return joined
 
+    @classmethod
+    def make_description(cls, title, subtitle="", tags=()):
+        desc = cls._join_desc({cls.TITLE: title, cls.SUBTITLE: subtitle,
+                               cls.TAGS: tags})
+        if subtitle:
+            return desc
+        # no blank subtitle between the title and tags
+        head = cls._join_desc({cls.TITLE: title, cls.SUBTITLE: "",
+                               cls.TAGS: []})
+        return (head.rstrip() + desc[len(head):]).strip()
+
     def get_content(self, gist_file): ...
+
+    def write_content(self, gist_file, output): ...
+
+    def get_range(self, gist_file, start, end=None): ...
+
+    def hydrate(self, gist_files): ...
@@ -13,6 +13,27 @@ class GistAgent():
     @property
     def username(self): ...
 
+    @property
+    def orders(self):
+        """Return sorts(Gist.SORTS) which get_gists can list gists by."""
+        return ()
+
     def get_gists(self): ...
 
+    def gist_id(self, pull_url): ...
+
+    def api_url(self, gist_id): ...
+
+    def raw_url(self, gist_id, revision, name): ...
+
+    def poll_gists(self, since=None, etag=None): ...
+
     def create_gist(self, files, desc="", public=False): ...
+
+    def update_gist(self, gist, files): ...
+
+    def get_content(self, gist_file): ...
+
+    def write_content(self, gist_file, output): ...
+
+    def get_range(self, gist_file, start, end=None): ...
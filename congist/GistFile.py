@@ -11,6 +11,7 @@ from congist.utils import File
 
 
 class GistFile:
+    PEEK_SIZE = 1 << 13
 
     def __init__(self, gist, file_entry, path=None):
         assert isinstance(gist, Gist), gist
@@ -23,7 +24,10 @@ class GistFile:
         self._size = file_entry['size']
         self._content_type = file_entry['type']
         self._binary = File.is_binary(self._name, self._content_type)
-        self._content = None
+        # too large to be served in full by the host
+        self._truncated = file_entry.get('truncated', False)
+        # text content may come along with the listing
+        self._content = None if self._binary else file_entry.get('content')
 
     def __repr__(self):
         return json.dumps(self.attrs)
@@ -33,6 +37,10 @@ class GistFile:
         return {'name': self.name, 'url': self.url, 'type': self.content_type,
                 'size': self.size}
 
+    @property
+    def gist(self):
+        return self._gist
+
     @property
     def name(self):
         return self._name
@@ -50,6 +58,10 @@ class GistFile:
         self._load_content()
         return self._content
 
+    @property
+    def loaded(self):
+        return self._content is not None
+
     @property
     def size(self):
         return self._size
@@ -62,11 +74,64 @@ class GistFile:
     def binary(self):
         return self._binary
 
+    @property
+    def truncated(self):
+        return self._truncated
+
     def _load_content(self):
         if self._content is None:
             self._content = self._gist.get_content(self)
         return self._content
 
+    def get_range(self, start, end=None):
+        """Return bytes [start, end) of the content(the last -start bytes
+        if start is negative), fetching no more than needed."""
+        if self._content is None:
+            return self._gist.get_range(self, start, end)
+
+        content = self._content
+        if isinstance(content, str):
+            content = content.encode()
+        return content[start:] if start < 0 else content[start:end]
+
+    def head(self, lines):
+        """Return the first lines of the content in bytes."""
+        data = b''
+        size = self.PEEK_SIZE
+        while True:
+            data += self.get_range(len(data), size)
+            if data.count(b'\n') >= lines or len(data) < size:
+                break
+            size *= 4
+        return b''.join(data.splitlines(keepends=True)[:lines])
+
+    def tail(self, lines):
+        """Return the last lines of the content in bytes."""
+        size = self.PEEK_SIZE
+        while True:
+            data = self.get_range(-size)
+            # a complete line precedes the last ones
+            if len(data) < size or data.rstrip(b'\n').count(b'\n') >= lines:
+                break
+            size *= 4
+        return b''.join(data.splitlines(keepends=True)[-lines:])
+
+    def cache_content(self, content):
+        """Keep content loaded along with other files of the gist."""
+        self._content = content
+
+    def release(self):
+        self._content = None
+
+    def write_to(self, output):
+        """Write content to output without retaining it."""
+        if self._content is None:
+            self._gist.write_content(self, output)
+        else:
+            content = self._content
+            self.release()
+            File.write(output, content)
+
     def delete(self):
         return self._gist.delete_file(self)
 
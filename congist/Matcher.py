@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+
+"""
+Matcher searches several keywords in one pass over a text(str or bytes):
+literal keywords with an Aho-Corasick automaton(if pyahocorasick is
+installed), the others with one alternation of the remaining keywords,
+except those referring to groups by number, which are searched on their own
+since an alternation renumbers groups.
+"""
+
+import re
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+
+class Matcher:
+    FLAGS = re.DOTALL | re.MULTILINE
+    REGEX_CHARS = frozenset('.^$*+?{}[]\\|()')
+    # \1 or (?(1)...) not escaped by a backslash
+    GROUP_NUMBER_PATTERN = re.compile(r'(?<!\\)(?:\\\\)*(?:\\[1-9]|\(\?\(\d)')
+    _ASCII_LOWER = {c: c + 32 for c in range(ord('A'), ord('Z') + 1)}
+    CHUNK_SIZE = 1 << 20  # bytes folded at a time for the automaton
+
+    def __init__(self, keywords, case_sensitive=False, match_all=True):
+        self._keywords = list(dict.fromkeys(keywords))
+        self._case_sensitive = case_sensitive
+        self._match_all = match_all
+        self._literals = []  # indexes of keywords for the automaton
+        self._regexes = []  # of the alternation
+        self._isolated = []  # of keywords referring to group numbers
+        for i, keyword in enumerate(self._keywords):
+            if ahocorasick and self._is_literal(keyword):
+                self._literals.append(i)
+            elif self.GROUP_NUMBER_PATTERN.search(keyword):
+                self._isolated.append(i)
+            else:
+                self._regexes.append(i)
+        self._automatons = {}
+        self._patterns = {}
+
+    def _is_literal(self, keyword):
+        if self.REGEX_CHARS.intersection(keyword):
+            return False
+        # the automaton folds ASCII only
+        return self._case_sensitive or keyword.isascii()
+
+    @property
+    def keywords(self):
+        return self._keywords
+
+    def accepts(self, hits):
+        """Check whether the indexes of hit keywords satisfy AND/OR."""
+        if self._match_all:
+            return len(hits) == len(self._keywords)
+        return bool(hits)
+
+    def match(self, text):
+        return self.accepts(self.search(text))
+
+    def search(self, text):
+        """Return indexes of the keywords found in text, scanning no further
+        than needed to tell whether text is accepted."""
+        hits = set()
+        if self._literals:
+            self._search_literals(text, hits)
+            if self._match_all and len(hits) < len(self._literals):
+                return hits
+            if hits and not self._match_all:
+                return hits
+        if self._regexes:
+            self._search_regexes(text, hits)
+            if self._match_all and not hits.issuperset(self._regexes):
+                return hits
+            if hits and not self._match_all:
+                return hits
+        is_str = isinstance(text, str)
+        for i in self._isolated:
+            if self._compile((i,), is_str).search(text):
+                hits.add(i)
+                if not self._match_all:
+                    break
+            elif self._match_all:
+                break
+        return hits
+
+    def _search_literals(self, text, hits):
+        automaton = self._get_automaton(isinstance(text, str))
+        for chunk in self._fold(text):
+            for _, indexes in automaton.iter(chunk):
+                hits.update(indexes)
+                if not self._match_all or len(hits) == len(self._literals):
+                    return
+
+    def _fold(self, text):
+        """Yield text for the automaton, bytes(e.g. of mmap) in chunks
+        overlapping by the longest literal so that none is cut off."""
+        if isinstance(text, str):
+            yield text if self._case_sensitive else \
+                text.translate(self._ASCII_LOWER)
+            return
+
+        overlap = max(len(self._keywords[i].encode())
+                      for i in self._literals) - 1
+        for start in range(0, max(len(text), 1), self.CHUNK_SIZE):
+            data = text[start:start + self.CHUNK_SIZE + overlap]
+            if not self._case_sensitive:
+                data = data.lower()  # ASCII only
+            # one char per byte, matched by latin-1 decoded UTF-8 keywords
+            yield data.decode('latin-1')
+
+    def _get_automaton(self, is_str):
+        automaton = self._automatons.get(is_str)
+        if automaton is None:
+            words = {}
+            for i in self._literals:
+                word = self._keywords[i]
+                if not self._case_sensitive:
+                    word = word.lower()
+                if not is_str:
+                    word = word.encode().decode('latin-1')
+                words.setdefault(word, []).append(i)
+            automaton = ahocorasick.Automaton()
+            for word, indexes in words.items():
+                automaton.add_word(word, indexes)
+            automaton.make_automaton()
+            self._automatons[is_str] = automaton
+        return automaton
+
+    def _search_regexes(self, text, hits):
+        is_str = isinstance(text, str)
+        remaining = [i for i in self._regexes if i not in hits]
+        pos = 0
+        while remaining:
+            pattern = self._compile(tuple(remaining), is_str)
+            if pattern is None:  # not combinable, search one by one
+                hits.update(i for i in remaining if self._compile(
+                    (i,), is_str).search(text))
+                return
+
+            matched = pattern.search(text, pos)
+            if matched is None:
+                return
+            # keywords hidden behind the matched alternative at this position
+            pos = matched.start()
+            found = {i for i in remaining
+                     if self._compile((i,), is_str).match(text, pos)}
+            hits.update(found)
+            if found and not self._match_all:
+                return
+            remaining = [i for i in remaining if i not in found]
+            pos += 1
+
+    def _compile(self, indexes, is_str):
+        """Compile the alternation of keywords, None if not combinable."""
+        key = (indexes, is_str)
+        if key not in self._patterns:
+            flags = self.FLAGS | (0 if self._case_sensitive else re.IGNORECASE)
+            if len(indexes) == 1:
+                source = self._keywords[indexes[0]]
+            else:
+                source = '|'.join('(?:{})'.format(self._keywords[i])
+                                  for i in indexes)
+            try:
+                self._patterns[key] = re.compile(
+                    source if is_str else source.encode(), flags)
+            except re.error:
+                if len(indexes) == 1:
+                    raise
+                self._patterns[key] = None
+        return self._patterns[key]
+
+    def finditer(self, text):
+        """Yield (start, end, keyword index) of non-overlapping matches of
+        any keyword."""
+        is_str = isinstance(text, str)
+        indexes = tuple(range(len(self._keywords)))
+        pattern = None if self._isolated else self._compile(indexes, is_str)
+        if pattern is None:
+            matches = sorted(
+                (m.start(), -m.end(), i) for i in indexes
+                for m in self._compile((i,), is_str).finditer(text))
+            end = 0
+            for start, neg_end, i in matches:
+                if start >= end:
+                    end = -neg_end
+                    yield start, end, i
+            return
+
+        for matched in pattern.finditer(text):
+            start = matched.start()
+            keyword = next((i for i in indexes if self._compile(
+                (i,), is_str).match(text, start)), indexes[0])
+            yield start, matched.end(), keyword
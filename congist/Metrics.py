@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+
+"""
+Metrics collects counters, gauges and histograms of a run and exposes them
+in Prometheus text format, as a textfile or on a /metrics endpoint.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from congist.utils import File
+
+
+class Metrics:
+    PREFIX = 'congist_'
+    ADDRESS = '127.0.0.1'  # of /metrics, local only by default
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30,
+               60, 300)
+    COUNTER = 'counter'
+    GAUGE = 'gauge'
+    HISTOGRAM = 'histogram'
+    DEFINITIONS = {
+        'http_request_duration_seconds':
+            (HISTOGRAM, "Latency of GitHub requests by endpoint"),
+        'rate_limit_remaining':
+            (GAUGE, "Requests remaining in the GitHub rate limit window"),
+        'rate_limit_limit':
+            (GAUGE, "Requests allowed in the GitHub rate limit window"),
+        'rate_limit_reset_timestamp_seconds':
+            (GAUGE, "Time when the GitHub rate limit window resets"),
+        'git_command_duration_seconds':
+            (HISTOGRAM, "Duration of git subprocesses by command"),
+        'git_command_failures_total':
+            (COUNTER, "Failed git subprocesses by command"),
+        'phase_duration_seconds':
+            (GAUGE, "Duration of the last run's phases"),
+        'gists_total':
+            (COUNTER, "Gists processed by sync phase"),
+        'gist_failures_total':
+            (COUNTER, "Gists failed by sync phase"),
+        'index_gists':
+            (GAUGE, "Gists in the local index"),
+        'mirror_polls_total':
+            (COUNTER, "Polls of gist listings by result"),
+        'mirror_interval_seconds':
+            (GAUGE, "Current polling interval of each account"),
+        'last_run_timestamp_seconds':
+            (GAUGE, "Time when the last run of a command finished"),
+        'last_run_success':
+            (GAUGE, "Whether the last run of a command succeeded"),
+    }
+
+    _lock = threading.Lock()
+    _values = {}  # name -> {labels: value}
+    _server = None
+
+    @staticmethod
+    def _key(labels):
+        return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    @staticmethod
+    def inc(name, value=1, **labels):
+        key = Metrics._key(labels)
+        with Metrics._lock:
+            values = Metrics._values.setdefault(name, {})
+            values[key] = values.get(key, 0) + value
+
+    @staticmethod
+    def set(name, value, **labels):
+        with Metrics._lock:
+            Metrics._values.setdefault(name, {})[Metrics._key(labels)] = value
+
+    @staticmethod
+    def observe(name, value, **labels):
+        key = Metrics._key(labels)
+        with Metrics._lock:
+            values = Metrics._values.setdefault(name, {})
+            histogram = values.get(key)
+            if histogram is None:
+                histogram = values[key] = [[0] * len(Metrics.BUCKETS), 0, 0]
+            for i, bound in enumerate(Metrics.BUCKETS):
+                if value <= bound:
+                    histogram[0][i] += 1
+                    break
+            histogram[1] += value
+            histogram[2] += 1
+
+    @staticmethod
+    @contextmanager
+    def timer(name, **labels):
+        """Observe(or set for a gauge) the duration of the block."""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            duration = time.monotonic() - start
+            if Metrics.DEFINITIONS[name][0] == Metrics.HISTOGRAM:
+                Metrics.observe(name, duration, **labels)
+            else:
+                Metrics.set(name, duration, **labels)
+
+    @staticmethod
+    def _format_labels(key, extra=()):
+        pairs = list(key) + list(extra)
+        if not pairs:
+            return ""
+        escaped = ('{}="{}"'.format(k, v.replace('\\', '\\\\')
+                                    .replace('"', '\\"')
+                                    .replace('\n', '\\n'))
+                   for k, v in pairs)
+        return "{" + ",".join(escaped) + "}"
+
+    @staticmethod
+    def render():
+        """Return all metrics in Prometheus text format."""
+        lines = []
+        with Metrics._lock:
+            for name in sorted(Metrics._values):
+                metric_type, help_text = Metrics.DEFINITIONS[name]
+                full_name = Metrics.PREFIX + name
+                lines.append("# HELP {} {}".format(full_name, help_text))
+                lines.append("# TYPE {} {}".format(full_name, metric_type))
+                for key, value in sorted(Metrics._values[name].items()):
+                    if metric_type != Metrics.HISTOGRAM:
+                        lines.append("{}{} {}".format(
+                            full_name, Metrics._format_labels(key), value))
+                        continue
+
+                    buckets, total, count = value
+                    cumulative = 0
+                    for bound, num in zip(Metrics.BUCKETS, buckets):
+                        cumulative += num
+                        lines.append("{}_bucket{} {}".format(
+                            full_name, Metrics._format_labels(
+                                key, [('le', str(bound))]), cumulative))
+                    lines.append("{}_bucket{} {}".format(
+                        full_name, Metrics._format_labels(
+                            key, [('le', '+Inf')]), count))
+                    labels = Metrics._format_labels(key)
+                    lines.append("{}_sum{} {}".format(full_name, labels,
+                                                      total))
+                    lines.append("{}_count{} {}".format(full_name, labels,
+                                                        count))
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def write_textfile(path):
+        # the collector must never read a partial file
+        with File.atomic_open(path) as f:
+            f.write(Metrics.render())
+
+    @staticmethod
+    def serve(port, address=ADDRESS):
+        """Serve /metrics in a background thread while the process runs."""
+        if Metrics._server is not None:
+            return
+        Metrics._server = ThreadingHTTPServer((address, port),
+                                              _MetricsHandler)
+        threading.Thread(target=Metrics._server.serve_forever,
+                         daemon=True).start()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != '/metrics':
+            self.send_error(404)
+            return
+        body = Metrics.render().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # keep command output clean
+        pass
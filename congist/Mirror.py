@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+"""
+Poller keeps an account's gist listing under watch for the mirror, with
+conditional requests and an interval adapted to the account's activity and
+remaining rate limit.
+"""
+
+import time
+
+
+class Poller:
+    SPEEDUP = 0.5  # interval factor after changes
+    BACKOFF = 1.5  # interval factor after quiet polls
+    TIME_SUFFIX = 'Z'  # index times are UTC without the suffix
+
+    def __init__(self, agent, known, min_interval, max_interval,
+                 full_interval, reserve):
+        """known maps ids of mirrored gists to their updated times."""
+        self._agent = agent
+        self._known = known
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._full_interval = full_interval
+        self._reserve = reserve
+        self._etag = None
+        self._failed = {}  # id -> updated time of gists failed to pull
+        self._last_full = time.monotonic() if known else None
+        self.interval = min_interval
+        self.next_time = 0
+
+    @property
+    def agent(self):
+        return self._agent
+
+    @property
+    def known(self):
+        return self._known
+
+    def _since(self):
+        if not self._known:
+            return None
+        # no later than failed gists so that they are listed again
+        return min([max(self._known.values()), *self._failed.values()]) + \
+            self.TIME_SUFFIX
+
+    def poll(self):
+        """Return (changed gists, ids of removed gists) since the last
+        poll. Removals are found by a full listing only, once per full
+        interval."""
+        now = time.monotonic()
+        if self._last_full is None or \
+                now - self._last_full >= self._full_interval:
+            gists = list(self._agent.get_gists())
+            ids = {gist.id for gist in gists}
+            removed = [i for i in self._known if i not in ids]
+            self._last_full = now
+        else:
+            gists, self._etag = self._agent.poll_gists(self._since(),
+                                                       self._etag)
+            removed = []
+        changed = [gist for gist in gists or ()
+                   if self._known.get(gist.id) != gist.updated]
+        return changed, removed
+
+    def done(self, gist):
+        self._known[gist.id] = gist.updated
+        self._failed.pop(gist.id, None)
+
+    def remove(self, gist_id):
+        self._known.pop(gist_id, None)
+        self._failed.pop(gist_id, None)
+
+    def retry(self, gist):
+        """Make the next polls list the gist again after a failed pull,
+        which neither an unchanged ETag nor a later since should hide."""
+        self._failed[gist.id] = gist.updated
+        self._etag = None
+
+    def schedule(self, changed):
+        """Poll sooner after changes, later after quiet polls, and never so
+        often that the rate limit window runs below the reserve."""
+        if changed:
+            interval = self.interval * self.SPEEDUP
+        else:
+            interval = self.interval * self.BACKOFF
+        interval = min(max(interval, self._min_interval), self._max_interval)
+        remaining, reset = getattr(self._agent, 'rate_limit', (None, None))
+        if remaining is not None:
+            window = max(reset - time.time(), 0)
+            interval = max(interval, window / max(
+                remaining - self._reserve, 1))
+        self.interval = interval
+        self.next_time = time.monotonic() + interval
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+
+"""
+Shell completion of hosts, users, gist ids, tags and file names.
+
+Candidates come from a cache of sorted lines written along with the local
+index. This module imports nothing beyond the interpreter's startup modules
+(not even json), so that it answers in milliseconds when run as a script:
+
+    python3 -S congist/completion.py KIND [PREFIX]
+"""
+
+import os
+import sys
+from bisect import bisect_left
+
+CACHE_ENV = 'CONGIST_COMPLETION_CACHE'
+DEFAULT_CACHE = '~/.cache/congist/completion.txt'
+KINDS = ('hosts', 'users', 'ids', 'tags', 'files')
+SECTION_MARK = '\x1d'  # starts "<mark>host kind" lines
+
+BASH_SCRIPT = r'''
+_congist_complete() {
+    local cur word kind i
+    cur="${COMP_WORDS[COMP_CWORD]}"
+    if [ "$COMP_CWORD" -eq 1 ]; then
+        COMPREPLY=($(compgen -W "%(commands)s" -- "$cur"))
+        return
+    fi
+    for ((i = COMP_CWORD - 1; i > 1; i--)); do
+        word="${COMP_WORDS[i]}"
+        [[ "$word" == -* ]] && break
+    done
+    case "$word" in
+        -H|--host) kind=hosts ;;
+        -u|--user) kind=users ;;
+        -i|--id) kind=ids ;;
+        -t|--tags) kind=tags ;;
+        -f|--file-name) kind=files ;;
+        *) return ;;
+    esac
+    local IFS=$'\n'
+    COMPREPLY=($(%(command)s "$kind" "$cur" 2>/dev/null))
+}
+complete -o default -F _congist_complete %(programs)s
+'''
+
+ZSH_SCRIPT = r'''
+_congist() {
+    local word kind i
+    local -a candidates
+    if (( CURRENT == 2 )); then
+        compadd -- %(commands)s
+        return
+    fi
+    for (( i = CURRENT - 1; i > 2; i-- )); do
+        word=${words[i]}
+        [[ $word == -* ]] && break
+    done
+    case $word in
+        -H|--host) kind=hosts ;;
+        -u|--user) kind=users ;;
+        -i|--id) kind=ids ;;
+        -t|--tags) kind=tags ;;
+        -f|--file-name) kind=files ;;
+        *) _files; return ;;
+    esac
+    candidates=("${(@f)$(%(command)s --describe $kind "$PREFIX" \
+        2>/dev/null)}")
+    _describe $kind candidates
+}
+compdef _congist %(programs)s
+'''
+
+SCRIPTS = {'bash': BASH_SCRIPT, 'zsh': ZSH_SCRIPT}
+PROGRAMS = "congist congist.sh"
+
+
+def cache_path(path=None):
+    return os.path.expanduser(path or os.getenv(CACHE_ENV) or DEFAULT_CACHE)
+
+
+def build_section(index):
+    """Build sorted candidates of a host from its index of gist attributes
+    by user, ids followed by a tab and the description."""
+    gists = [gist for user_gists in index.values() for gist in user_gists]
+    return {
+        'users': sorted(index),
+        'ids': sorted("{}\t{}".format(gist['id'], _clean(
+            gist['description'] or "")) for gist in gists),
+        'tags': sorted({_clean(tag) for gist in gists
+                        for tag in gist['tags']}),
+        'files': sorted({_clean(name) for gist in gists
+                         for name in gist['files']}),
+    }
+
+
+def _clean(text):
+    return text.replace('\n', ' ').replace('\t', ' ')
+
+
+def load(path=None):
+    """Return {host: {kind: sorted lines}} of the cache."""
+    cache = {}
+    try:
+        with open(cache_path(path), 'r', encoding='utf-8') as f:
+            content = f.read()
+    except OSError:
+        return cache
+
+    lines = None
+    for line in content.split('\n'):
+        if line.startswith(SECTION_MARK):
+            host, _, kind = line[1:].partition(' ')
+            lines = cache.setdefault(host, {}).setdefault(kind, [])
+        elif line and lines is not None:
+            lines.append(line)
+    return cache
+
+
+def dump(cache, f):
+    for host, section in sorted(cache.items()):
+        for kind, lines in sorted(section.items()):
+            f.write("{}{} {}\n".format(SECTION_MARK, host, kind))
+            for line in lines:
+                f.write(line + "\n")
+
+
+def lookup(cache, kind, prefix=""):
+    """Return sorted (candidate, description) pairs starting with prefix."""
+    if kind not in KINDS:
+        raise ValueError("unknown kind: " + kind)
+
+    if kind == 'hosts':
+        return [(host, "") for host in sorted(cache)
+                if host.startswith(prefix)]
+
+    candidates = {}
+    for section in cache.values():
+        lines = section.get(kind, [])
+        for i in range(bisect_left(lines, prefix), len(lines)):
+            if not lines[i].startswith(prefix):
+                break
+            candidate, _, description = lines[i].partition('\t')
+            candidates.setdefault(candidate, description)
+    return sorted(candidates.items())
+
+
+def script(shell, commands, cache=None, programs=PROGRAMS):
+    """Return the completion script which runs this module by the current
+    interpreter, skipping site initialization."""
+    command = '{}="{}" "${{CONGIST_PYTHON:-{}}}" -S "{}"'.format(
+        CACHE_ENV, cache_path(cache), sys.executable,
+        os.path.abspath(__file__))
+    return SCRIPTS[shell] % {'commands': " ".join(commands),
+                             'programs': programs, 'command': command}
+
+
+def main(argv):
+    describe = argv[:1] == ['--describe']
+    if describe:
+        argv = argv[1:]
+    if not argv or argv[0] not in KINDS:
+        print("usage: completion.py [--describe] {} [PREFIX]".format(
+            "|".join(KINDS)), file=sys.stderr)
+        return 2
+
+    prefix = argv[1] if len(argv) > 1 else ""
+    for candidate, description in lookup(load(), argv[0], prefix):
+        if describe:  # zsh _describe format
+            candidate = candidate.replace(':', '\\:')
+            if description:
+                candidate += ':' + description
+        print(candidate)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -5,7 +5,7 @@
 Command-line client for Congist.
 """
 
-from os.path import expanduser, dirname, abspath, join
+from os.path import expanduser, dirname, abspath, join, relpath, getsize
 import sys
 import traceback
 from argparse import ArgumentParser, ArgumentTypeError
@@ -14,6 +14,7 @@ import yaml
 from congist.Congist import Congist, Gist, ConfigurationError, ParameterError
 from congist import __version__
 from congist.utils import File
+from congist import completion
 
 
 def _get_output(args):
@@ -29,6 +30,15 @@ def _confirm(gist, action, is_file=False):
     print("skip", action)
     return False
 
+
+def _dedup(congist, args):
+    saved, unlinked = congist.dedup(**vars(args))
+    if unlinked:
+        print("{} duplicate file(s) not deduplicated: the filesystem does "
+              "not support reflinks(copy-on-write)".format(unlinked))
+    if args.verbose:
+        print("deduplicated files:", saved, "bytes")
+
 # ============Command Argument Parse============
 parser = ArgumentParser(description='Construct your gists')
 subparsers = parser.add_subparsers(dest='subcommand')
@@ -56,11 +66,45 @@ def str2bool(val):
         return False
     raise ArgumentTypeError('Boolean value(T/F, Y/N, 1/0) expected')
 
+
+def str2size(val):
+    units = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+    try:
+        if val[-1:].upper() in units:
+            return int(float(val[:-1]) * units[val[-1].upper()])
+        return int(val)
+    except ValueError:
+        raise ArgumentTypeError('Size(e.g. 4096, 64K, 10M) expected')
+
+
+def str2range(val):
+    """Parse A-B(inclusive), A- or -N(last N bytes) to [start, end)."""
+    start, sep, end = val.partition('-')
+    try:
+        if sep and not start:
+            return -int(end), None
+        if sep and int(start) >= 0 and (not end or int(end) >= int(start)):
+            return int(start), int(end) + 1 if end else None
+    except ValueError:
+        pass
+    raise ArgumentTypeError('Byte range(A-B, A- or -N) expected')
+
+
+def positive_int(val):
+    try:
+        if int(val) > 0:
+            return int(val)
+    except ValueError:
+        pass
+    raise ArgumentTypeError('Positive integer expected')
+
 sys_flags = (
     argument('-v', '--verbose', action='store_true',
              help='verbose output'),
     argument('-L', '--local-base', metavar='PATH',
-             help='specify local base directory'))
+             help='specify local base directory'),
+    argument('--metrics-file', metavar='PATH',
+             help='write Prometheus metrics of the run to the file'))
 
 filter_flags = (
     argument('-E', '--exact', action='store_true',
@@ -68,15 +112,30 @@ filter_flags = (
     argument('-S', '--case-sensitive', action='store_true',
              help='case sensitive when match'))
 
-read_options = (
+output_options = (
     argument('-o', '--output', metavar='PATH',
-             help='specify output file'),
+             help='specify output file'),)
+
+dry_run_options = (
+    argument('-n', '--dry-run', action='store_true',
+             help='dry run'),)
+
+read_options = (
+    *output_options,
     argument('-l', '--local', action='store_true',
-             help='get info from local instead of remote'))
+             help='get info from local instead of remote'),
+    argument('-y', '--hybrid', action='store_true',
+             help='read content from up-to-date local clones, '
+             'remote otherwise(with -l: list from local index)'))
+
+query_options = (
+    argument('--sort', choices=Gist.SORTS,
+             help='sort latest/largest first, descriptions in order'),
+    argument('--limit', metavar='N', type=positive_int,
+             help='output the first N only'))
 
 write_options = (
-    argument('-n', '--dry-run', action='store_true',
-             help='dry run'),
+    *dry_run_options,
     argument('--force', action='store_true',
              help='perform operations without confirmation'))
 
@@ -118,12 +177,26 @@ file_specifiers = (
 file_filters = (
     *file_specifiers,
     *gist_filters,
-    argument('-k', '--keyword', metavar='REGEX',
-             help='filter by keyword'))
+    argument('-k', '--keyword', action='append', metavar='REGEX',
+             help='filter by keyword, repeat for more(all of them unless '
+             '--any)'),
+    argument('--any', action='store_true',
+             help='match any of the keywords instead of all'),
+    argument('--max-size', metavar='SIZE', type=str2size,
+             help='filter by maximum file size(e.g. 64K)'),
+    argument('--min-size', metavar='SIZE', type=str2size,
+             help='filter by minimum file size(e.g. 1M)'),
+    argument('--budget', metavar='SIZE', type=str2size,
+             help='limit bytes fetched for keyword search(e.g. 100M)'))
 
 GIST_DEFAULT_FORMAT = "adp"
 
 
+def _check_history(args):
+    if args.history and not args.keyword:
+        raise ParameterError("Please specify the keyword to search history")
+
+
 def format_help():
     help_msg = ""
     for k, val in Gist.format_map().items():
@@ -131,32 +204,44 @@ def format_help():
     return help_msg + "empty: all of above, default: " + GIST_DEFAULT_FORMAT
 
 
-@subcommand(*sys_flags, *read_options, *file_filters,
+@subcommand(*sys_flags, *read_options, *file_filters, *query_options,
             argument('-F', '--format', nargs="?",
                      default=GIST_DEFAULT_FORMAT,
-                     help="format of list (" + format_help() + ")"))
+                     help="format of list (" + format_help() + ")"),
+            argument('--history', action='store_true',
+                     help='match keywords in any revision of local clones'))
 def lists(congist, args):
     """List all filtered gists with the given format."""
+    _check_history(args)
     output = _get_output(args)
     fmt = args.format
     try:
         for gist in congist.get_gists(**vars(args)):
             print(gist.get_info(fmt), file=output)
+            if args.history and args.verbose:
+                print("revision {} at {}".format(
+                    gist.revision, gist.revision_time), file=output)
     except KeyError as e:
         raise ParameterError("unsupported format: {}\n{}"
                              .format(e, format_help()))
 
 
-@subcommand(*sys_flags, *read_options, *file_filters)
+@subcommand(*sys_flags, *read_options, *file_filters, *query_options)
 def info(congist, args):
-    """Print all filtered gists' info in JSON format."""
+    """Print all filtered gists' info in JSON format, by user unless
+    sorted."""
     congist.generate_index(_get_output(args), **vars(args))
 
 
-@subcommand(*sys_flags)
+@subcommand(*sys_flags,
+            argument('--from-local', action='store_true',
+                     help='rebuild from local clones without network'))
 def index(congist, args):
     """Dump all gists' info in JSON format to an index file."""
-    congist.generate_full_index(**vars(args))
+    if args.from_local:
+        congist.generate_local_index(**vars(args))
+    else:
+        congist.generate_full_index(**vars(args))
 
 
 @subcommand(*sys_flags, *write_options, *file_filters,
@@ -165,7 +250,21 @@ def index(congist, args):
             argument('-U', '--upload', action='store_true',
                      help='upload gists only'),
             argument('--ssh', action='store_true',
-                     help='clone via SSH instead HTTPS'))
+                     help='clone via SSH instead HTTPS'),
+            argument('-l', '--local', action='store_true',
+                     help='list gists from local index instead of remote'),
+            argument('--api', action='store_true',
+                     help='upload small text changes via API instead git'),
+            argument('--dedup', action='store_true',
+                     help='deduplicate local clones after sync'),
+            argument('--depth', metavar='N', type=int,
+                     help='clone only latest N revisions(0: full)'),
+            argument('--filter', metavar='FILTER-SPEC',
+                     help='partial clone filter, e.g. blob:none'),
+            argument('--deepen', action='store_true',
+                     help='fetch full history of shallow clones'),
+            argument('--resume', action='store_true',
+                     help='resume the last sync, skipping finished gists'))
 def sync(congist, args):
     """Refresh/synchronize gists."""
     if args.download:
@@ -174,22 +273,108 @@ def sync(congist, args):
         congist.upload_gists(**vars(args))
     else:
         congist.sync_gists(**vars(args))
-        if not args.dry_run:
+        if not args.dry_run and not args.local:  # refresh from remote
             congist.generate_full_index(**vars(args))
+    if args.dedup or congist.dedup_on_sync:
+        _dedup(congist, args)
 
 
-@subcommand(*sys_flags, *read_options, *file_filters)
+@subcommand(*sys_flags, *user_specifiers,
+            argument('--ssh', action='store_true',
+                     help='clone via SSH instead HTTPS'),
+            argument('--once', action='store_true',
+                     help='poll each account once and exit'),
+            argument('--port', metavar='PORT', type=positive_int,
+                     help='serve Prometheus metrics on the port'))
+def mirror(congist, args):
+    """Keep local clones and index fresh by polling gist listings."""
+    try:
+        congist.mirror(**vars(args))
+    except KeyboardInterrupt:
+        pass
+
+
+@subcommand(argument('action', choices=('export', 'import'),
+                     help='export local clones or import them'),
+            argument('snapshot_path', metavar='PATH',
+                     help='snapshot archive(.tar, .tar.gz, .tar.xz...)'),
+            *sys_flags, *user_specifiers, *dry_run_options,
+            argument('--force', action='store_true',
+                     help='replace existing index and manifest on import'),
+            argument('--no-pull', action='store_true',
+                     help='skip pulling gists changed since the export'))
+def snapshot(congist, args):
+    """Export/import local clones as git bundles for a new machine."""
+    if args.action == 'export':
+        done, skipped = congist.export_snapshot(args.snapshot_path,
+                                                **vars(args))
+        print("exported {} clone(s), skipped {}".format(done, skipped))
+    else:
+        done, skipped = congist.import_snapshot(args.snapshot_path,
+                                                **vars(args))
+        print("imported {} clone(s), skipped {}".format(done, skipped))
+
+
+@subcommand(*sys_flags, *user_specifiers, *output_options, *dry_run_options,
+            argument('--report', action='store_true',
+                     help='report duplicate files only'))
+def dedup(congist, args):
+    """Deduplicate identical files and git objects among local gists."""
+    if args.report:
+        output = _get_output(args)
+        for paths in congist.find_duplicates(**vars(args)):
+            print("{} x {}:".format(getsize(paths[0]), len(paths)),
+                  file=output)
+            for path in paths:
+                print("    " + path, file=output)
+        return
+
+    _dedup(congist, args)
+
+
+@subcommand(*sys_flags, *read_options, *file_filters, *query_options,
+            argument('--head', metavar='N', type=positive_int,
+                     help='read the first N lines only'),
+            argument('--tail', metavar='N', type=positive_int,
+                     help='read the last N lines only'),
+            argument('--bytes', metavar='A-B', type=str2range,
+                     help='read the byte range only(A-B, A- or -N)'),
+            argument('--revision', metavar='REV',
+                     help='read files as of a commit of local clones'),
+            argument('--history', action='store_true',
+                     help='read the newest versions matching keywords in '
+                     'any revision of local clones'))
 def read(congist, args):
     """Read filtered gists."""
+    _check_history(args)
     output = _get_output(args)
-    for f in congist.get_files(**vars(args)):
-        content = f.content
+    if args.head or args.tail or args.bytes:
+        for f, part in congist.read_parts(**vars(args)):
+            if args.verbose:
+                print("====={}======".format(f.name), flush=True)
+            File.write(output, part)
+        return
+
+    for f in congist.read_files(**vars(args)):
         if args.verbose:
-            print("====={}======".format(f.name))
-        if isinstance(content, str):
-            output.write(content)
-        else:
-            output.buffer.write(content)
+            print("====={}======".format(f.name), flush=True)
+        f.write_to(output)
+
+
+@subcommand(*sys_flags, *read_options, *file_filters)
+def grep(congist, args):
+    """Search local gist files by keyword in parallel."""
+    output = _get_output(args)
+    for gist_file, matches in congist.grep_files(**vars(args)):
+        path = relpath(gist_file.path, congist.local_base)
+        for m in matches:
+            if len(args.keyword) > 1:  # tell which keyword hit
+                print("{}:{}:{}:{}:{}".format(path, m.line, m.offset,
+                                              m.keyword, m.text),
+                      file=output)
+            else:
+                print("{}:{}:{}:{}".format(path, m.line, m.offset, m.text),
+                      file=output)
 
 
 @subcommand(*sys_flags, *write_options, *file_filters,
@@ -220,13 +405,19 @@ def update(congist, args):
 
 @subcommand(argument('new_tags', metavar='TAG', nargs='*',
                      help='new gist tags'),
-            *sys_flags, *read_options, *write_options, *file_filters)
+            *sys_flags, *read_options, *write_options, *file_filters,
+            argument('--counts', action='store_true',
+                     help='list tags with their gist counts'))
 def tag(congist, args):
-    """Set/get tags for filtered gists"""
+    """Set/get tags for filtered gists(TAG* to match tag prefix)"""
     if args.new_tags:
         for gist in congist.get_gists(**vars(args)):
             if args.force or _confirm(gist, "set tag"):
                 gist.set_tags(args.new_tags)
+    elif args.counts:
+        output = _get_output(args)
+        for t, count in congist.count_tags(**vars(args)).most_common():
+            print("{}: {}".format(t, count), file=output)
     else:
         tags = congist.list_tags(**vars(args))
         print(", ".join(tags), file=_get_output(args))
@@ -248,9 +439,18 @@ def star(congist, args):
 
 @subcommand(argument('file_paths', metavar='PATH', nargs='*',
                      help='file path(stdin if absent)'),
-            *sys_flags, *write_options, *file_specifiers)
+            *sys_flags, *write_options, *file_specifiers,
+            argument('-B', '--bulk', action='store_true',
+                     help='create a gist per file under directories or '
+                          'per entry of manifest files(resumable)'))
 def create(congist, args):
     """Create gist from input files."""
+    if args.bulk:
+        created, failed = congist.bulk_create(args.file_paths, **vars(args))
+        if args.verbose:
+            print("created {} gist(s), failed {}".format(created, failed))
+        return
+
     gist = congist.create_gist(args.file_paths, **vars(args))
     if args.verbose:
         print("created gist successfully" if gist
@@ -269,6 +469,26 @@ def delete(congist, args):
             obj.delete()
 
 
+@subcommand(argument('kind', metavar='KIND',
+                     choices=sorted(completion.SCRIPTS) +
+                     list(completion.KINDS),
+                     help='shell(bash, zsh) to print its completion '
+                          'script, or kind of candidates({})'.format(
+                              ", ".join(completion.KINDS))),
+            argument('prefix', metavar='PREFIX', nargs='?', default="",
+                     help='prefix of candidates'))
+def complete(congist, args):
+    """Print shell completion script or candidates from the cache."""
+    if args.kind in completion.SCRIPTS:
+        print(completion.script(args.kind, sorted(subparsers.choices),
+                                congist.completion_cache))
+        return
+
+    cache = completion.load(congist.completion_cache)
+    for candidate, _ in completion.lookup(cache, args.kind, args.prefix):
+        print(candidate)
+
+
 @subcommand()
 def version():
     """Show the version of Congist."""
@@ -298,7 +518,13 @@ def main():
                 if value is not None:
                     config[key] = value
 
-            args.function(Congist(config), args)
+            congist = Congist(config)
+            success = False
+            try:
+                args.function(congist, args)
+                success = True
+            finally:
+                congist.export_metrics(args.subcommand, success)
 
 if __name__ == '__main__':
     exit_code = 1
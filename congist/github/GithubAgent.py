@@ -4,6 +4,8 @@
 GithubAgent represents a Github agent.
 """
 
+import re
+
 from congist.GistAgent import GistAgent
 
 from congist.github.GithubSession import GithubSession
@@ -11,9 +13,14 @@ from congist.github.GithubSession import GithubSession
 
 class GithubAgent(GistAgent):
     BASE_URL = "https://api.github.com"
+    SESSION_TYPE = GithubSession
+    RAW_URL = "https://gist.githubusercontent.com/{user}/{id}/raw/" \
+        "{revision}/{name}"
+    PULL_URL_PATTERN = re.compile(
+        r'gist\.github\.com[:/](?:[\w-]+/)?([0-9a-f]+)(?:\.git)?/?$')
 
     def __init__(self, gist_user):
-        self._session = GithubSession(gist_user, self.BASE_URL)
+        self._session = self.SESSION_TYPE(gist_user, self.BASE_URL)
         self._gist_user = gist_user
 
     @property
@@ -33,8 +40,44 @@ class GithubAgent(GistAgent):
     def gist_user(self):
         return self._gist_user
 
-    def get_gists(self):
-        yield from self._session.get_gists()
+    @property
+    def rate_limit(self):
+        return self._session.rate_limit
+
+    @property
+    def orders(self):
+        return self._session.ORDERS
+
+    def get_gists(self, order=None):
+        yield from self._session.get_gists(order)
+
+    def gist_id(self, pull_url):
+        """Return the id of the gist cloned from pull_url(HTTPS or SSH),
+        None if it is not a gist of this host."""
+        matched = self.PULL_URL_PATTERN.search(pull_url)
+        return matched.group(1) if matched else None
+
+    def api_url(self, gist_id):
+        return self.BASE_URL + '/gists/' + gist_id
+
+    def raw_url(self, gist_id, revision, name):
+        return self.RAW_URL.format(user=self.username, id=gist_id,
+                                   revision=revision, name=name)
+
+    def poll_gists(self, since=None, etag=None):
+        return self._session.poll_gists(since, etag)
 
     def create_gist(self, files, desc="", public=False):
         return self._session.create_gist(desc, files, public)
+
+    def update_gist(self, gist, files):
+        return self._session.update(gist, files=files)
+
+    def get_content(self, gist_file):
+        return self._session.get_content(gist_file)
+
+    def write_content(self, gist_file, output):
+        self._session.write_content(gist_file, output)
+
+    def get_range(self, gist_file, start, end=None):
+        return self._session.get_range(gist_file, start, end)
@@ -83,6 +83,25 @@ class GithubGist(Gist):
         assert isinstance(gist_file, GistFile), gist_file
         return self._session.get_content(gist_file)
 
+    def write_content(self, gist_file, output):
+        assert isinstance(gist_file, GistFile), gist_file
+        self._session.write_content(gist_file, output)
+
+    def get_range(self, gist_file, start, end=None):
+        assert isinstance(gist_file, GistFile), gist_file
+        return self._session.get_range(gist_file, start, end)
+
+    def hydrate(self, gist_files):
+        """Load content of the text files from one gist request, except
+        for those truncated by the API(fetched raw later)."""
+        entries = self._session.get_gist_files(self)
+        for gist_file in gist_files:
+            entry = entries.get(gist_file.name)
+            if gist_file.binary or not entry or entry.get('truncated') or \
+                    entry.get('content') is None:
+                continue
+            gist_file.cache_content(entry['content'])
+
     def update_file(self, gist_file, name, content=None):
         assert isinstance(gist_file, GistFile), gist_file
         attr = {}
@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+
+"""
+GithubGraphqlAgent represents a Github agent which lists gists in bulk
+through the GraphQL API.
+"""
+
+from congist.github.GithubAgent import GithubAgent
+from congist.github.GithubGraphqlSession import GithubGraphqlSession
+
+
+class GithubGraphqlAgent(GithubAgent):
+    SESSION_TYPE = GithubGraphqlSession
+
+    @property
+    def host(self):
+        return 'github'
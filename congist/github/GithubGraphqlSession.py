@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+"""
+Github session backed by the GraphQL API for bulk listing.
+Reference: https://docs.github.com/en/graphql/reference/objects#gist
+"""
+
+import mimetypes
+
+from congist.github.GithubSession import GithubSession
+from congist.github.GithubGist import GithubGist
+
+
+class GithubGraphqlSession(GithubSession):
+    PAGE_SIZE = 100
+    ORDER_FIELDS = {'created': 'CREATED_AT', 'updated': 'UPDATED_AT'}
+    ORDERS = tuple(ORDER_FIELDS)
+    FILE_LIMIT = 300
+    TEXT_LIMIT = 1 << 16
+    RAW_URL = "https://gist.githubusercontent.com/{user}/{id}/raw/{name}"
+    PULL_URL = "https://gist.github.com/{id}.git"
+    QUERY = """
+query($first: Int!, $after: String, $files: Int!, $text: Int!,
+      $order: GistOrderField!) {
+  viewer {
+    login
+    gists(first: $first, after: $after, privacy: ALL,
+          orderBy: {field: $order, direction: DESC}) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        name description isPublic createdAt updatedAt url viewerHasStarred
+        files(limit: $files) {
+          name size isImage text(truncate: $text)
+        }
+      }
+    }
+  }
+}
+"""
+
+    def __init__(self, gist_user, base_url):
+        super().__init__(gist_user, base_url)
+        self.GRAPHQL_URL = base_url + '/graphql'
+        self._starred = {}
+
+    def get_gists(self, order=None):
+        """Yield gists page by page, latest first by order(created by
+        default), so that consumers may stop early."""
+        order_field = self.ORDER_FIELDS[order or 'created']
+        cursor = None
+        while True:
+            data = self._query(cursor, order_field)['viewer']
+            gists = data['gists']
+            for node in gists['nodes']:
+                yield self._wrap_node(node, data['login'])
+            page = gists['pageInfo']
+            if not page['hasNextPage']:
+                return
+            cursor = page['endCursor']
+
+    def _query(self, cursor, order_field):
+        variables = {'first': self.PAGE_SIZE, 'after': cursor,
+                     'files': self.FILE_LIMIT, 'text': self.TEXT_LIMIT,
+                     'order': order_field}
+        resp = self._session.post(self.GRAPHQL_URL, json={
+            'query': self.QUERY, 'variables': variables})
+        resp.raise_for_status()
+        result = resp.json()
+        if result.get('errors'):
+            raise GraphqlError(result['errors'])
+        return result['data']
+
+    def _wrap_node(self, node, login):
+        gist_id = node['name']
+        self._starred[gist_id] = node['viewerHasStarred']
+        gist = {
+            'id': gist_id,
+            'url': self.GIST_URL + '/' + gist_id,
+            'html_url': node['url'],
+            'git_pull_url': self.PULL_URL.format(id=gist_id),
+            'git_push_url': self.PULL_URL.format(id=gist_id),
+            'description': node['description'],
+            'public': node['isPublic'],
+            'created_at': node['createdAt'],
+            'updated_at': node['updatedAt'],
+        }
+        file_entries = [self._file_attrs(f, login, gist_id)
+                        for f in node['files']]
+        return GithubGist(self, gist, file_entries)
+
+    def _file_attrs(self, f, login, gist_id):
+        name = f['name']
+        content_type = mimetypes.guess_type(name)[0]
+        if content_type is None:
+            content_type = 'image' if f['isImage'] else 'text/plain'
+        attrs = {
+            'name': name,
+            'url': self.RAW_URL.format(user=login, id=gist_id, name=name),
+            'size': f['size'],
+            'type': content_type,
+            'truncated': f['size'] > self.RAW_SIZE_LIMIT,
+        }
+        text = f['text']
+        # keep the text only if it is complete
+        if text is not None and len(text.encode()) == f['size']:
+            attrs['content'] = text
+        return attrs
+
+    def is_starred(self, gist):
+        if gist.id in self._starred:
+            return self._starred[gist.id]
+        return super().is_starred(gist)
+
+    def set_starred(self, gist, starred):
+        self._starred.pop(gist.id, None)
+        return super().set_starred(gist, starred)
+
+
+class GraphqlError(Exception):
+    """GraphQL query error"""
@@ -6,17 +6,28 @@ Reference: http://developer.github.com/v3/gists
 """
 
 import json
+import re
 import requests
+from urllib.parse import urlsplit
 
 from congist.github.GithubGist import GithubGist
 from congist.GistFile import GistFile
+from congist.utils import File
+from congist.Metrics import Metrics
 
 
 class GithubSession:
+    RAW_SIZE_LIMIT = 10 << 20  # larger files must be cloned
+    PER_PAGE = 100
+    ORDERS = ()  # the listing order is undocumented
+    ID_PATTERN = re.compile(r'/[0-9a-f]{20,40}(?=/|$)')
+
     def __init__(self, gist_user, base_url):
         username = self._username = gist_user.username
         self._session = requests.Session()
         self._session.auth = (username, gist_user.access_token)
+        self._session.hooks['response'].append(self._observe)
+        self._rate_limit = (None, None)
         self.BASE_URL = base_url
         # self.GIST_URL = base_url + '/users/' + username + '/gists'
         self.GIST_URL = base_url + '/gists'
@@ -26,9 +37,68 @@ class GithubSession:
     def username(self):
         return self._username
 
-    def get_gists(self):
-        for gist in self._session.get(self.GIST_URL).json():
-            yield self._wrap_gist(gist)
+    @property
+    def rate_limit(self):
+        """Return (remaining requests, reset time) of the last response."""
+        return self._rate_limit
+
+    def _observe(self, resp, *args, **kwargs):
+        Metrics.observe('http_request_duration_seconds',
+                        resp.elapsed.total_seconds(),
+                        method=resp.request.method,
+                        endpoint=self._endpoint(resp.url),
+                        status=resp.status_code)
+        headers = resp.headers
+        if 'X-RateLimit-Remaining' in headers:
+            resource = headers.get('X-RateLimit-Resource', 'core')
+            if resource == 'core':
+                self._rate_limit = (int(headers['X-RateLimit-Remaining']),
+                                    int(headers.get('X-RateLimit-Reset', 0)))
+            for name, header in (('rate_limit_remaining', 'Remaining'),
+                                 ('rate_limit_limit', 'Limit'),
+                                 ('rate_limit_reset_timestamp_seconds',
+                                  'Reset')):
+                value = headers.get('X-RateLimit-' + header)
+                if value is not None:
+                    Metrics.set(name, int(value), resource=resource)
+
+    def _endpoint(self, url):
+        """Return the endpoint of url with gist ids as placeholders."""
+        parts = urlsplit(url)
+        if parts.netloc != urlsplit(self.BASE_URL).netloc:
+            return 'raw'
+        return self.ID_PATTERN.sub('/{id}', parts.path)
+
+    def get_gists(self, order=None):
+        yield from self._list_gists(self.GIST_URL,
+                                    {'per_page': self.PER_PAGE})
+
+    def _list_gists(self, url, params=None):
+        while url:
+            resp = self._session.get(url, params=params)
+            resp.raise_for_status()
+            for gist in resp.json():
+                yield self._wrap_gist(gist)
+            url = resp.links.get('next', {}).get('url')
+            params = None  # kept in the next link
+
+    def poll_gists(self, since=None, etag=None):
+        """Return (gists updated at or after since, ETag of the listing),
+        None for gists if unchanged since etag(which costs no rate limit)."""
+        params = {'per_page': self.PER_PAGE}
+        if since:
+            params['since'] = since
+        headers = {'If-None-Match': etag} if etag else None
+        resp = self._session.get(self.GIST_URL, params=params,
+                                 headers=headers)
+        if resp.status_code == requests.codes.not_modified:
+            return None, etag
+        resp.raise_for_status()
+        gists = [self._wrap_gist(gist) for gist in resp.json()]
+        next_url = resp.links.get('next', {}).get('url')
+        if next_url:
+            gists.extend(self._list_gists(next_url))
+        return gists, resp.headers.get('ETag')
 
     def _wrap_gist(self, gist):
         file_entries = [self._gist_attrs(f)
@@ -41,6 +111,7 @@ class GithubSession:
             'url': f['raw_url'],
             'size': f['size'],
             'type': f['type'],
+            'truncated': f['size'] > self.RAW_SIZE_LIMIT,
         }
 
     def create_gist(self, desc, files, public):
@@ -56,6 +127,46 @@ class GithubSession:
         # TODO: check if size are correct
         return resp.content if gist_file.binary else resp.text
 
+    def write_content(self, gist_file, output):
+        assert isinstance(gist_file, GistFile), gist_file
+
+        with self._session.get(gist_file.url, stream=True) as resp:
+            resp.raise_for_status()
+            File.write_chunks(output, resp.iter_content(File.CHUNK_SIZE))
+
+    def get_gist_files(self, gist):
+        """Return file entries with content of a gist by one request."""
+        resp = self._session.get(gist.api_url)
+        resp.raise_for_status()
+        return resp.json()['files']
+
+    def get_range(self, gist_file, start, end=None):
+        assert isinstance(gist_file, GistFile), gist_file
+
+        if start < 0:  # suffix
+            byte_range = "bytes={}".format(start)
+        else:
+            byte_range = "bytes={}-{}".format(
+                start, "" if end is None else end - 1)
+        # ranges apply to the encoded content, so ask for it as is
+        headers = {'Range': byte_range, 'Accept-Encoding': 'identity'}
+        with self._session.get(gist_file.url, headers=headers,
+                               stream=True) as resp:
+            if resp.status_code == requests.codes.range_not_satisfiable:
+                return b''  # start beyond the end
+            resp.raise_for_status()
+            if resp.status_code == requests.codes.partial_content:
+                return resp.content
+            # range ignored, read no further than needed
+            if start < 0 or end is None:
+                return resp.content[start:]
+            data = bytearray()
+            for chunk in resp.iter_content(File.CHUNK_SIZE):
+                data += chunk
+                if len(data) >= end:
+                    break
+            return bytes(data[start:end])
+
     def is_starred(self, gist):
         resp = self._session.get(self.STAR_URL.format(gist.api_url))
         return resp.status_code == 204
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+
+"""
+BlobStore hashes the working trees of local clones and deduplicates them:
+identical files are reflinked(copy-on-write) and git objects are shared
+through an alternates repository, so later edits never leak across gists.
+"""
+
+import json
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from os.path import abspath, isdir, join, relpath
+
+from congist.utils import File
+from congist.Metrics import Metrics
+
+
+class BlobStore:
+    GIT_DIR = '.git'
+    CLONE_REF = 'refs/clones/'
+
+    def __init__(self, hash_file, shared_repo, local_base):
+        self._hash_file = hash_file
+        self._shared_repo = shared_repo
+        self._local_base = local_base
+        self._hashes = None
+
+    @property
+    def hashes(self):
+        """Return {path: [size, mtime_ns, digest]} of the last update."""
+        if self._hashes is None:
+            try:
+                with open(self._hash_file, 'r') as f:
+                    self._hashes = json.load(f)
+            except (OSError, ValueError):
+                self._hashes = {}
+        return self._hashes
+
+    def update(self, repo_dirs):
+        """Hash working-tree files of the given clones in parallel."""
+        old_hashes = self.hashes
+        hashes = {}
+        pending = []
+        for path, stat in self._walk(repo_dirs):
+            entry = old_hashes.get(path)
+            if entry and entry[:2] == [stat.st_size, stat.st_mtime_ns]:
+                hashes[path] = entry
+            else:
+                hashes[path] = [stat.st_size, stat.st_mtime_ns, None]
+                pending.append(path)
+        with ThreadPoolExecutor() as executor:
+            for path, digest in zip(pending,
+                                    executor.map(File.digest, pending)):
+                hashes[path][2] = digest
+        self._hashes = {p: h for p, h in hashes.items() if h[2]}
+        with File.atomic_open(self._hash_file) as f:
+            json.dump(self._hashes, f)
+        return self._hashes
+
+    def _walk(self, repo_dirs):
+        for repo_dir in repo_dirs:
+            for root, dirs, files in os.walk(repo_dir):
+                if self.GIT_DIR in dirs:
+                    dirs.remove(self.GIT_DIR)
+                for name in files:
+                    path = join(root, name)
+                    try:
+                        yield path, os.lstat(path)
+                    except OSError:
+                        continue
+
+    def duplicates(self):
+        """Return groups of identical files, most wasteful first."""
+        groups = {}
+        for path, (size, _, digest) in self.hashes.items():
+            if size:
+                groups.setdefault((digest, size), []).append(path)
+        dups = [sorted(paths) for paths in groups.values() if len(paths) > 1]
+        return sorted(dups, key=lambda paths: -self.hashes[paths[0]][0] *
+                      (len(paths) - 1))
+
+    def link(self):
+        """Reflink duplicate files to their first copy, return (saved
+        bytes, number of files left as they are)."""
+        saved = unlinked = 0
+        for paths in self.duplicates():
+            src = paths[0]
+            for dst in paths[1:]:
+                if File.reflink_replace(src, dst):
+                    saved += self.hashes[dst][0]
+                else:  # unsupported by the filesystem(or across them)
+                    unlinked += 1
+        return saved, unlinked
+
+    def share_objects(self, repo_dirs, verbose=False):
+        """Move git objects of the clones into one alternates repository."""
+        quiet = [] if verbose else ['-q']
+        if not isdir(self._shared_repo):
+            self._git(None, 'init', '--bare', *quiet, self._shared_repo)
+        shared_objects = join(abspath(self._shared_repo), 'objects')
+        shared_dirs = []
+        for repo_dir in repo_dirs:
+            # the ref keeps shared objects reachable for the clone, unique
+            # by host and user as well as the gist directory
+            ref = self.CLONE_REF + relpath(abspath(repo_dir), abspath(
+                self._local_base)).replace(os.sep, '/')
+            if self._git(self._shared_repo, 'fetch', *quiet, '--force',
+                         abspath(repo_dir), 'HEAD:' + ref):
+                shared_dirs.append(repo_dir)
+        self._git(self._shared_repo, 'repack', '-a', '-d', *quiet)
+        for repo_dir in shared_dirs:
+            alternates = join(repo_dir, self.GIT_DIR, 'objects', 'info',
+                              'alternates')
+            File.mkdir(os.path.dirname(alternates))
+            with open(alternates, 'a+') as f:
+                f.seek(0)
+                if shared_objects not in f.read().split('\n'):
+                    f.write(shared_objects + '\n')
+            if self._git(repo_dir, 'repack', '-a', '-d', '-l', *quiet):
+                self._git(repo_dir, 'prune-packed', *quiet)
+
+    @staticmethod
+    def _git(cwd, *args):
+        with Metrics.timer('git_command_duration_seconds', command=args[0]):
+            succeeded = subprocess.run(('git',) + args,
+                                       cwd=cwd).returncode == 0
+        if not succeeded:
+            Metrics.inc('git_command_failures_total', command=args[0])
+        return succeeded
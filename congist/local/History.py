@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+
+"""
+History indexes the commits of local clones(the blobs each commit changed),
+updated incrementally from the last seen HEAD, so that all revisions of
+gists are searched by reading each distinct blob once.
+"""
+
+import json
+import os
+import subprocess
+import threading
+
+from congist.utils import File, Git
+from congist.Metrics import Metrics
+
+
+class History:
+    NULL_BLOB = '0' * 40
+    COMMIT_MARK = '\x00'
+    LOG_FORMAT = '--format=%x00%H %ct'
+    # never fetch blobs left out of partial clones while searching
+    GIT_ENV = dict(os.environ, GIT_NO_LAZY_FETCH='1')
+
+    def __init__(self, index_file):
+        self._index_file = index_file
+        self._entries = None
+        self._changed = False
+        self._lock = threading.Lock()
+
+    @property
+    def entries(self):
+        """Return {local_dir: {'head': commit, 'revisions': [[commit, time,
+        {path: blob}]]}} with revisions newest first."""
+        with self._lock:
+            if self._entries is None:
+                try:
+                    with open(self._index_file, 'r') as f:
+                        self._entries = json.load(f)
+                except (OSError, ValueError):
+                    self._entries = {}
+            return self._entries
+
+    def revisions(self, local_dir):
+        """Return revisions of local_dir, indexing commits new since the
+        recorded HEAD first."""
+        head = Git.head(local_dir)
+        entry = self.entries.get(local_dir)
+        if head is None:
+            return []
+        if entry and entry['head'] == head:
+            return entry['revisions']
+
+        if entry and self._git(local_dir, 'merge-base', '--is-ancestor',
+                               entry['head'], head) is not None:
+            revisions = self._log(local_dir, entry['head'] + '..' + head) + \
+                entry['revisions']
+        else:  # new clone or rewritten history
+            revisions = self._log(local_dir, head)
+        with self._lock:
+            self._entries[local_dir] = {'head': head, 'revisions': revisions}
+            self._changed = True
+        return revisions
+
+    def _log(self, local_dir, revision_range):
+        output = self._git(local_dir, '-c', 'core.quotePath=false', 'log',
+                           self.LOG_FORMAT, '--raw', '--no-abbrev',
+                           '--no-renames', '-m', revision_range, '--')
+        revisions = []
+        for record in (output or '').split(self.COMMIT_MARK)[1:]:
+            lines = record.split('\n')
+            commit, commit_time = lines[0].split()
+            if revisions and revisions[-1][0] == commit:  # other parent
+                files = revisions[-1][2]
+            else:
+                files = {}
+                revisions.append([commit, int(commit_time), files])
+            for line in lines[1:]:
+                if not line.startswith(':'):
+                    continue
+                status, _, path = line.partition('\t')
+                blob = status.split()[3]
+                if blob != self.NULL_BLOB:  # not deleted
+                    files[path] = blob
+        return revisions
+
+    def search(self, local_dir, matcher, accept_path=None, first_only=True):
+        """Return [(commit, time, path)] of revisions(newest first) whose
+        file matched, only those of the newest matched blob if
+        first_only."""
+        places = {}  # blob -> revisions, newest blob first
+        for commit, commit_time, files in self.revisions(local_dir):
+            for path, blob in files.items():
+                if accept_path is None or accept_path(path):
+                    places.setdefault(blob, []).append(
+                        (commit, commit_time, path))
+        hits = []
+        for blob, data in self._read_blobs(local_dir, places):
+            if matcher.match(data):
+                hits.extend(places[blob])
+                if first_only:
+                    break
+        return sorted(hits, key=lambda hit: -hit[1])
+
+    def _read_blobs(self, local_dir, blobs):
+        """Yield (blob, bytes) of existing blobs through one git process,
+        whose requests are written ahead by a thread(no round trip per
+        blob)."""
+        blobs = list(blobs)
+        with subprocess.Popen(['git', 'cat-file', '--batch'], cwd=local_dir,
+                              stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                              env=self.GIT_ENV) as proc:
+            def request():
+                try:
+                    for blob in blobs:
+                        proc.stdin.write(blob.encode() + b'\n')
+                except OSError:  # git is gone after an early stop
+                    pass
+                try:
+                    proc.stdin.close()
+                except OSError:
+                    pass
+
+            writer = threading.Thread(target=request, daemon=True)
+            writer.start()
+            try:
+                for blob in blobs:
+                    header = proc.stdout.readline().split()
+                    if len(header) != 3:  # missing
+                        continue
+                    data = proc.stdout.read(int(header[2]) + 1)[:-1]
+                    if header[1] == b'blob':
+                        yield blob, data
+            finally:
+                proc.kill()
+                writer.join()
+                proc.stdout.close()
+
+    def read_blob(self, local_dir, blob):
+        return next(self._read_blobs(local_dir, [blob]), (None, b''))[1]
+
+    def resolve(self, local_dir, revision):
+        """Return (commit, time) of a revision of local_dir, None if it is
+        not a revision there."""
+        if revision.startswith('-'):  # never an option
+            return None
+        output = self._git(local_dir, 'log', '-1', '--format=%H %ct',
+                           revision, '--')
+        if not output:
+            return None
+        commit, commit_time = output.split()
+        return commit, int(commit_time)
+
+    def tree(self, local_dir, commit):
+        """Return [(path, blob, size)] of files at the commit."""
+        output = self._git(local_dir, '-c', 'core.quotePath=false',
+                           'ls-tree', '-r', '-l', commit)
+        files = []
+        for line in (output or '').splitlines():
+            info, _, path = line.partition('\t')
+            _, kind, blob, size = info.split()
+            if kind == 'blob':
+                files.append((path, blob, int(size)))
+        return files
+
+    def _git(self, local_dir, *args):
+        """Run git in local_dir, return its output, None if it failed."""
+        command = next(arg for arg in args if not arg.startswith('-') and
+                       '=' not in arg)
+        with Metrics.timer('git_command_duration_seconds', command=command):
+            result = subprocess.run(('git',) + args, cwd=local_dir,
+                                    capture_output=True, env=self.GIT_ENV)
+        if result.returncode != 0:
+            if command != 'merge-base':  # a negative answer
+                Metrics.inc('git_command_failures_total', command=command)
+            return None
+        return result.stdout.decode(errors='replace')
+
+    def save(self):
+        with self._lock:
+            if not self._changed:
+                return
+            with File.atomic_open(self._index_file) as f:
+                json.dump(self._entries, f)
+            self._changed = False
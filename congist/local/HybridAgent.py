@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+"""
+Hybrid agent which lists gists from remote(or the local index) and reads
+file content from local clones whenever they are up to date.
+"""
+
+from congist.GistAgent import GistAgent
+from congist.local.HybridGist import HybridGist
+
+
+class HybridAgent(GistAgent):
+
+    def __init__(self, remote_agent, local_agent, cached=False):
+        self._remote = remote_agent
+        self._local = local_agent
+        self._cached = cached
+
+    @property
+    def host(self):
+        return self._remote.host
+
+    @property
+    def username(self):
+        return self._remote.username
+
+    @property
+    def local_base(self):
+        return self._local.local_base
+
+    @property
+    def orders(self):
+        return () if self._cached else self._remote.orders
+
+    def get_gists(self, order=None):
+        if self._cached:
+            gists = self._local.get_gists()
+        else:
+            gists = self._remote.get_gists(order)
+        for gist in gists:
+            yield HybridGist(gist, self._remote, self.local_base)
+
+    @staticmethod
+    def gist_dir(gist):
+        return HybridGist.dir_name(gist)
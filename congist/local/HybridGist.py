@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+"""
+HybridGist wraps a remote(or indexed) gist and serves the content of files
+whose local clone is at the listed revision(or synced since the listed update
+time if the listing has no revisions) from disk.
+"""
+
+from os import stat
+from os.path import join
+
+from congist.utils import File, Git, Time
+
+from congist.Gist import Gist
+from congist.GistFile import GistFile
+from congist.local.LocalGist import LocalGist
+
+
+class HybridGist(Gist):
+    def __init__(self, gist, remote_agent, local_base):
+        self._gist = gist
+        self._remote = remote_agent
+        local_dir = join(local_base, self.dir_name(gist))
+        revision = Git.head(local_dir)
+        synced = revision and self._synced_since(local_dir, revision,
+                                                 gist.updated)
+        self._file_entries = []
+        self._fresh_files = set()
+        for f in gist.file_entries:
+            path = join(local_dir, f.name)
+            listed = Git.url_revision(f.url)
+            fresh = revision and (listed == revision if listed else
+                                  synced) and self._same_size(path, f.size)
+            if fresh:
+                self._fresh_files.add(f.name)
+            attrs = dict(f.attrs, truncated=f.truncated and not fresh)
+            self._file_entries.append(GistFile(self, attrs, path=path))
+        super().__init__(gist.username)
+
+    @staticmethod
+    def _synced_since(local_dir, revision, updated):
+        """Check whether the clone, without commits of its own, was synced
+        after the gist was last updated, for listings(e.g. GraphQL) whose
+        raw URLs carry no revision."""
+        if Git.upstream(local_dir) != revision:
+            return False
+        synced = Git.sync_time(local_dir)
+        return synced is not None and updated is not None and \
+            synced >= Time.epoch(updated)
+
+    @staticmethod
+    def _same_size(path, size):
+        # cheap guard against uncommitted local modifications
+        try:
+            return stat(path).st_size == size
+        except OSError:
+            return False
+
+    @property
+    def host(self):
+        return self._gist.host
+
+    @property
+    def id(self):
+        return self._gist.id
+
+    @property
+    def description(self):
+        return self._gist.description
+
+    @property
+    def public(self):
+        return self._gist.public
+
+    @property
+    def api_url(self):
+        return self._gist.api_url
+
+    @property
+    def html_url(self):
+        return self._gist.html_url
+
+    @property
+    def pull_url(self):
+        return self._gist.pull_url
+
+    @property
+    def push_url(self):
+        return self._gist.push_url
+
+    @property
+    def file_entries(self):
+        return self._file_entries
+
+    @property
+    def created(self):
+        return self._gist.created
+
+    @property
+    def updated(self):
+        return self._gist.updated
+
+    @property
+    def starred(self):
+        return self._gist.starred
+
+    def set_starred(self, starred):
+        self._gist.set_starred(starred)
+
+    def delete(self):
+        self._gist.delete()
+
+    def set_description(self, description):
+        self._gist.set_description(description)
+
+    def is_fresh(self, gist_file):
+        return gist_file.name in self._fresh_files
+
+    def get_content(self, gist_file):
+        assert isinstance(gist_file, GistFile), gist_file
+        if self.is_fresh(gist_file):
+            return File.read(gist_file.path, gist_file.binary)
+        return self._remote.get_content(gist_file)
+
+    def write_content(self, gist_file, output):
+        assert isinstance(gist_file, GistFile), gist_file
+        if self.is_fresh(gist_file):
+            File.copy_to(gist_file.path, output)
+        else:
+            self._remote.write_content(gist_file, output)
+
+    def get_range(self, gist_file, start, end=None):
+        assert isinstance(gist_file, GistFile), gist_file
+        if self.is_fresh(gist_file):
+            return File.read_range(gist_file.path, start, end)
+        return self._remote.get_range(gist_file, start, end)
+
+    def hydrate(self, gist_files):
+        stale = {f.name: f for f in gist_files if not self.is_fresh(f)}
+        if len(stale) < 2:  # fresh files are read locally anyway
+            return
+
+        wrapped = [f for f in self._gist.file_entries if f.name in stale]
+        self._gist.hydrate(wrapped)
+        for f in wrapped:
+            if f.loaded:
+                stale[f.name].cache_content(f.content)
+                f.release()
+
+    def update_file(self, gist_file, name, content=None):
+        return self._gist.update_file(gist_file, name, content)
+
+    def delete_file(self, gist_file):
+        return self._gist.delete_file(gist_file)
+
+    @staticmethod
+    def dir_name(gist):
+        return LocalGist.dir_name(gist)
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+
+"""
+IndexColumns keeps a user's local index in columns so that gist filters
+are evaluated as vectorized masks(with NumPy if available). The columns are
+persisted along with the rows as JSON text, decoded only when a row is
+selected, so that a later run loads them without parsing the index.
+"""
+
+import json
+import pickle
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timezone
+
+from congist.utils import File, String, Time
+from congist.Gist import Gist
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class NumpyBackend:
+    """Masks are boolean NumPy arrays."""
+
+    @staticmethod
+    def floats(values):
+        return numpy.fromiter(values, dtype=numpy.float64)
+
+    @staticmethod
+    def flags(values):
+        return numpy.fromiter(values, dtype=numpy.bool_)
+
+    @staticmethod
+    def ones(size):
+        return numpy.ones(size, dtype=numpy.bool_)
+
+    @staticmethod
+    def zeros(size):
+        return numpy.zeros(size, dtype=numpy.bool_)
+
+    @staticmethod
+    def and_(mask1, mask2):
+        return mask1 & mask2
+
+    @staticmethod
+    def flag_mask(flags, value):
+        return flags if value else ~flags
+
+    @staticmethod
+    def range_mask(column, lower, upper):
+        mask = numpy.ones(len(column), dtype=numpy.bool_)
+        if lower is not None:
+            mask &= column > lower
+        if upper is not None:
+            mask &= column < upper
+        return mask
+
+    @staticmethod
+    def rows_mask(size, rows):
+        mask = numpy.zeros(size, dtype=numpy.bool_)
+        mask[numpy.asarray(rows, dtype=numpy.int64)] = True
+        return mask
+
+    @staticmethod
+    def rows(mask):
+        return numpy.flatnonzero(mask).tolist()
+
+
+class ArrayBackend:
+    """Masks are 0/1 bytes, combined as big integers."""
+
+    @staticmethod
+    def floats(values):
+        return array('d', values)
+
+    @staticmethod
+    def flags(values):
+        return bytes(bool(v) for v in values)
+
+    @staticmethod
+    def ones(size):
+        return b'\1' * size
+
+    @staticmethod
+    def zeros(size):
+        return bytes(size)
+
+    @staticmethod
+    def and_(mask1, mask2):
+        value = (int.from_bytes(mask1, 'little') &
+                 int.from_bytes(mask2, 'little'))
+        return value.to_bytes(len(mask1), 'little')
+
+    @staticmethod
+    def flag_mask(flags, value):
+        if value:
+            return flags
+        value = (int.from_bytes(flags, 'little') ^
+                 int.from_bytes(b'\1' * len(flags), 'little'))
+        return value.to_bytes(len(flags), 'little')
+
+    @staticmethod
+    def range_mask(column, lower, upper):
+        lower = float('-inf') if lower is None else lower
+        upper = float('inf') if upper is None else upper
+        return bytes(lower < t < upper for t in column)
+
+    @staticmethod
+    def rows_mask(size, rows):
+        mask = bytearray(size)
+        for i in rows:
+            mask[i] = 1
+        return bytes(mask)
+
+    @staticmethod
+    def rows(mask):
+        rows = []
+        i = mask.find(1)
+        while i >= 0:
+            rows.append(i)
+            i = mask.find(1, i + 1)
+        return rows
+
+
+class IndexColumns:
+    _backend = ArrayBackend if numpy is None else NumpyBackend
+    VERSION = 1  # of the persisted format
+
+    def __init__(self, rows):
+        self._rows = rows
+        self._descriptions = [row['description'] or "" for row in rows]
+        self._sizes = self._backend.floats(
+            sum(f['size'] for f in row['files'].values()) for row in rows)
+        self._ids = [row['id'] for row in rows]
+        self._id_rows = {gist_id: i for i, gist_id in enumerate(self._ids)}
+        self._created = self._backend.floats(
+            self._epoch(row['created']) for row in rows)
+        self._updated = self._backend.floats(
+            self._epoch(row['updated']) for row in rows)
+        self._public = self._backend.flags(row['public'] for row in rows)
+        self._starred = self._backend.flags(row['starred'] for row in rows)
+        # interned tags and their row postings
+        self._tag_ids = {}
+        tag_rows = []
+        for i, row in enumerate(rows):
+            for tag in row[Gist.TAGS]:
+                tag_id = self._tag_ids.setdefault(tag, len(tag_rows))
+                if tag_id == len(tag_rows):
+                    tag_rows.append(array('l'))
+                tag_rows[tag_id].append(i)
+        self._tag_rows = tag_rows
+        self._sorted_tags = sorted(self._tag_ids)
+
+    @staticmethod
+    def _epoch(time):
+        try:
+            return Time.epoch(time)
+        except (TypeError, ValueError):
+            return float('nan')
+
+    def __len__(self):
+        return len(self._rows)
+
+    def row(self, i):
+        row = self._rows[i]
+        if isinstance(row, str):  # as persisted
+            row = self._rows[i] = json.loads(row)
+        return row
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_rows'] = [row if isinstance(row, str) else json.dumps(row)
+                          for row in self._rows]
+        return state
+
+    def save(self, path, key):
+        """Persist the columns to path for the index identified by key."""
+        with File.atomic_open(path, 'wb') as f:
+            pickle.dump((self.VERSION, self._backend.__name__, key), f)
+            pickle.dump(self, f, pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path, key):
+        """Return the columns persisted to path for the index identified by
+        key, None if they are missing or stale."""
+        try:
+            with open(path, 'rb') as f:
+                if pickle.load(f) != (cls.VERSION, cls._backend.__name__,
+                                      key):
+                    return None
+                columns = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError,
+                TypeError, AttributeError, ImportError):
+            return None
+        return columns if isinstance(columns, cls) else None
+
+    def select(self, ids=None, exact=False, description=None,
+               case_sensitive=False, tags=None, public=None, star=None,
+               created=None, modified=None, sort=None, tagged=None):
+        """Return indexes of rows satisfying all filters, in index order or
+        by sort(one of Gist.SORTS). tagged are ids of gists already looked
+        up from tag postings, if any."""
+        backend = self._backend
+        if tagged is None:
+            mask = backend.ones(len(self))
+        else:
+            mask = backend.rows_mask(len(self),
+                                     self._get_id_rows(tagged, True))
+        if public is not None:
+            mask = backend.and_(mask, backend.flag_mask(self._public, public))
+        if star is not None:
+            mask = backend.and_(mask, backend.flag_mask(self._starred, star))
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        for column, expressions in ((self._created, created),
+                                    (self._updated, modified)):
+            for expr in expressions or []:
+                mask = backend.and_(mask, self._time_mask(column, expr, now))
+        for tag in tags or []:
+            mask = backend.and_(mask, backend.rows_mask(
+                len(self), self._get_tag_rows(tag)))
+        if ids:
+            mask = backend.and_(mask, backend.rows_mask(
+                len(self), self._get_id_rows(ids, exact)))
+        rows = backend.rows(mask)
+        if description:
+            rows = [i for i in rows if String.match(
+                self._descriptions[i], description, case_sensitive)]
+        if sort:
+            rows.sort(key=self._sort_key(sort),
+                      reverse=sort not in Gist.ASCENDING_SORTS)
+        return rows
+
+    def _sort_key(self, sort):
+        if sort == 'created':
+            return self._created.__getitem__
+        if sort == 'updated':
+            return self._updated.__getitem__
+        if sort == 'description':
+            return lambda i: String.casefold(self._descriptions[i])
+        return self._sizes.__getitem__
+
+    def _time_mask(self, column, expression, now):
+        bounds = Time.bounds(expression, now)
+        if bounds is None:
+            return self._backend.zeros(len(self))
+
+        lower, upper = (None if t is None else Time.epoch(t) for t in bounds)
+        return self._backend.range_mask(column, lower, upper)
+
+    def _get_tag_rows(self, tag):
+        if not tag.endswith(Gist.TAG_PREFIX_MARK):
+            tag_id = self._tag_ids.get(tag)
+            return [] if tag_id is None else self._tag_rows[tag_id]
+
+        prefix = tag[:-1]
+        tags = self._sorted_tags
+        rows = []
+        for i in range(bisect_left(tags, prefix), len(tags)):
+            if not tags[i].startswith(prefix):
+                break
+            rows.extend(self._tag_rows[self._tag_ids[tags[i]]])
+        return rows
+
+    def _get_id_rows(self, ids, exact):
+        if exact:
+            return [self._id_rows[i] for i in ids if i in self._id_rows]
+        return [row for row, gist_id in enumerate(self._ids)
+                if any(i in gist_id for i in ids)]
@@ -5,17 +5,30 @@ Local agent.
 """
 
 import json
+import mimetypes
+import os
+from os.path import isdir, join
 
+from congist.utils import Git, Time
+from congist.Gist import Gist
 from congist.GistAgent import GistAgent
+from congist.local.IndexColumns import IndexColumns
 from congist.local.LocalGist import LocalGist
 
 
 class LocalAgent(GistAgent):
+    GIT_DIR = '.git'
+    COLUMNS_SUFFIX = '.{username}.columns'
+    SNIFF_SIZE = 1 << 13
+    TEXT_TYPE = 'text/plain'
+    BINARY_TYPE = 'application/octet-stream'
 
     def __init__(self, remote_agent, local_base, index_file):
         self._remote = remote_agent
         self._local_base = local_base
         self._index_file = index_file
+        self._columns = None
+        self._columns_key = None
 
     @property
     def host(self):
@@ -37,7 +50,102 @@ class LocalAgent(GistAgent):
         with open(self.index_file, 'r') as f:
             user = self.username
             for obj in json.load(f)[user]:
-                yield LocalGist(obj, user, self.local_base)
+                yield LocalGist(obj, user, self.local_base, self.host)
+
+    def select_gists(self, **filters):
+        """Yield gists matching filters evaluated on index columns."""
+        columns = self._get_columns()
+        for row in columns.select(**filters):
+            yield LocalGist(columns.row(row), self.username,
+                            self.local_base, self.host)
+
+    def _get_columns(self):
+        """Return columns of the index, persisted across runs until the
+        index is rewritten."""
+        with open(self.index_file, 'r') as f:
+            stat = os.fstat(f.fileno())
+            key = (stat.st_mtime_ns, stat.st_size)
+            if self._columns_key == key:
+                return self._columns
+
+            columns_file = self.index_file + self.COLUMNS_SUFFIX.format(
+                username=self.username)
+            columns = IndexColumns.load(columns_file, key)
+            if columns is None:
+                columns = IndexColumns(json.load(f)[self.username])
+                try:
+                    columns.save(columns_file, key)
+                except OSError:  # queries go on without the cache
+                    pass
+        self._columns, self._columns_key = columns, key
+        return columns
+
+    def clone_dirs(self):
+        return sorted(name for name in os.listdir(self.local_base)
+                      if isdir(join(self.local_base, name, self.GIT_DIR)))
+
+    def scan_gist(self, dir_name, indexed):
+        """Return index attributes of the gist cloned in dir_name without
+        any network access: the id from its remote URL, files from the
+        working tree and times from the git log. Those git does not keep
+        (description, visibility, star) come from indexed({id: attributes})
+        if the gist was indexed before, so do times unless the clone has
+        moved since(the host's times count edits git never sees). Return
+        None if dir_name is not a clone of a gist of the host."""
+        local_dir = join(self.local_base, dir_name)
+        gist_id = self._remote.gist_id(Git.remote_url(local_dir) or "")
+        times = gist_id and Git.commit_times(local_dir)
+        if not times:
+            return None
+
+        old = indexed.get(gist_id, {})
+        # the directory name keeps the title at least
+        description = old.get('description',
+                              dir_name[:-len(gist_id[:6]) - 1]
+                              .replace('_', ' '))
+        revision = Git.head(local_dir)
+        if {Git.url_revision(f['url']) for f in old.get(
+                'files', {}).values()} == {revision}:
+            created, updated = old['created'], old['updated']
+        else:
+            created, updated = (Time.isoformat(times[-1]),
+                                Time.isoformat(times[0]))
+        files = {}
+        for name in sorted(os.listdir(local_dir)):
+            path = join(local_dir, name)
+            if name == self.GIT_DIR or not os.path.isfile(path):
+                continue
+            files[name] = {
+                'name': name,
+                'url': self._remote.raw_url(gist_id, revision, name),
+                'type': self._guess_type(path),
+                'size': os.path.getsize(path),
+            }
+        return {
+            'api_url': self._remote.api_url(gist_id),
+            'description': description,
+            'public': old.get('public', False),
+            'starred': old.get('starred', False),
+            'created': created,
+            'updated': updated,
+            'id': gist_id,
+            'tags': Gist.parse_tags(description),
+            'files': files,
+        }
+
+    def is_current_dir(self, dir_name, attrs):
+        """Check whether dir_name is where the gist of attrs is cloned now,
+        rather than left behind by a description change."""
+        gist = LocalGist(attrs, self.username, self.local_base, self.host)
+        return dir_name == self.gist_dir(gist)
+
+    def _guess_type(self, path):
+        content_type = mimetypes.guess_type(path)[0]
+        if content_type:
+            return content_type
+        with open(path, 'rb') as f:
+            binary = b'\0' in f.read(self.SNIFF_SIZE)
+        return self.BINARY_TYPE if binary else self.TEXT_TYPE
 
     @staticmethod
     def gist_dir(gist):
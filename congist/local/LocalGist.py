@@ -17,12 +17,17 @@ from congist.GistFile import GistFile
 
 
 class LocalGist(Gist):
-    def __init__(self, values, username, local_base):
+    def __init__(self, values, username, local_base, host):
         for attr in self.ATTRS:
             setattr(self, "_" + attr, values[attr])
         self._local_base = local_base
+        self._host = host
         super().__init__(username)
 
+    @property
+    def host(self):
+        return self._host
+
     @property
     def id(self):
         return self._id
@@ -65,6 +70,14 @@ class LocalGist(Gist):
         assert isinstance(gist_file, GistFile), gist_file
         return File.read(gist_file.path, gist_file.binary)
 
+    def write_content(self, gist_file, output):
+        assert isinstance(gist_file, GistFile), gist_file
+        File.copy_to(gist_file.path, output)
+
+    def get_range(self, gist_file, start, end=None):
+        assert isinstance(gist_file, GistFile), gist_file
+        return File.read_range(gist_file.path, start, end)
+
     @staticmethod
     def dir_name(gist):
         name = LocalGist._clean_name(gist.title).replace(' ', '_')
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+"""
+LocalSearch searches local gist files by keywords with a process pool.
+"""
+
+import mmap
+import os
+from collections import namedtuple
+from multiprocessing import Pool
+
+
+"""Match represents a keyword match in a local file."""
+
+Match = namedtuple('Match', ['path', 'line', 'offset', 'text', 'keyword'])
+
+
+class LocalSearch:
+    SNIFF_SIZE = 8000
+    MMAP_THRESHOLD = 1 << 20
+    CHUNK_SIZE = 8
+
+    def __init__(self, matcher, first_only=False, workers=None):
+        self._matcher = matcher
+        self._first_only = first_only
+        self._workers = workers
+
+    def search(self, paths):
+        """Yield the matches of each path, in the order of the paths."""
+        init_args = (self._matcher, self._first_only)
+        with Pool(self._workers, _init_worker, init_args) as pool:
+            yield from pool.imap(_search_file, paths, self.CHUNK_SIZE)
+
+
+# per-process state of pool workers
+_worker = {}
+
+
+def _init_worker(matcher, first_only):
+    _worker['matcher'] = matcher
+    _worker['first_only'] = first_only
+
+
+def _search_file(path):
+    try:
+        with open(path, 'rb') as f:
+            if b'\0' in f.read(LocalSearch.SNIFF_SIZE):  # skip binary
+                return []
+            size = os.fstat(f.fileno()).st_size
+            if size < LocalSearch.MMAP_THRESHOLD:
+                f.seek(0)
+                return _search_bytes(path, f.read())
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return _search_bytes(path, data)
+    except (OSError, ValueError):  # not synced yet, or empty to map
+        return []
+
+
+def _search_bytes(path, data):
+    matcher = _worker['matcher']
+    if not matcher.match(data):  # stops early, unlike the report below
+        return []
+
+    matches = []
+    line, pos = 1, 0
+    for start, _, keyword in matcher.finditer(data):
+        line += data[pos:start].count(b'\n')
+        pos = start
+        line_start = data.rfind(b'\n', 0, start) + 1
+        line_end = data.find(b'\n', start)
+        if line_end < 0:
+            line_end = len(data)
+        text = data[line_start:line_end].rstrip(b'\r')
+        matches.append(Match(path, line, start,
+                             text.decode('utf-8', 'replace'),
+                             matcher.keywords[keyword]))
+        if _worker['first_only']:
+            break
+    return matches
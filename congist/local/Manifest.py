@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+
+"""
+Manifest records the committed state(size, mtime and hash of each file) of
+local gist directories, so that clean ones are detected with stat only.
+"""
+
+import json
+import os
+from os.path import join, relpath
+
+from congist.utils import File
+
+
+class Manifest:
+    GIT_DIR = '.git'
+
+    def __init__(self, manifest_file):
+        self._manifest_file = manifest_file
+        self._entries = None
+        self._changed = False
+
+    @property
+    def entries(self):
+        """Return {local_dir: {file: [size, mtime_ns, digest]}}."""
+        if self._entries is None:
+            try:
+                with open(self._manifest_file, 'r') as f:
+                    self._entries = json.load(f)
+            except (OSError, ValueError):
+                self._entries = {}
+        return self._entries
+
+    def _scan(self, local_dir):
+        files = {}
+        for root, dirs, names in os.walk(local_dir):
+            if self.GIT_DIR in dirs:
+                dirs.remove(self.GIT_DIR)
+            for name in names:
+                path = join(root, name)
+                stat = os.lstat(path)
+                files[relpath(path, local_dir)] = [stat.st_size,
+                                                   stat.st_mtime_ns]
+        return files
+
+    def is_clean(self, local_dir):
+        """Check whether local_dir is unchanged since it was recorded."""
+        entry = self.entries.get(local_dir)
+        if entry is None:
+            return False
+
+        files = self._scan(local_dir)
+        if files.keys() != entry.keys():
+            return False
+        for name, stat in files.items():
+            recorded = entry[name]
+            if stat == recorded[:2]:
+                continue
+            if stat[0] != recorded[0] or \
+                    File.digest(join(local_dir, name)) != recorded[2]:
+                return False
+            recorded[1] = stat[1]  # only touched
+            self._changed = True
+        return True
+
+    def changes(self, local_dir):
+        """Return ({modified: size}, {added: size}, [removed]) since the
+        last record of local_dir, or None if it was never recorded."""
+        entry = self.entries.get(local_dir)
+        if entry is None:
+            return None
+
+        modified, added = {}, {}
+        files = self._scan(local_dir)
+        for name, stat in files.items():
+            recorded = entry.get(name)
+            if recorded is None:
+                added[name] = stat[0]
+            elif stat != recorded[:2] and File.digest(
+                    join(local_dir, name)) != recorded[2]:
+                modified[name] = stat[0]
+        removed = [name for name in entry if name not in files]
+        return modified, added, removed
+
+    def digest(self, local_dir, name):
+        """Return the recorded digest of a file."""
+        return self.entries[local_dir][name][2]
+
+    def record(self, local_dir):
+        """Record the current state of local_dir as committed."""
+        entry = self.entries.get(local_dir, {})
+        files = self._scan(local_dir)
+        for name, stat in files.items():
+            recorded = entry.get(name)
+            if recorded and recorded[:2] == stat:
+                stat.append(recorded[2])
+            else:
+                stat.append(File.digest(join(local_dir, name)))
+        self.entries[local_dir] = files
+        self._changed = True
+
+    def save(self):
+        if self._changed:
+            with File.atomic_open(self._manifest_file) as f:
+                json.dump(self.entries, f)
+            self._changed = False
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+"""
+RevisionGist wraps a gist as of a commit of its local clone, with files
+read from git objects.
+"""
+
+from congist.utils import File, Git, Time
+
+from congist.Gist import Gist
+from congist.GistFile import GistFile
+
+
+class RevisionGist(Gist):
+    BINARY_TYPE = 'application/octet-stream'
+
+    def __init__(self, gist, local_dir, commit, commit_time, history):
+        self._gist = gist
+        self._local_dir = local_dir
+        self._commit = commit
+        self._commit_time = commit_time
+        self._history = history
+        self._file_entries = None
+        self._blobs = {}
+        super().__init__(gist.username)
+
+    @property
+    def revision(self):
+        return self._commit
+
+    @property
+    def revision_time(self):
+        return Time.isoformat(self._commit_time)
+
+    @property
+    def host(self):
+        return self._gist.host
+
+    @property
+    def id(self):
+        return self._gist.id
+
+    @property
+    def description(self):
+        return self._gist.description
+
+    @property
+    def public(self):
+        return self._gist.public
+
+    @property
+    def api_url(self):
+        return self._gist.api_url
+
+    @property
+    def html_url(self):
+        return self._gist.html_url
+
+    @property
+    def pull_url(self):
+        return self._gist.pull_url
+
+    @property
+    def push_url(self):
+        return self._gist.push_url
+
+    @property
+    def file_entries(self):
+        if self._file_entries is None:
+            current = {f.name: f for f in self._gist.file_entries}
+            self._file_entries = []
+            for path, blob, size in self._history.tree(self._local_dir,
+                                                       self._commit):
+                self._blobs[path] = blob
+                f = current.get(path)
+                # raw URLs embed the revision they serve
+                url = Git.RAW_REVISION_PATTERN.sub(
+                    '/raw/{}/'.format(self._commit), f.url) if f else ""
+                self._file_entries.append(GistFile(self, {
+                    'name': path, 'url': url, 'size': size,
+                    'type': f.content_type if f else self.BINARY_TYPE}))
+        return self._file_entries
+
+    @property
+    def created(self):
+        return self._gist.created
+
+    @property
+    def updated(self):
+        return self._gist.updated
+
+    @property
+    def starred(self):
+        return self._gist.starred
+
+    def get_content(self, gist_file):
+        assert isinstance(gist_file, GistFile), gist_file
+        data = self._history.read_blob(self._local_dir,
+                                       self._blobs[gist_file.name])
+        return data if gist_file.binary else data.decode()
+
+    def write_content(self, gist_file, output):
+        File.write(output, self.get_content(gist_file))
+
+    def get_range(self, gist_file, start, end=None):
+        data = self._history.read_blob(self._local_dir,
+                                       self._blobs[gist_file.name])
+        return data[start:] if start < 0 else data[start:end]
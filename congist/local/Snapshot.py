@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+"""
+Snapshot packs git bundles of local clones and metadata files(index,
+manifest) into one tar archive, written and read in a single pass so that
+compressed archives stream.
+"""
+
+import io
+import json
+import shutil
+import tarfile
+from os.path import basename, join, splitext
+
+
+class Snapshot:
+    INFO = 'snapshot.json'
+    METADATA = 'metadata/'
+    BUNDLES = 'bundles/'
+    BUNDLE_EXT = '.bundle'
+    COMPRESSIONS = {'.gz': 'gz', '.tgz': 'gz', '.bz2': 'bz2', '.xz': 'xz'}
+
+    def __init__(self, tar):
+        self._tar = tar
+
+    @classmethod
+    def create(cls, path):
+        """Create an archive, compressed by the extension of path."""
+        compression = cls.COMPRESSIONS.get(splitext(path)[1], '')
+        return cls(tarfile.open(path, 'w|' + compression))
+
+    @classmethod
+    def open(cls, path):
+        return cls(tarfile.open(path, 'r|*'))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._tar.close()
+
+    def add_info(self, info):
+        """Add {'local_base': ..., 'repos': {repo: remote url}} first, so
+        that readers know the remotes before any bundle."""
+        data = json.dumps(info, indent=4).encode()
+        member = tarfile.TarInfo(self.INFO)
+        member.size = len(data)
+        self._tar.addfile(member, io.BytesIO(data))
+
+    def add_metadata(self, path):
+        self._tar.add(path, self.METADATA + basename(path))
+
+    def add_bundle(self, repo, path):
+        """Add the bundle of repo("host/user/gist_dir")."""
+        self._tar.add(path, self.BUNDLES + repo + self.BUNDLE_EXT)
+
+    def read(self, target_dir):
+        """Yield (INFO, None, info), (METADATA, file name, path) or
+        (BUNDLES, repo, path) in archive order, with members extracted
+        under target_dir(by their positions, never by archived paths)."""
+        for i, member in enumerate(self._tar):
+            if not member.isfile():
+                continue
+            f = self._tar.extractfile(member)
+            if member.name == self.INFO:
+                yield self.INFO, None, json.load(f)
+                continue
+
+            for kind, ext in ((self.METADATA, ''),
+                              (self.BUNDLES, self.BUNDLE_EXT)):
+                if member.name.startswith(kind) and \
+                        member.name.endswith(ext):
+                    name = member.name[len(kind):len(member.name) - len(ext)]
+                    break
+            else:
+                continue
+            path = join(target_dir, str(i))
+            with open(path, 'wb') as output:
+                shutil.copyfileobj(f, output)
+            yield kind, name, path
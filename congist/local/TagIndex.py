@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+"""
+TagIndex maintains tag -> gist id postings built along with the local index.
+"""
+
+import json
+from bisect import bisect_left
+from collections import Counter
+
+from congist.utils import File
+from congist.Gist import Gist
+
+
+class TagIndex:
+
+    def __init__(self, index_file):
+        self._index_file = index_file
+        self._postings = None
+        self._sorted_tags = {}
+
+    @property
+    def index_file(self):
+        return self._index_file
+
+    @staticmethod
+    def build(index):
+        """Build postings from the index of gist attributes by user."""
+        postings = {}
+        for user, gists in index.items():
+            user_postings = postings[user] = {}
+            for gist in gists:
+                for tag in gist[Gist.TAGS]:
+                    user_postings.setdefault(tag, []).append(gist['id'])
+        return postings
+
+    def save(self, index):
+        self._postings = self.build(index)
+        self._sorted_tags = {}
+        with File.atomic_open(self.index_file) as f:
+            json.dump(self._postings, f)
+
+    def _load(self):
+        if self._postings is None:
+            try:
+                with open(self.index_file, 'r') as f:
+                    self._postings = json.load(f)
+            except (OSError, ValueError):
+                self._postings = {}
+        return self._postings
+
+    def _expand(self, username, tag):
+        user_postings = self._load()[username]
+        if not tag.endswith(Gist.TAG_PREFIX_MARK):
+            return [tag] if tag in user_postings else []
+
+        if username not in self._sorted_tags:
+            self._sorted_tags[username] = sorted(user_postings)
+        tags = self._sorted_tags[username]
+        prefix = tag[:-1]
+        expanded = []
+        for i in range(bisect_left(tags, prefix), len(tags)):
+            if not tags[i].startswith(prefix):
+                break
+            expanded.append(tags[i])
+        return expanded
+
+    def lookup(self, username, tags):
+        """Return ids of the user's gists having all tags(None if unknown)."""
+        user_postings = self._load().get(username)
+        if user_postings is None:
+            return None
+
+        ids = None
+        for tag in tags:
+            tag_ids = set()
+            for t in self._expand(username, tag):
+                tag_ids.update(user_postings[t])
+            ids = tag_ids if ids is None else ids & tag_ids
+        return ids
+
+    def count(self, username, tags=None):
+        """Count gists per tag, restricted to gists having given tags."""
+        user_postings = self._load().get(username)
+        if user_postings is None:
+            return None
+
+        ids = self.lookup(username, tags) if tags else None
+        counts = Counter()
+        for tag, tag_ids in user_postings.items():
+            if ids is not None:
+                tag_ids = ids.intersection(tag_ids)
+            num = len(tag_ids)
+            if num:
+                counts[tag] = num
+        return counts
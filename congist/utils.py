@@ -4,16 +4,29 @@
 Utility functions
 """
 
+import hashlib
 import importlib
+import io
+import json
 import os
 import re
+import shutil
+import subprocess
+import tempfile
+import threading
 import unicodedata
-from os.path import basename, split, join, expanduser
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from os.path import basename, dirname, split, join, expanduser
 from sys import stdin
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
 from pathlib import Path
 import dateutil.parser
 from dateutil.relativedelta import relativedelta
+try:
+    import fcntl
+except ImportError:  # non-posix system
+    fcntl = None
 
 
 class String:
@@ -121,10 +134,191 @@ class File:
         }
 
     @staticmethod
-    def copy_files(files, local_dir):
-        for name, item in files.items():
-            with open(os.path.join(local_dir, name), 'wb') as f:
-                f.write(item[File.FILE_KEY])
+    def path_map(paths, filename):
+        """Map file names to their paths(None for stdin) without reading."""
+        if paths:
+            return {basename(path): expanduser(path) for path in paths}
+        return {filename: None}
+
+    @staticmethod
+    def copy_files(paths, local_dir):
+        """Copy files given by path_map into local_dir in parallel."""
+        with ThreadPoolExecutor() as executor:
+            futures = [executor.submit(File.copy_file, path,
+                                       join(local_dir, name))
+                       for name, path in paths.items()]
+            for future in futures:
+                future.result()
+
+    FICLONE = 0x40049409  # ioctl to reflink a file on btrfs/xfs etc.
+
+    @staticmethod
+    def copy_file(src, dst):
+        """Copy src(stdin if None) to dst, sharing extents when possible."""
+        if src is None:
+            with open(dst, 'wb') as fdst:
+                shutil.copyfileobj(stdin.buffer, fdst, File.CHUNK_SIZE)
+            return
+
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            if File._reflink(fsrc, fdst) or File._copy_range(fsrc, fdst):
+                return
+            shutil.copyfileobj(fsrc, fdst, File.CHUNK_SIZE)
+
+    @staticmethod
+    def reflink_replace(src, dst):
+        """Replace dst with a copy-on-write clone of src if supported."""
+        tmp = dst + '.congist'
+        stat = os.stat(dst)
+        try:
+            with open(src, 'rb') as fsrc, open(tmp, 'wb') as fdst:
+                linked = File._reflink(fsrc, fdst)
+            if linked:
+                shutil.copymode(dst, tmp)
+                os.utime(tmp, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+                os.replace(tmp, dst)
+            return linked
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    @staticmethod
+    def _reflink(fsrc, fdst):
+        if fcntl is None:
+            return False
+        try:
+            fcntl.ioctl(fdst.fileno(), File.FICLONE, fsrc.fileno())
+            return True
+        except OSError:
+            return False
+
+    @staticmethod
+    def _copy_range(fsrc, fdst):
+        # copy_file_range advances both file offsets, so a failure midway
+        # can be resumed by a plain copy
+        try:
+            while os.copy_file_range(fsrc.fileno(), fdst.fileno(),
+                                     File.CHUNK_SIZE << 4):
+                pass
+            return True
+        except (AttributeError, OSError):
+            return False
+
+    CHUNK_SIZE = 1 << 16
+
+    @staticmethod
+    def binary_output(output):
+        """Return the byte stream underlying output after flushing it."""
+        output.flush()
+        return getattr(output, 'buffer', output)
+
+    @staticmethod
+    def read_range(path, start, end=None):
+        """Read bytes [start, end) of a file, the last -start bytes if start
+        is negative."""
+        with open(expanduser(path), 'rb') as f:
+            if start < 0:
+                size = os.fstat(f.fileno()).st_size
+                f.seek(max(size + start, 0))
+                return f.read()
+            f.seek(start)
+            return f.read() if end is None else f.read(max(end - start, 0))
+
+    @staticmethod
+    def write(output, content):
+        if isinstance(content, str):
+            output.write(content)
+        else:
+            File.binary_output(output).write(content)
+
+    @staticmethod
+    def write_chunks(output, chunks):
+        out = File.binary_output(output)
+        for chunk in chunks:
+            if chunk:
+                out.write(chunk)
+
+    @staticmethod
+    def copy_to(path, output):
+        """Copy the file at path to output, zero-copy when possible."""
+        out = File.binary_output(output)
+        with open(expanduser(path), 'rb') as src:
+            offset = 0
+            try:
+                out.flush()
+                out_fd = out.fileno()
+                size = os.fstat(src.fileno()).st_size
+                while offset < size:
+                    sent = os.sendfile(out_fd, src.fileno(), offset,
+                                       size - offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+            except (AttributeError, OSError, io.UnsupportedOperation):
+                # no sendfile support for this platform or output
+                src.seek(offset)
+                shutil.copyfileobj(src, out, File.CHUNK_SIZE)
+
+    @staticmethod
+    @contextmanager
+    def atomic_open(path, mode='w'):
+        """Open a temporary file which atomically replaces path on close."""
+        fd, tmp = tempfile.mkstemp(dir=dirname(path) or '.',
+                                   prefix='.' + basename(path) + '.')
+        try:
+            with os.fdopen(fd, mode) as f:
+                yield f
+                f.flush()
+                os.fsync(f.fileno())
+            try:
+                shutil.copymode(path, tmp)
+            except OSError:
+                os.chmod(tmp, 0o644)
+            os.replace(tmp, path)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    @staticmethod
+    def read_text(path):
+        """Return the file content if it is UTF-8 text, None otherwise."""
+        with open(path, 'rb') as f:
+            data = f.read()
+        if b'\0' in data:
+            return None
+        try:
+            return data.decode('utf-8')
+        except UnicodeDecodeError:
+            return None
+
+    DIGEST_NAME = 'sha1'
+
+    @staticmethod
+    def digest(path):
+        """Return the hex digest of the file content, None if unreadable."""
+        digest = hashlib.new(File.DIGEST_NAME)
+        try:
+            with open(path, 'rb') as f:
+                for chunk in iter(lambda: f.read(File.CHUNK_SIZE), b''):
+                    digest.update(chunk)
+        except OSError:
+            return None
+        return digest.hexdigest()
+
+    LOCK_SUFFIX = '.lock'
+
+    @staticmethod
+    @contextmanager
+    def lock(path):
+        """Hold an exclusive advisory lock associated with path."""
+        with open(path + File.LOCK_SUFFIX, 'a') as f:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(f.fileno(), fcntl.LOCK_UN)
 
     @staticmethod
     def config_path(path):
@@ -136,6 +330,46 @@ class File:
         return expanduser(path)
 
 
+class Journal:
+    """Journal appends JSON records line by line so work can be resumed."""
+
+    def __init__(self, path):
+        self._path = path
+        self._lock = threading.Lock()
+
+    @property
+    def path(self):
+        return self._path
+
+    def load(self):
+        records = []
+        try:
+            with open(self._path, 'r') as f:
+                for line in f:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:  # torn by an interruption
+                        continue
+        except FileNotFoundError:
+            pass
+        return records
+
+    def append(self, record):
+        line = json.dumps(record) + "\n"
+        with self._lock, open(self._path, 'a') as f:
+            f.write(line)
+
+    def clear(self):
+        with self._lock, open(self._path, 'w'):
+            pass
+
+    def replace(self, records):
+        """Replace all records at once, e.g. to compact the journal."""
+        with self._lock, File.atomic_open(self._path) as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+
+
 class Time:
     FORMAT_PATTERN = re.compile(r'^(\d+)(y|M|d|h|m|s)?([+-])?$')
     UNIT_MAP = {
@@ -147,6 +381,12 @@ class Time:
         's': 'seconds'
     }
 
+    @staticmethod
+    def isoformat(timestamp):
+        """Format a POSIX timestamp as gist times are(UTC, no zone)."""
+        return datetime.fromtimestamp(timestamp, timezone.utc).replace(
+            tzinfo=None).isoformat()
+
     @staticmethod
     def check(time, expressions):
         """check if the given time satisfies all experssion."""
@@ -159,20 +399,138 @@ class Time:
 
     @staticmethod
     def _check(target_time, current_time, expression):
+        bounds = Time.bounds(expression, current_time)
+        if bounds is None:
+            return False
+
+        lower, upper = bounds
+        return ((lower is None or lower < target_time) and
+                (upper is None or target_time < upper))
+
+    @staticmethod
+    def bounds(expression, current_time):
+        """Return exclusive (lower, upper) time bounds of the expression."""
         matched = Time.FORMAT_PATTERN.match(expression)
         if not matched:
-            return False
+            return None
 
         num, unit, relative = matched.groups()
         time_key = Time.UNIT_MAP[unit or 'd']
         src_time = current_time - relativedelta(**{time_key: int(num)})
         if relative == '+':
-            return src_time > target_time
+            return None, src_time
         if relative == '-':
-            return src_time < target_time
+            return src_time, None
+
+        unit_time = relativedelta(**{time_key: 1})
+        return src_time - unit_time, src_time + unit_time
+
+    @staticmethod
+    def epoch(time):
+        """Convert a naive UTC time(or ISO string) to epoch seconds."""
+        if isinstance(time, str):
+            time = datetime.fromisoformat(time)
+        return time.replace(tzinfo=timezone.utc).timestamp()
+
+
+class Git:
+    RAW_REVISION_PATTERN = re.compile(r'/raw/([0-9a-f]{40})/')
+
+    BRANCH_PREFIX = 'refs/heads/'
+    UPSTREAM_PREFIX = 'refs/remotes/origin/'
 
-        diff = abs(src_time - target_time)
-        return diff < timedelta(**{time_key: 1})
+    @staticmethod
+    def head(repo_dir):
+        """Return the commit id of HEAD without running git."""
+        git_dir = join(repo_dir, '.git')
+        try:
+            with open(join(git_dir, 'HEAD')) as f:
+                head = f.read().strip()
+            if not head.startswith('ref: '):  # detached
+                return head
+
+            return Git._read_ref(git_dir, head[5:])
+        except OSError:
+            return None
+
+    @staticmethod
+    def upstream(repo_dir):
+        """Return the commit id of the branch's upstream without running
+        git, None if unknown."""
+        git_dir = join(repo_dir, '.git')
+        try:
+            with open(join(git_dir, 'HEAD')) as f:
+                head = f.read().strip()
+            if not head.startswith('ref: ' + Git.BRANCH_PREFIX):
+                return None
+
+            branch = head[5 + len(Git.BRANCH_PREFIX):]
+            return Git._read_ref(git_dir, Git.UPSTREAM_PREFIX + branch)
+        except OSError:
+            return None
+
+    @staticmethod
+    def _read_ref(git_dir, ref):
+        try:
+            with open(join(git_dir, ref)) as f:
+                return f.read().strip()
+        except FileNotFoundError:
+            with open(join(git_dir, 'packed-refs')) as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) == 2 and parts[1] == ref:
+                        return parts[0]
+        return None
+
+    @staticmethod
+    def remote_url(repo_dir, remote='origin'):
+        """Return the URL of a remote without running git, None if unset."""
+        section = '[remote "{}"]'.format(remote)
+        in_section = False
+        try:
+            with open(join(repo_dir, '.git', 'config')) as f:
+                for line in f:
+                    line = line.strip()
+                    if line.startswith('['):
+                        in_section = line == section
+                    elif in_section:
+                        key, _, value = line.partition('=')
+                        if key.strip() == 'url':
+                            return value.strip()
+        except OSError:
+            pass
+        return None
+
+    @staticmethod
+    def commit_times(repo_dir):
+        """Return commit times of HEAD's history, newest first."""
+        result = subprocess.run(['git', 'log', '--format=%ct'], cwd=repo_dir,
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            return []
+        return [int(t) for t in result.stdout.split()]
+
+    @staticmethod
+    def sync_time(repo_dir):
+        """Return when the clone was last cloned or fetched(in epoch
+        seconds) without running git, None if unknown."""
+        times = []
+        for name in ('FETCH_HEAD', 'packed-refs'):
+            try:
+                times.append(os.stat(join(repo_dir, '.git', name)).st_mtime)
+            except OSError:
+                pass
+        return max(times, default=None)
+
+    @staticmethod
+    def is_shallow(repo_dir):
+        return os.path.exists(join(repo_dir, '.git', 'shallow'))
+
+    @staticmethod
+    def url_revision(raw_url):
+        """Return the revision embedded in a raw file URL if any."""
+        matched = Git.RAW_REVISION_PATTERN.search(raw_url or '')
+        return matched.group(1) if matched else None
 
 
 class Type:
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+import yaml
+
+from congist import congist_cli
+from congist.Congist import Congist
+from congist.github.GithubGist import GithubGist
+from congist.local.LocalGist import LocalGist
+
+CONFIG = os.path.join(os.path.dirname(__file__), os.pardir, 'congist.yml')
+
+
+@pytest.fixture
+def config(tmp_path):
+    """The system config for one github account alice, kept in tmp_path.
+    Override this fixture in a test module to tweak it."""
+    with open(CONFIG) as f:
+        config = yaml.safe_load(f)
+    config.update({
+        'local_base': str(tmp_path / 'gists'),
+        'completion_cache': str(tmp_path / 'completion.txt'),
+        'agents': {host: 'congist.' + agent_type for host, agent_type
+                   in config['agents'].items()},
+        'repos': {'github': {'users': [{'username': 'alice',
+                                        'access_token': 'x'}]}}})
+    return config
+
+
+@pytest.fixture
+def git_identity(monkeypatch):
+    for var in ('AUTHOR', 'COMMITTER'):
+        monkeypatch.setenv('GIT_{}_NAME'.format(var), 'alice')
+        monkeypatch.setenv('GIT_{}_EMAIL'.format(var), 'alice@example.com')
+
+
+@pytest.fixture
+def congist(config, git_identity):
+    return Congist(config)
+
+
+@pytest.fixture
+def run(congist):
+    """Return a function running a subcommand of argv with congist."""
+    def run(*argv):
+        args = congist_cli.parser.parse_args(argv)
+        return args.function(congist, args)
+
+    return run
+
+
+@pytest.fixture
+def local_gists(congist):
+    """Return a function which writes the files({name: str or bytes}) of a
+    gist of alice into its local clone directory and indexes the gist."""
+    index = []
+
+    def add(description, files, **attrs):
+        day = len(index) + 1
+        entry = dict({
+            'api_url': '', 'description': description, 'public': True,
+            'starred': False, 'created': "2020-01-01T00:00:00",
+            'updated': "2020-01-{:02}T00:00:00".format(day),
+            'id': "{:020x}".format(day), 'tags': [], 'files': {}}, **attrs)
+        local_dir = congist.get_local_dir('github', 'alice')
+        gist = LocalGist(entry, 'alice', local_dir, 'github')
+        entry['tags'] = gist.tags
+        gist_dir = os.path.join(local_dir, LocalGist.dir_name(gist))
+        os.makedirs(gist_dir, exist_ok=True)
+        for name, content in files.items():
+            binary = isinstance(content, bytes)
+            data = content if binary else content.encode()
+            with open(os.path.join(gist_dir, name), 'wb') as f:
+                f.write(data)
+            entry['files'][name] = {
+                'name': name, 'size': len(data), 'url': '',
+                'type': 'application/octet-stream' if binary else
+                'text/plain'}
+        index.insert(0, entry)  # recently updated first
+        congist._write_index('github', {'alice': index})
+        return gist
+
+    return add
+
+
+class RawHandler(BaseHTTPRequestHandler):
+    """Serves raw file contents, honoring Range headers like the host."""
+    contents = {}
+    requests = []
+
+    def do_GET(self):
+        byte_range = self.headers.get('Range')
+        self.requests.append((self.path, byte_range))
+        content = self.contents.get(self.path)
+        if content is None:
+            self.send_error(404)
+            return
+
+        status = 200
+        if byte_range:
+            start, _, end = byte_range[len('bytes='):].partition('-')
+            if not start:
+                start, end = max(len(content) - int(end), 0), len(content)
+            else:
+                start = int(start)
+                end = int(end) + 1 if end else len(content)
+            if start >= len(content):
+                self.send_error(416)
+                return
+            content, status = content[start:end], 206
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def raw_server(monkeypatch):
+    """Serve RawHandler.contents({path: bytes}) on a local port."""
+    monkeypatch.setenv('NO_PROXY', '127.0.0.1')
+    monkeypatch.setattr(RawHandler, 'contents', {})
+    monkeypatch.setattr(RawHandler, 'requests', [])
+    server = HTTPServer(('127.0.0.1', 0), RawHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(RawHandler, 'base_url', "http://127.0.0.1:{}".format(
+        server.server_port), raising=False)
+    yield RawHandler
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def remote_gists(congist, raw_server, monkeypatch):
+    """Return a function which lists a gist of alice from the host, its
+    files({name: str or bytes}) and the gist itself served by raw_server,
+    with the listed attrs updated by keyword arguments."""
+    agent = congist.get_agents('github')['alice']
+    gists = []
+    monkeypatch.setattr(type(agent), 'get_gists',
+                        lambda self, order=None: list(gists))
+
+    def add(description, files, **attrs):
+        gist_id = "{:020x}".format(len(gists) + 1)
+        entries, api_files = [], {}
+        for name, content in files.items():
+            binary = isinstance(content, bytes)
+            path = "/alice/{}/raw/{}".format(gist_id, name)
+            raw_server.contents[path] = content if binary else \
+                content.encode()
+            entries.append({'name': name, 'url': raw_server.base_url + path,
+                            'size': len(raw_server.contents[path]),
+                            'type': 'application/octet-stream' if binary
+                            else 'text/plain'})
+            if not binary:
+                api_files[name] = {'content': content, 'truncated': False}
+        api_path = "/gists/" + gist_id
+        raw_server.contents[api_path] = json.dumps(
+            {'files': api_files}).encode()
+        gist = GithubGist(agent._session, dict({
+            'id': gist_id, 'description': description, 'public': True,
+            'url': raw_server.base_url + api_path, 'html_url': '',
+            'git_pull_url': '', 'git_push_url': '',
+            'created_at': "2020-01-01T00:00:00Z",
+            'updated_at': "2020-01-02T00:00:00Z"}, **attrs), entries)
+        gists.append(gist)
+        return gist
+
+    return add
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+import os
+import subprocess
+
+import pytest
+
+from congist.local.BlobStore import BlobStore
+from congist.utils import File
+
+
+def git(cwd, *args):
+    return subprocess.run(('git',) + args, cwd=cwd, check=True,
+                          capture_output=True, text=True).stdout.strip()
+
+
+pytestmark = pytest.mark.usefixtures('git_identity')
+
+
+@pytest.fixture
+def store(tmp_path):
+    metadata = tmp_path / 'gists' / '_metadata'
+    metadata.mkdir(parents=True)
+    return BlobStore(str(metadata / 'hashes.json'),
+                     str(metadata / 'shared.git'), str(tmp_path / 'gists'))
+
+
+def clone(tmp_path, user, content):
+    repo = tmp_path / 'gists' / 'github' / user / 'notes_aaaaaa'
+    repo.mkdir(parents=True)
+    git(repo, 'init', '-q')
+    (repo / 'a.txt').write_text(content)
+    git(repo, 'add', '-A')
+    git(repo, 'commit', '-qm', content)
+    return str(repo)
+
+
+def test_share_objects_of_same_named_clones(tmp_path, store):
+    repos = [clone(tmp_path, user, "by " + user)
+             for user in ('alice', 'bob')]
+    store.share_objects(repos)
+
+    shared = str(tmp_path / 'gists' / '_metadata' / 'shared.git')
+    refs = git(shared, 'for-each-ref', '--format=%(refname)').split()
+    assert refs == ['refs/clones/github/alice/notes_aaaaaa',
+                    'refs/clones/github/bob/notes_aaaaaa']
+    for repo in repos:
+        git(repo, 'fsck', '--no-dangling')
+        assert git(repo, 'show', 'HEAD:a.txt') == "by " + os.path.basename(
+            os.path.dirname(repo))
+
+
+def test_link_goes_on_after_failures(tmp_path, store, monkeypatch):
+    paths = []
+    for i in range(3):
+        path = tmp_path / '{}.txt'.format(i)
+        path.write_text("same content")
+        paths.append(str(path))
+    store.update([str(tmp_path)])
+    failed = {paths[1]}
+    monkeypatch.setattr(File, 'reflink_replace',
+                        lambda src, dst: dst not in failed)
+
+    assert store.link() == (len("same content"), 1)
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+import pytest
+
+from congist.Congist import ParameterError
+from congist.local.LocalGist import LocalGist
+
+ARGS = {'host': None, 'user': None, 'public': None, 'tags': None,
+        'dry_run': False, 'verbose': False}
+
+
+@pytest.fixture
+def config(config):
+    config['bulk_create']['interval'] = 0
+    return config
+
+
+@pytest.fixture
+def created(congist, monkeypatch):
+    """Record descriptions of gists created by the fake host."""
+    created = []
+    agent = congist.get_agents('github')['alice']
+
+    def create_gist(self, files, desc="", public=False):
+        created.append(desc)
+        attrs = {'api_url': '', 'description': desc, 'public': public,
+                 'starred': False, 'created': "2020-01-01T00:00:00",
+                 'updated': "2020-01-01T00:00:00",
+                 'id': "{:020x}".format(len(created)), 'tags': [],
+                 'files': {}}
+        return LocalGist(attrs, 'alice', '', 'github')
+
+    monkeypatch.setattr(type(agent), 'create_gist', create_gist)
+    return created
+
+
+def indexed(congist):
+    with open(congist._index_file.format(host='github')) as f:
+        return sorted(attrs['description'] for attrs in json.load(f)['alice'])
+
+
+def journal(congist):
+    with open(congist._bulk_journal_file.format(host='github')) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_rerun_resumes_failed_then_starts_over(tmp_path, congist, created):
+    tree = tmp_path / 'tree'
+    tree.mkdir()
+    (tree / 'a.md').write_text("alpha")
+    (tree / 'b.md').write_text("")  # rejected while empty
+    assert congist.bulk_create([str(tree)], **ARGS) == (1, 1)
+    assert journal(congist) == [{'key': str(tree / 'a.md')}]
+
+    congist._update_index('github', 'alice', [], removed=[
+        "{:020x}".format(1)])  # deleted in the meantime
+    (tree / 'b.md').write_text("beta")
+    assert congist.bulk_create([str(tree)], **ARGS) == (1, 0)
+    assert created == ["[a]", "[b]"]
+    assert indexed(congist) == ["[b]"]  # not brought back by the journal
+    assert journal(congist) == []
+
+    assert congist.bulk_create([str(tree)], **ARGS) == (2, 0)
+    assert created == ["[a]", "[b]", "[a]", "[b]"]
+
+
+def test_interrupted_run_is_indexed(tmp_path, congist, created):
+    tree = tmp_path / 'tree'
+    tree.mkdir()
+    (tree / 'a.md').write_text("alpha")
+    (tree / 'b.md').write_text("beta")
+    attrs = {'api_url': '', 'description': "[a]", 'public': False,
+             'starred': False, 'created': "2020-01-01T00:00:00",
+             'updated': "2020-01-01T00:00:00", 'id': "f" * 20, 'tags': [],
+             'files': {}}
+    with open(congist._bulk_journal_file.format(host='github'), 'w') as f:
+        f.write(json.dumps({'key': str(tree / 'a.md'), 'attrs': attrs}))
+
+    assert congist.bulk_create([str(tree)], **ARGS) == (1, 0)
+    assert created == ["[b]"]
+    assert indexed(congist) == ["[a]", "[b]"]
+    assert journal(congist) == []
+
+
+def test_manifest_entry_without_files(tmp_path, congist, created):
+    manifest = tmp_path / 'gists.yml'
+    manifest.write_text("- title: no files\n")
+    with pytest.raises(ParameterError):
+        congist.bulk_create([str(manifest)], **ARGS)
+    assert created == []
+
+
+def test_front_matter_scalar_tags(tmp_path, congist, created):
+    tree = tmp_path / 'tree'
+    tree.mkdir()
+    (tree / 'a.md').write_text("---\ntags: python\n---\nalpha")
+    (tree / 'b.md').write_text("---\ntags: python, web\n---\nbeta")
+    (tree / 'c.md').write_text("---\ntags: [py, 3]\n---\ngamma")
+    assert congist.bulk_create([str(tree)], **dict(ARGS, tags=['x'])) == (
+        3, 0)
+    assert sorted(created) == ["[a] #python #x", "[b] #python #web #x",
+                               "[c] #py #3 #x"]  # created concurrently
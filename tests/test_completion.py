@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+import os
+import subprocess
+import sys
+
+from congist import completion
+
+SCRIPT = completion.__file__
+
+
+def test_complete_from_index_cache(run, congist, local_gists, capsys):
+    local_gists("[alpha] notes #py #web", {'a.txt': "a", 'b.md': "b"})
+    local_gists("[beta] #python", {'b.txt': "b"})
+
+    def complete(*argv):
+        run('complete', *argv)
+        return capsys.readouterr().out.splitlines()
+
+    assert complete('hosts') == ['github']
+    assert complete('users', 'a') == ['alice']
+    assert complete('tags', 'py') == ['py', 'python']
+    assert complete('files', 'b') == ['b.md', 'b.txt']
+    assert complete('files', 'c') == []
+    assert complete('ids', "{:019x}".format(0)) == [
+        "{:020x}".format(1), "{:020x}".format(2)]
+
+    local_gists("[gamma] #go", {'g.go': "g"})  # the cache follows the index
+    assert complete('tags') == ['go', 'py', 'python', 'web']
+    script = "\n".join(complete('bash')).strip()
+    assert congist.completion_cache in script
+    assert script.endswith("-F _congist_complete congist congist.sh")
+
+
+def test_complete_by_script(congist, local_gists):
+    local_gists("[alpha] notes:\ta #py", {'a.txt': "a"})
+    env = dict(os.environ, **{completion.CACHE_ENV: congist.completion_cache})
+    result = subprocess.run(
+        [sys.executable, '-S', '-X', 'importtime', SCRIPT, '--describe',
+         'ids', "{:020x}".format(1)],
+        env=env, check=True, capture_output=True, text=True)
+    assert result.stdout == "{:020x}:[alpha] notes: a #py\n".format(
+        1)  # tabs separate descriptions in the cache
+    imported = [line.split('|')[-1].strip()
+                for line in result.stderr.splitlines()]
+    assert 'json' not in imported  # answers without loading the index
+
+    result = subprocess.run([sys.executable, '-S', SCRIPT, 'colors'],
+                            env=env, capture_output=True, text=True)
+    assert result.returncode == 2 and result.stdout == ""
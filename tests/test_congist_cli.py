@@ -0,0 +1,14 @@
+# -*- coding: utf-8 -*-
+
+from congist import congist_cli
+
+
+def parse(*argv):
+    return congist_cli.parser.parse_args(argv)
+
+
+def test_keywords_leave_positionals_alone():
+    args = parse('tag', '-k', 'foo', 'newtag')
+    assert args.keyword == ['foo'] and args.new_tags == ['newtag']
+    args = parse('star', '-k', 'foo', '-k', 'bar', '1')
+    assert args.keyword == ['foo', 'bar'] and args.new_star is True
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+import io
+import subprocess
+
+import pytest
+
+from congist import utils
+from congist.github.GithubGist import GithubGist
+from congist.utils import File
+
+# NUL bytes and invalid UTF-8 which text reads would choke on or mangle
+BINARY = bytes(range(256)) * 4 + b"\xff\xfe\r\n\x00"
+
+
+def git(cwd, *args):
+    return subprocess.run(('git',) + args, cwd=cwd, check=True,
+                          capture_output=True).stdout
+
+
+@pytest.fixture
+def created(tmp_path, congist, monkeypatch):
+    """Create gists in a local bare repository, return (the repository,
+    files sent to create gists)."""
+    remote = tmp_path / 'remote.git'
+    git(tmp_path, 'init', '-q', '--bare', str(remote))
+    agent = congist.get_agents('github')['alice']
+    sent = []
+
+    def create_gist(self, files, desc="", public=False):
+        sent.append(files)
+        seed = tmp_path / 'seed'
+        git(tmp_path, 'clone', '-q', str(remote), str(seed))
+        for name, item in files.items():
+            (seed / name).write_text(item[File.FILE_KEY])
+        git(seed, 'add', '-A')
+        git(seed, 'commit', '-qm', 'create')
+        git(seed, 'push', '-q', 'origin', 'HEAD')
+        return GithubGist(self._session, {
+            'id': "a" * 20, 'description': desc, 'public': public,
+            'url': '', 'html_url': '', 'git_pull_url': str(remote),
+            'git_push_url': str(remote),
+            'created_at': "2020-01-01T00:00:00Z",
+            'updated_at': "2020-01-01T00:00:00Z"}, [])
+
+    monkeypatch.setattr(type(agent), 'create_gist', create_gist)
+    monkeypatch.setattr(congist, '_clone_depth', 0)
+    return remote, sent
+
+
+def test_create_binary_gist(tmp_path, run, created, monkeypatch):
+    paths = []
+    for name, data in (('a.bin', BINARY), ('b.dat', BINARY[::-1])):
+        path = tmp_path / name
+        path.write_bytes(data)
+        paths.append(str(path))
+    monkeypatch.setattr(File, 'read', None)  # never read into memory
+
+    run('create', '-b', '-d', "[bin] data", *paths)
+    remote, sent = created
+    assert sent == [{'a.bin': {'content': 'PLACEHOLDER'}}]
+    assert git(remote, 'show', 'HEAD:a.bin') == BINARY
+    assert git(remote, 'show', 'HEAD:b.dat') == BINARY[::-1]
+
+
+def test_create_binary_gist_from_stdin(run, created, monkeypatch):
+    monkeypatch.setattr(utils, 'stdin', io.TextIOWrapper(
+        io.BytesIO(BINARY)))
+    run('create', '-b', '-f', 'in.bin')
+    remote, _ = created
+    assert git(remote, 'show', 'HEAD:in.bin') == BINARY
+
+
+def test_copy_file_falls_back_to_plain_copy(tmp_path, monkeypatch):
+    src, dst = tmp_path / 'src', tmp_path / 'dst'
+    src.write_bytes(BINARY * 100)
+    monkeypatch.setattr(File, '_reflink', lambda fsrc, fdst: False)
+    monkeypatch.setattr(File, '_copy_range', lambda fsrc, fdst: False)
+    File.copy_file(str(src), str(dst))
+    assert dst.read_bytes() == BINARY * 100
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+
+import json
+import subprocess
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+from congist.Gist import Gist, GistUser
+from congist.github.GithubGraphqlAgent import GithubGraphqlAgent
+from congist.local.HybridGist import HybridGist
+from congist.utils import File
+
+
+def node(gist_id, description, starred=False):
+    return {'name': gist_id, 'description': description, 'isPublic': True,
+            'createdAt': "2021-01-01T00:00:00Z",
+            'updatedAt': "2021-01-02T03:04:05Z",
+            'url': "https://gist.github.com/" + gist_id,
+            'viewerHasStarred': starred,
+            'files': [{'name': 'a.py', 'size': 5, 'isImage': False,
+                       'text': "print"},
+                      {'name': 'b.txt', 'size': 100, 'isImage': False,
+                       'text': "cut"},  # truncated by the query
+                      {'name': 'c', 'size': 9, 'isImage': True,
+                       'text': None}]}
+
+
+# two pages keyed by the cursor they are requested after
+PAGES = {None: ([node('g1', "[one] first #x", True), node('g2', None)],
+                'c1'),
+         'c1': ([node('g3', "[three] last")], None)}
+
+
+class Handler(BaseHTTPRequestHandler):
+    requests = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.requests.append(body['variables'])
+        nodes, cursor = PAGES[body['variables']['after']]
+        data = json.dumps({'data': {'viewer': {'login': 'alice', 'gists': {
+            'pageInfo': {'hasNextPage': cursor is not None,
+                         'endCursor': cursor},
+            'nodes': nodes}}}}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def agent(config, monkeypatch):
+    Gist.init(config['gist'])
+    File.init(config['file'])
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv('NO_PROXY', '127.0.0.1')
+    monkeypatch.setattr(GithubGraphqlAgent, 'BASE_URL',
+                        "http://127.0.0.1:{}".format(server.server_port))
+    Handler.requests = []
+    yield GithubGraphqlAgent(GistUser('alice', 'x', False))
+    server.shutdown()
+    server.server_close()
+
+
+def test_list_pages_by_cursor(agent):
+    gists = agent.get_gists('updated')
+    assert next(gists).id == 'g1'
+    assert len(Handler.requests) == 1  # the next page is not read yet
+
+    assert [gist.id for gist in gists] == ['g2', 'g3']
+    assert [(v['after'], v['order']) for v in Handler.requests] == [
+        (None, 'UPDATED_AT'), ('c1', 'UPDATED_AT')]
+    list(agent.get_gists())
+    assert Handler.requests[-1]['order'] == 'CREATED_AT'
+
+
+def test_map_nodes_to_gists(agent):
+    first, second, _ = agent.get_gists()
+    assert (first.description, first.title, first.tags) == (
+        "[one] first #x", "one", ['x'])
+    assert first.public and first.starred and not second.starred
+    assert second.description == ""
+    assert (first.created, first.updated) == ("2021-01-01T00:00:00",
+                                              "2021-01-02T03:04:05")
+    assert first.html_url == "https://gist.github.com/g1"
+    assert first.pull_url == "https://gist.github.com/g1.git"
+
+    py, txt, image = first.file_entries
+    assert py.url == "https://gist.githubusercontent.com/alice/g1/raw/a.py"
+    assert (py.content_type, py.size) == ('text/x-python', 5)
+    assert py.loaded and py.content == "print"  # came with the listing
+    assert txt.content_type == 'text/plain' and not txt.loaded
+    assert image.content_type == 'image' and image.binary
+
+
+def git(cwd, *args):
+    return subprocess.run(('git',) + args, cwd=cwd, check=True,
+                          capture_output=True, text=True).stdout.strip()
+
+
+def test_hybrid_reads_synced_clone(tmp_path, agent, monkeypatch,
+                                   git_identity):
+    first, second, _ = agent.get_gists()
+    remote = tmp_path / 'remote.git'
+    git(tmp_path, 'init', '-q', '--bare', str(remote))
+    origin = tmp_path / 'origin'
+    git(tmp_path, 'clone', '-q', str(remote), str(origin))
+    (origin / 'b.txt').write_text("b" * 100)
+    git(origin, 'add', '-A')
+    git(origin, 'commit', '-qm', "b")
+    git(origin, 'push', '-q', 'origin', 'HEAD')
+    local_base = tmp_path / 'gists'
+    clone = local_base / HybridGist.dir_name(first)
+    git(tmp_path, 'clone', '-q', str(remote), str(clone))
+
+    gist = HybridGist(first, agent, str(local_base))
+    txt = gist.file_entries[1]
+    assert gist.is_fresh(txt)
+    assert txt.content == "b" * 100  # not the truncated listing text
+
+    (clone / 'c.txt').write_text("local")
+    git(clone, 'add', '-A')
+    git(clone, 'commit', '-qm', "ahead of the remote")
+    gist = HybridGist(first, agent, str(local_base))
+    assert not gist.is_fresh(gist.file_entries[1])
+
+    git(clone, 'reset', '-q', '--hard', 'HEAD~')
+    monkeypatch.setattr(first, '_updated_at', "2999-01-01T00:00:00")
+    gist = HybridGist(first, agent, str(local_base))  # edited after sync
+    assert not gist.is_fresh(gist.file_entries[1])
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+
+from congist.local.LocalSearch import LocalSearch
+
+BIG = "filler line\n" * (LocalSearch.MMAP_THRESHOLD // 12 + 1)
+
+
+def test_grep_local_files(tmp_path, run, local_gists):
+    local_gists("[small] notes", {'a.txt': "one\ntwo needle\n"})
+    local_gists("[big] log", {'big.txt': BIG + "last Needle\n"})
+    local_gists("[bin] blob", {'c.bin': b"\0needle"})
+
+    output = tmp_path / 'out'
+    run('grep', '-k', 'needle', '-o', str(output))  # case insensitive
+    big_line = BIG.count("\n") + 1
+    assert output.read_text().splitlines() == [
+        "github/alice/big_000000/big.txt:{}:{}:last Needle".format(
+            big_line, len(BIG) + len("last ")),
+        "github/alice/small_000000/a.txt:2:8:two needle"]
+
+    run('grep', '-S', '-k', 'Needle', '-o', str(output))
+    assert output.read_text().count("\n") == 1
+
+    run('grep', '-k', 'two', '-k', 'one', '-o', str(output))
+    assert output.read_text().splitlines() == [
+        "github/alice/small_000000/a.txt:1:0:one:one",
+        "github/alice/small_000000/a.txt:2:4:two:two needle"]
+
+
+def test_lists_local_gists_by_keyword(tmp_path, run, local_gists):
+    local_gists("[small] notes", {'a.txt': "no match"})
+    local_gists("[big] log", {'big.txt': BIG + "last needle\n"})
+
+    output = tmp_path / 'out'
+    run('lists', '-l', '-k', 'NEEDLE', '-o', str(output))
+    assert output.read_text().strip() == '"[big] log" +'
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+import os
+import subprocess
+
+import pytest
+
+from congist import congist_cli
+from congist.Congist import ParameterError
+from congist.Matcher import Matcher
+from congist.local.History import History
+from congist.local.LocalGist import LocalGist
+
+GIST_ID = "aaaaaa111"
+
+
+def git(cwd, *args):
+    return subprocess.run(('git',) + args, cwd=cwd, check=True,
+                          capture_output=True, text=True).stdout.strip()
+
+
+def commit(repo, content, name='a.txt'):
+    with open(os.path.join(repo, name), 'w') as f:
+        f.write(content)
+    git(repo, 'add', '-A')
+    git(repo, 'commit', '-qm', content[:20])
+    return git(repo, 'rev-parse', 'HEAD')
+
+
+pytestmark = pytest.mark.usefixtures('git_identity')
+
+
+@pytest.fixture
+def repo(tmp_path):
+    repo = str(tmp_path / 'repo')
+    git(tmp_path, 'init', '-q', repo)
+    return repo
+
+
+@pytest.fixture
+def history(tmp_path, monkeypatch):
+    history = History(str(tmp_path / 'history.json'))
+    ranges = history.log_ranges = []
+    log = History._log
+
+    def spy(self, local_dir, revision_range):
+        ranges.append(revision_range)
+        return log(self, local_dir, revision_range)
+
+    monkeypatch.setattr(History, '_log', spy)
+    return history
+
+
+def test_revisions_logged_incrementally(repo, history):
+    first = commit(repo, "one")
+    second = commit(repo, "two")
+    assert [r[0] for r in history.revisions(repo)] == [second, first]
+
+    third = commit(repo, "three")
+    assert [r[0] for r in history.revisions(repo)] == [third, second, first]
+    assert history.log_ranges == [second, second + '..' + third]
+    history.revisions(repo)  # unchanged HEAD
+    assert len(history.log_ranges) == 2
+
+    history.save()
+    reloaded = History(history._index_file)
+    assert reloaded.revisions(repo) == history.revisions(repo)
+
+
+def test_revisions_after_rewritten_history(repo, history):
+    first = commit(repo, "one")
+    commit(repo, "two")
+    history.revisions(repo)
+
+    git(repo, 'reset', '-q', '--hard', first)
+    rewritten = commit(repo, "rewritten")
+    revisions = history.revisions(repo)
+    assert [r[0] for r in revisions] == [rewritten, first]
+    assert history.log_ranges[-1] == rewritten  # logged from scratch
+
+
+def test_search_reads_many_blobs(repo, history):
+    # far more than a pipe holds, both in requests and in content
+    line = "x" * 99 + "\n"
+    for i in range(60):
+        commit(repo, line * 200 + "v{}\n".format(i))
+    newest = history.revisions(repo)[0][0]
+
+    hits = history.search(repo, Matcher(["v1"], True, True),
+                          first_only=False)
+    assert len(hits) == 11  # v1 and v10 to v19
+    # stops at v59, the newest of v5 and v50 to v59
+    assert [hit[0] for hit in history.search(
+        repo, Matcher(["v5"], True, True))] == [newest]
+    assert history.search(repo, Matcher(["missing"], True, True)) == []
+
+
+def run_lists(congist, *argv):
+    args = congist_cli.parser.parse_args(('lists',) + argv)
+    args.function(congist, args)
+
+
+def test_lists_history_needs_keywords(congist):
+    with pytest.raises(ParameterError):
+        run_lists(congist, '--history', '-v')
+
+
+def test_lists_history_prints_revision(tmp_path, congist, capsys):
+    attrs = {'api_url': '', 'description': "[notes] old secrets",
+             'public': True, 'starred': False,
+             'created': "2020-01-01T00:00:00",
+             'updated': "2020-01-02T00:00:00", 'id': GIST_ID, 'tags': [],
+             'files': {}}
+    gist = LocalGist(attrs, 'alice', congist.get_local_dir('github', 'alice'),
+                     'github')
+    local_dir = os.path.join(congist.get_local_dir('github', 'alice'),
+                             LocalGist.dir_name(gist))
+    git(tmp_path, 'init', '-q', local_dir)
+    needle = commit(local_dir, "needle\n")
+    commit(local_dir, "hay\n")
+    congist._write_index('github', {'alice': [attrs]})
+
+    run_lists(congist, '-l', '--history', '-v', '-k', 'needle')
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[-2].endswith('"[notes] old secrets" +')
+    assert lines[-1].startswith("revision " + needle)
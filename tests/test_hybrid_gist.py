@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from congist.Congist import Congist
+from congist.Gist import Gist
+from congist.github.GithubGist import GithubGist
+from congist.local.HybridGist import HybridGist
+from congist.utils import File
+
+RAW_URL = "https://gist.githubusercontent.com/alice/{id}/raw/{rev}/{name}"
+REVISION = "0123456789abcdef0123456789abcdef01234567"
+GIST_ID = "aaaaaa111"
+
+
+@pytest.fixture(autouse=True)
+def init(config):
+    Gist.init(config['gist'])
+    File.init(config['file'])
+
+
+class Session:
+    """Serves gist details, and fails any per-file content request."""
+
+    def __init__(self, contents):
+        self.username = 'alice'
+        self.contents = contents
+        self.detail_requests = 0
+
+    def get_gist_files(self, gist):
+        self.detail_requests += 1
+        return {name: {'filename': name, 'content': content}
+                for name, content in self.contents.items()}
+
+    def get_content(self, gist_file):
+        raise AssertionError("fetched " + gist_file.name + " by itself")
+
+
+class RemoteAgent:
+    def get_content(self, gist_file):
+        raise AssertionError("fetched " + gist_file.name + " by itself")
+
+
+def make_gist(session):
+    attrs = {'id': GIST_ID, 'description': "[title] multi-file",
+             'public': True, 'url': '', 'html_url': '', 'git_pull_url': '',
+             'git_push_url': '', 'created_at': "2020-01-01T00:00:00Z",
+             'updated_at': "2020-01-02T00:00:00Z"}
+    files = [{'name': name, 'size': len(content), 'type': 'text/plain',
+              'url': RAW_URL.format(id=GIST_ID, rev=REVISION, name=name)}
+             for name, content in session.contents.items()]
+    return GithubGist(session, attrs, files)
+
+
+def test_hydrate_stale_files_by_one_request(tmp_path):
+    session = Session({'a.txt': "alpha", 'b.txt': "beta", 'c.txt': "gamma"})
+    gist = HybridGist(make_gist(session), RemoteAgent(), str(tmp_path))
+    files = gist.file_entries
+    assert not any(gist.is_fresh(f) for f in files)  # no local clone
+
+    Congist._hydrate(files)
+    assert session.detail_requests == 1
+    assert [f.content for f in files] == ["alpha", "beta", "gamma"]
+
+
+def test_hydrate_skips_fresh_files(tmp_path):
+    session = Session({'a.txt': "alpha", 'b.txt': "beta"})
+    wrapped = make_gist(session)
+    clone = tmp_path / HybridGist.dir_name(wrapped)
+    (clone / '.git').mkdir(parents=True)
+    (clone / '.git' / 'HEAD').write_text(REVISION + "\n")
+    (clone / 'a.txt').write_text("alpha")
+    gist = HybridGist(wrapped, RemoteAgent(), str(tmp_path))
+    fresh, stale = gist.file_entries
+
+    assert gist.is_fresh(fresh) and not gist.is_fresh(stale)
+    Congist._hydrate(gist.file_entries)  # a single stale file
+    assert session.detail_requests == 0
+    assert fresh.content == "alpha"
+
+
+def test_default_hybrid_agent(config):
+    del config['agents']['hybrid']
+    congist = Congist(config)  # agents of a config older than hybrid ones
+    agent = congist.get_agents('github', hybrid=True)['alice']
+    assert type(agent).__name__ == 'HybridAgent'
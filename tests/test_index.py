@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+
+import json
+
+from congist import completion, congist_cli
+from congist.local.LocalGist import LocalGist
+
+
+def test_index_command(congist, monkeypatch):
+    attrs = {'api_url': '', 'description': "[a] listed #py",
+             'public': True, 'starred': False,
+             'created': "2020-01-01T00:00:00",
+             'updated': "2020-01-02T00:00:00", 'id': "aaaaaa111",
+             'tags': ['py'], 'files': {'a.py': {
+                 'name': 'a.py', 'type': 'text/x-python', 'size': 1,
+                 'url': ''}}}
+    agent = congist.get_agents('github')['alice']
+    monkeypatch.setattr(type(agent), 'get_gists', lambda self, order=None: [
+        LocalGist(attrs, 'alice', '', 'github')])
+
+    args = congist_cli.parser.parse_args(['index'])
+    args.function(congist, args)
+    with open(congist._index_file.format(host='github')) as f:
+        assert json.load(f) == {'alice': [attrs]}
+    cache = completion.load(congist._completion_cache)
+    assert cache['github']['ids'] == ["aaaaaa111\t[a] listed #py"]
+    assert cache['github']['files'] == ['a.py']
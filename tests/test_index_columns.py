@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+import pytest
+
+from congist import congist_cli
+from congist.Congist import Congist
+from congist.local.IndexColumns import IndexColumns
+from congist.local.LocalAgent import LocalAgent
+
+
+@pytest.fixture
+def lists(config, git_identity, capsys):
+    """Return a function running lists in a new Congist like a new run."""
+    def lists(*argv):
+        args = congist_cli.parser.parse_args(('lists', '-l', '-F', 'd') +
+                                             argv)
+        args.function(Congist(config), args)
+        return [line.strip().strip('"') for line in
+                capsys.readouterr().out.splitlines()]
+
+    return lists
+
+
+def test_columns_persisted_across_runs(congist, local_gists, lists,
+                                       monkeypatch):
+    local_gists("[b] #py", {'b.txt': "b" * 30})
+    local_gists("[a] #py #web", {'a.txt': "a" * 10})
+    local_gists("[c] #web", {'c.txt': "c" * 20})
+    assert lists('-t', 'web') == ['[c] #web', '[a] #py #web']
+    index_file = congist._index_file.format(host='github')
+    assert os.path.exists(index_file + LocalAgent.COLUMNS_SUFFIX.format(
+        username='alice'))
+
+    init = IndexColumns.__init__
+    monkeypatch.setattr(IndexColumns, '__init__', None)  # not rebuilt
+    assert lists('-t', 'py', '--sort', 'description') == [
+        '[a] #py #web', '[b] #py']
+    assert lists('--sort', 'size') == ['[b] #py', '[c] #web', '[a] #py #web']
+    assert lists('-d', '[c]', '-s', '0') == ['[c] #web']
+
+    monkeypatch.setattr(IndexColumns, '__init__', init)
+    local_gists("[d] #web", {'d.txt': "d"})  # rewrites the index
+    monkeypatch.setattr(IndexColumns, '__init__', None)
+    with pytest.raises(TypeError):  # stale columns are not loaded
+        lists('-t', 'web')
+    monkeypatch.setattr(IndexColumns, '__init__', init)
+    assert lists('-t', 'web') == ['[d] #web', '[c] #web', '[a] #py #web']
+
+
+def test_damaged_columns_rebuilt(congist, local_gists, lists):
+    local_gists("[a] #py", {'a.txt': "a"})
+    assert lists() == ['[a] #py']
+    columns_file = congist._index_file.format(host='github') + \
+        LocalAgent.COLUMNS_SUFFIX.format(username='alice')
+    with open(columns_file, 'r+b') as f:
+        f.truncate(os.path.getsize(columns_file) // 2)
+    assert lists('-t', 'py') == ['[a] #py']
+    assert IndexColumns.load(columns_file, (0, 0)) is None  # stale
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from congist.Congist import Congist
+from congist.local.LocalGist import LocalGist
+
+
+def attrs(i):
+    return {'api_url': '', 'description': "[{}] gist".format(i),
+            'public': True, 'starred': False,
+            'created': "2020-01-01T00:00:00",
+            'updated': "2020-01-02T00:00:00", 'id': "{:020x}".format(i),
+            'tags': [], 'files': {}}
+
+
+def read_index(congist):
+    with open(congist._index_file.format(host='github')) as f:
+        return json.load(f)
+
+
+def test_failed_index_leaves_old_one(run, congist, monkeypatch):
+    index_file = congist._index_file.format(host='github')
+    congist._write_index('github', {'alice': [attrs(1)]})
+    os.chmod(index_file, 0o600)
+    agent = congist.get_agents('github')['alice']
+    monkeypatch.setattr(type(agent), 'get_gists', lambda self, order=None: [
+        LocalGist(attrs(2), 'alice', '', 'github')])
+
+    def dump_index(file, index):
+        file.write('{"alice": [')
+        raise OSError("disk full")
+
+    monkeypatch.setattr(Congist, '_dump_index', staticmethod(dump_index))
+    with pytest.raises(OSError):
+        run('index')
+    assert read_index(congist) == {'alice': [attrs(1)]}
+    assert not [name for name in os.listdir(os.path.dirname(index_file))
+                if name.startswith('.')]  # no temporary file left
+
+    monkeypatch.undo()
+    monkeypatch.setattr(type(agent), 'get_gists', lambda self, order=None: [
+        LocalGist(attrs(2), 'alice', '', 'github')])
+    run('index')
+    assert read_index(congist) == {'alice': [attrs(2)]}
+    assert os.stat(index_file).st_mode & 0o777 == 0o600  # mode kept
+
+
+def test_concurrent_updates_are_kept(congist, monkeypatch):
+    congist._write_index('github', {'alice': []})
+    save_index = Congist._save_index
+
+    def slow_save_index(self, host, index):
+        time.sleep(0.01)  # widen the window between reading and writing
+        save_index(self, host, index)
+
+    monkeypatch.setattr(Congist, '_save_index', slow_save_index)
+    threads = [threading.Thread(target=congist._update_index,
+                                args=('github', 'alice', [attrs(i)]))
+               for i in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(a['id'] for a in read_index(congist)['alice']) == [
+        "{:020x}".format(i) for i in range(8)]
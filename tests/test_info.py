@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+import io
+import json
+
+import pytest
+
+from congist import congist_cli
+
+
+@pytest.fixture
+def config(config):
+    config['repos']['github']['users'].append({'username': 'bob',
+                                              'access_token': 'x'})
+    return config
+
+
+@pytest.fixture
+def congist(congist):
+    congist._write_index('github', {user: [
+        {'api_url': '', 'description': "[{}] by {}".format(day, user),
+         'public': True, 'starred': False, 'created': "2020-01-01T00:00:00",
+         'updated': "2020-01-0{}T00:00:00".format(day),
+         'id': "{}{:019x}".format(user[0], day), 'tags': [], 'files': {}}
+        for day in days] for user, days in (('alice', (4, 2)),
+                                            ('bob', (3, 1)))})
+    return congist
+
+
+def info(congist, *argv):
+    args = congist_cli.parser.parse_args(['info', '-l'] + list(argv))
+    output = io.StringIO()
+    congist.generate_index(output, **vars(args))
+    return json.loads(output.getvalue())
+
+
+def test_sorted_info_across_users(congist):
+    index = info(congist, '--sort', 'updated', '--limit', '3')
+    assert [(attrs['username'], attrs['description']) for attrs in index] \
+        == [('alice', "[4] by alice"), ('bob', "[3] by bob"),
+            ('alice', "[2] by alice")]
+
+    by_user = info(congist)
+    assert sorted(by_user) == ['alice', 'bob']
+    assert [attrs['description'] for attrs in by_user['bob']] == [
+        "[3] by bob", "[1] by bob"]
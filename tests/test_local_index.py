@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import subprocess
+
+from congist.local.LocalGist import LocalGist
+
+GIST_ID = "aaaaaa111"
+RAW_URL = "https://gist.githubusercontent.com/alice/{}/raw/{}/a.txt"
+
+
+def git(cwd, *args):
+    return subprocess.run(('git',) + args, cwd=cwd, check=True,
+                          capture_output=True, text=True).stdout.strip()
+
+
+def clone(congist, description, content):
+    attrs = {'description': description, 'id': GIST_ID}
+    gist = LocalGist(dict(dict.fromkeys(LocalGist.ATTRS), **attrs),
+                     'alice', '', 'github')
+    local_dir = os.path.join(congist.get_local_dir('github', 'alice'),
+                             LocalGist.dir_name(gist))
+    os.makedirs(local_dir)
+    git(local_dir, 'init', '-q')
+    git(local_dir, 'remote', 'add', 'origin',
+        "https://gist.github.com/{}.git".format(GIST_ID))
+    with open(os.path.join(local_dir, 'a.txt'), 'w') as f:
+        f.write(content)
+    git(local_dir, 'add', '-A')
+    git(local_dir, 'commit', '-qm', content)
+    return local_dir
+
+
+def index(congist, attrs_list=None):
+    index_file = congist._index_file.format(host='github')
+    if attrs_list is not None:
+        congist._write_index('github', {'alice': attrs_list})
+    with open(index_file) as f:
+        return json.load(f)['alice']
+
+
+def indexed_attrs(local_dir, description):
+    return {'api_url': '', 'description': description, 'public': True,
+            'starred': True, 'created': "2019-01-01T00:00:00",
+            'updated': "2019-06-01T00:00:00", 'id': GIST_ID, 'tags': [],
+            'files': {'a.txt': {'name': 'a.txt', 'type': 'text/plain',
+                                'size': 5, 'url': RAW_URL.format(
+                                    GIST_ID, git(local_dir, 'rev-parse',
+                                                 'HEAD'))}}}
+
+
+def test_keep_indexed_times_of_unchanged_clones(congist):
+    local_dir = clone(congist, "[kept] notes", "alpha")
+    old = indexed_attrs(local_dir, "[kept] notes")
+    index(congist, [old])
+
+    congist.generate_local_index(verbose=False)
+    attrs, = index(congist)
+    assert (attrs['created'], attrs['updated']) == (old['created'],
+                                                    old['updated'])
+    assert attrs['starred'] and attrs['public']
+
+    with open(os.path.join(local_dir, 'a.txt'), 'w') as f:
+        f.write("beta")
+    git(local_dir, 'commit', '-qam', 'beta')
+    congist.generate_local_index(verbose=False)
+    attrs, = index(congist)
+    assert attrs['updated'] > old['updated']  # from the new commit
+
+
+def test_index_current_clone_of_renamed_gist(congist):
+    stale_dir = clone(congist, "[old] notes", "old")
+    current_dir = clone(congist, "[new] notes", "new")
+    index(congist, [indexed_attrs(current_dir, "[new] notes")])
+
+    congist.generate_local_index(verbose=False)
+    attrs, = index(congist)
+    assert attrs['description'] == "[new] notes"
+    assert attrs['files']['a.txt']['url'] == RAW_URL.format(
+        GIST_ID, git(current_dir, 'rev-parse', 'HEAD'))
+    assert os.path.isdir(stale_dir)  # left alone
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+import mmap
+
+import pytest
+
+from congist.Matcher import Matcher
+
+
+@pytest.mark.parametrize('text, match_all, matched', [
+    ("xy aa", True, True),
+    ("xy ab", True, False),
+    ("ab aa", True, False),
+    (b"xy aa", True, True),
+    ("aa", False, True),
+    ("xy", False, True),
+    ("ab", False, False),
+])
+def test_backreferences_keep_their_groups(text, match_all, matched):
+    # \1 would refer to (x) in an alternation of both
+    assert Matcher([r'(x)y', r'(a)\1'], True, match_all).match(
+        text) == matched
+
+
+def test_escaped_backslash_is_no_backreference():
+    matcher = Matcher([r'c\\1', r'x(b)?(?(1)a|c)'], True)
+    assert matcher._isolated == [1]
+    assert matcher.match("c\\1 xba")
+    assert not matcher.match("c\\1 xbc")
+
+
+def test_finditer_with_backreferences():
+    matcher = Matcher([r'(b)', r'(a)\1'], True, False)
+    assert list(matcher.finditer("aa b")) == [(0, 2, 1), (3, 4, 0)]
+
+
+@pytest.mark.parametrize('case_sensitive', [False, True])
+def test_literals_across_mmap_chunks(tmp_path, monkeypatch, case_sensitive):
+    monkeypatch.setattr(Matcher, 'CHUNK_SIZE', 8)
+    path = tmp_path / 'big.txt'
+    path.write_bytes(b"x" * 6 + b"Needle" + b"y" * 7 + "café".encode())
+    matcher = Matcher(['Needle', 'café'], case_sensitive)
+    if not matcher._literals:
+        pytest.skip("pyahocorasick is not installed")
+
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0,
+                                          access=mmap.ACCESS_READ) as data:
+        assert matcher.search(data) == {0, 1}
+        assert Matcher(['needlex'], case_sensitive).match(data) is False
+
+
+def test_fold_copies_chunks_only(monkeypatch):
+    monkeypatch.setattr(Matcher, 'CHUNK_SIZE', 8)
+    copied = []
+
+    class Buffer(bytes):
+        def __getitem__(self, key):
+            data = super().__getitem__(key)
+            copied.append(len(data))
+            return data
+
+    matcher = Matcher(['tail'])
+    if not matcher._literals:
+        pytest.skip("pyahocorasick is not installed")
+    assert matcher.match(Buffer(b"." * 100 + b"TAIL"))
+    assert max(copied) <= 8 + len('tail') - 1
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+
+import socket
+from urllib.request import urlopen
+
+import pytest
+
+from congist.Congist import Congist
+from congist.Metrics import Metrics
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def server():
+    yield
+    if Metrics._server is not None:
+        Metrics._server.shutdown()
+        Metrics._server.server_close()
+        Metrics._server = None
+
+
+def test_commands_share_configured_port(config, server):
+    config['metrics']['port'] = free_port()
+    Congist(config)
+    Congist(config)  # e.g. lists while another one runs
+    assert Metrics._server is None
+
+
+def test_serve_locally_by_default(server):
+    port = free_port()
+    Metrics.inc('gists_total', phase='pulled')
+    Metrics.serve(port)
+    assert Metrics._server.server_address == ('127.0.0.1', port)
+    url = "http://127.0.0.1:{}/metrics".format(port)
+    with urlopen(url) as resp:
+        assert b'congist_gists_total{phase="pulled"}' in resp.read()
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+from congist.local.LocalGist import LocalGist
+from congist.Mirror import Poller
+
+
+def make_gist(gist_id, day):
+    attrs = {'api_url': '', 'description': "[{}] gist".format(gist_id),
+             'public': True, 'starred': False,
+             'created': "2020-01-01T00:00:00",
+             'updated': "2020-01-{:02}T00:00:00".format(day), 'id': gist_id,
+             'tags': [], 'files': {}}
+    return LocalGist(attrs, 'alice', '', 'github')
+
+
+class Agent:
+    """Lists gists updated at or after since, like the host does."""
+    host = 'github'
+    username = 'alice'
+
+    def __init__(self, gists):
+        self.gists = gists
+        self.polls = []
+
+    def poll_gists(self, since=None, etag=None):
+        self.polls.append((since, etag))
+        return [gist for gist in self.gists
+                if since is None or gist.updated + 'Z' >= since], 'etag'
+
+
+def test_retry_failed_pull_after_later_changes(congist, monkeypatch):
+    agent = Agent([make_gist('a', 1)])
+    poller = Poller(agent, {'a': agent.gists[0].updated}, 0, 0, 86400, 0)
+    failing = {'b'}
+    pulled = []
+
+    def pull_or_clone(gist, local_dir, **args):
+        pulled.append(gist.id)
+        return gist.id not in failing
+
+    monkeypatch.setattr(congist, '_pull_or_clone', pull_or_clone)
+    agent.gists += [make_gist('b', 2), make_gist('c', 3)]
+    congist._mirror_account(poller, verbose=False)
+    assert pulled == ['b', 'c']
+    assert agent.polls == [("2020-01-01T00:00:00Z", None)]
+
+    failing.clear()
+    congist._mirror_account(poller, verbose=False)
+    assert pulled == ['b', 'c', 'b']  # not hidden by the ETag or by c
+    assert agent.polls[-1] == ("2020-01-02T00:00:00Z", None)
+    assert sorted(poller.known) == ['a', 'b', 'c']
+
+    congist._mirror_account(poller, verbose=False)
+    assert pulled == ['b', 'c', 'b']
+    assert agent.polls[-1] == ("2020-01-03T00:00:00Z", 'etag')
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+from congist.GistFile import GistFile
+from congist.github.GithubSession import GithubSession
+from congist.utils import File
+
+BINARY = bytes(range(256)) * 4
+
+
+def fail(*args):
+    raise AssertionError("content loaded as a whole")
+
+
+def test_read_local_files_as_they_are(tmp_path, run, local_gists,
+                                      monkeypatch):
+    local_gists("[text] notes", {'a.txt': "alpha\n", 'b.txt': "beta\n"})
+    local_gists("[data] blobs", {'c.bin': BINARY})
+    monkeypatch.setattr(File, 'read', fail)
+
+    output = tmp_path / 'out'
+    run('read', '-l', '-o', str(output))
+    assert output.read_bytes() == b"alpha\nbeta\n"  # text only
+    run('read', '-l', '-b', '-o', str(output))
+    assert output.read_bytes() == BINARY + b"alpha\nbeta\n"
+
+    run('read', '-l', '-d', 'notes', '-f', 'b.txt', '-o', str(output))
+    assert output.read_bytes() == b"beta\n"
+
+
+def test_read_remote_files_streamed(tmp_path, run, remote_gists,
+                                    raw_server, monkeypatch):
+    remote_gists("[data] blobs", {'c.bin': BINARY, 'd.txt': "delta\n"})
+    monkeypatch.setattr(GithubSession, 'get_content', fail)
+
+    output = tmp_path / 'out'
+    run('read', '-b', '-o', str(output))
+    assert output.read_bytes() == BINARY + b"delta\n"
+    assert [path for path, _ in raw_server.requests] == [
+        "/alice/00000000000000000001/raw/c.bin",
+        "/alice/00000000000000000001/raw/d.txt"]
+
+
+LINES = "".join("{}\n".format(i) for i in range(1, 11))
+
+
+def test_read_parts_of_local_files(tmp_path, run, local_gists, monkeypatch):
+    local_gists("[count] numbers", {'a.txt': LINES, 'b.txt': "x\ny"})
+    monkeypatch.setattr(GistFile, 'PEEK_SIZE', 4)  # read more than once
+    monkeypatch.setattr(File, 'read', fail)
+
+    output = tmp_path / 'out'
+    run('read', '-l', '--head', '3', '-o', str(output))
+    assert output.read_text() == "1\n2\n3\nx\ny"
+    run('read', '-l', '--tail', '2', '-o', str(output))
+    assert output.read_text() == "9\n10\nx\ny"
+    run('read', '-l', '--bytes', '2-5', '-f', 'a.txt', '-o', str(output))
+    assert output.read_text() == "2\n3\n"
+    run('read', '-l', '--bytes', '-3', '-o', str(output))
+    assert output.read_text() == "10\nx\ny"
+    run('read', '-l', '--bytes', '19-', '-o', str(output))
+    assert output.read_text() == "0\n"  # nothing from b.txt
+
+
+def test_read_parts_of_remote_files(tmp_path, run, remote_gists,
+                                    raw_server, monkeypatch):
+    remote_gists("[count] numbers", {'a.txt': LINES * 100})
+    monkeypatch.setattr(GithubSession, 'get_content', fail)
+
+    output = tmp_path / 'out'
+    run('read', '--head', '2', '-o', str(output))
+    assert output.read_text() == "1\n2\n"
+    run('read', '--tail', '1', '-o', str(output))
+    assert output.read_text() == "10\n"
+    run('read', '--bytes', '4-7', '-o', str(output))
+    assert output.read_text() == "3\n4\n"
+    run('read', '--bytes', '9999-', '-o', str(output))
+    assert output.read_text() == ""
+    assert [byte_range for _, byte_range in raw_server.requests] == [
+        "bytes=0-{}".format(GistFile.PEEK_SIZE - 1),
+        "bytes=-{}".format(GistFile.PEEK_SIZE), "bytes=4-7", "bytes=9999-"]
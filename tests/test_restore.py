@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+
+from congist import completion
+
+
+def test_restore_index_with_tag_index(tmp_path, congist):
+    congist._write_index('github', {'alice': []})
+    assert congist._tag_indexes['github'].count('alice', []) == {}
+
+    attrs = {'api_url': '', 'description': "[a] restored #x", 'public': True,
+             'starred': False, 'created': "2020-01-01T00:00:00",
+             'updated': "2020-01-02T00:00:00", 'id': "aaaaaa111",
+             'tags': ['x'], 'files': {}}
+    snapshot = tmp_path / 'index.json'
+    snapshot.write_text(json.dumps({'alice': [attrs]}))
+    index_file = congist._index_file.format(host='github')
+    congist._restore_metadata(os.path.basename(index_file), str(snapshot),
+                              congist.local_base, verbose=False, force=True)
+
+    assert not snapshot.exists()
+    with open(index_file) as f:
+        assert json.load(f) == {'alice': [attrs]}
+    assert congist._tag_indexes['github'].count('alice', []) == {'x': 1}
+    cache = completion.load(congist._completion_cache)
+    assert cache['github']['tags'] == ['x']
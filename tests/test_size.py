@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from congist import congist_cli
+
+
+def names(out):
+    return sorted(line.strip('=') for line in out.splitlines()
+                  if line.startswith('='))
+
+
+def test_str2size():
+    assert [congist_cli.str2size(val) for val in ('4096', '64K', '1.5m')] \
+        == [4096, 64 << 10, 3 << 19]
+    with pytest.raises(congist_cli.ArgumentTypeError):
+        congist_cli.str2size('big')
+
+
+def test_filter_local_files_by_size(tmp_path, run, local_gists):
+    local_gists("[sizes] notes", {'a.txt': "a" * 10, 'b.txt': "b" * 100,
+                                  'c.txt': "c" * 1000})
+    output = tmp_path / 'out'
+    run('read', '-l', '--max-size', '100', '-o', str(output))
+    assert output.read_text() == "a" * 10 + "b" * 100
+    run('read', '-l', '--min-size', '50', '--max-size', '1K',
+        '-o', str(output))
+    assert output.read_text() == "b" * 100 + "c" * 1000
+
+    run('lists', '-l', '--min-size', '2K', '-o', str(output))
+    assert output.read_text() == ""  # no gist has such a file
+
+
+def test_fetch_smallest_within_budget(run, remote_gists, raw_server,
+                                      capsys):
+    remote_gists("[big] notes", {'big.txt': "needle\n" + "x" * 100 + "\n",
+                                 'more.txt': "needle\n"})
+    remote_gists("[small] notes", {'small.txt': "needle\n",
+                                   'other.txt': "haystack" * 3})
+    remote_gists("[medium] notes", {'medium.txt': "x" * 20 + "\nneedle\n"})
+
+    run('read', '-v', '-k', 'needle', '--budget', '60')
+    out = capsys.readouterr().out
+    assert "skip 1 gist(s) over the budget" in out
+    assert names(out) == ['medium.txt', 'small.txt']
+    assert not [path for path, _ in raw_server.requests
+                if '00000000000000000001' in path]  # nor hydrated
+
+    run('read', '-v', '-k', 'needle', '--min-size', '10')
+    assert names(capsys.readouterr().out) == ['big.txt', 'medium.txt']
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import subprocess
+
+import pytest
+
+from congist import congist_cli
+from congist.Congist import Congist
+from congist.utils import Git
+
+
+def git(cwd, *args):
+    return subprocess.run(('git',) + args, cwd=cwd, check=True,
+                          capture_output=True, text=True).stdout.strip()
+
+
+def commit(repo, content):
+    (repo / 'a.txt').write_text(content)
+    git(repo, 'add', '-A')
+    git(repo, 'commit', '-qm', content)
+    git(repo, 'push', '-q', 'origin', 'HEAD')
+
+
+@pytest.mark.parametrize('deepen', [False, True])
+def test_pull_shallow_clone(tmp_path, congist, deepen):
+    remote = tmp_path / 'remote.git'
+    git(tmp_path, 'init', '-q', '--bare', str(remote))
+    origin = tmp_path / 'origin'
+    git(tmp_path, 'clone', '-q', str(remote), str(origin))
+    for i in range(3):
+        commit(origin, str(i))
+    shallow = tmp_path / 'shallow'
+    git(tmp_path, 'clone', '-q', '--depth', '1', remote.as_uri(),
+        str(shallow))
+    commit(origin, "new")
+
+    assert congist._pull_gists(str(shallow), verbose=False, depth=1,
+                               deepen=deepen)
+    assert Git.head(str(shallow)) == git(origin, 'rev-parse', 'HEAD')
+    assert (shallow / 'a.txt').read_text() == "new"
+    assert Git.is_shallow(str(shallow)) != deepen
+
+
+def test_sync_local_skips_missing_clones(congist, monkeypatch):
+    attrs = {'api_url': '', 'description': "[notes] not cloned",
+             'public': True, 'starred': False,
+             'created': "2020-01-01T00:00:00",
+             'updated': "2020-01-02T00:00:00", 'id': "aaaaaa111",
+             'tags': [], 'files': {}}
+    congist._write_index('github', {'alice': [attrs]})
+    monkeypatch.setattr(congist, 'generate_full_index', None)  # no remote
+
+    args = congist_cli.parser.parse_args(['sync', '-l', '-v'])
+    args.function(congist, args)
+    assert os.listdir(congist.get_local_dir('github', 'alice')) == []
+
+
+@pytest.fixture
+def commands(monkeypatch):
+    """Record commands run by congist, interrupting those containing any
+    string of the returned dict's 'interrupt'."""
+    ran = {'run': [], 'interrupt': ()}
+    run = Congist._run
+
+    def record(self, cmd, **args):
+        ran['run'].append(cmd)
+        if any(key in cmd for key in ran['interrupt']):
+            raise KeyboardInterrupt
+        return run(self, cmd, **args)
+
+    monkeypatch.setattr(Congist, '_run', record)
+    return ran
+
+
+@pytest.fixture
+def hosted(tmp_path, remote_gists):
+    """Add gists [a], [b] and [c] hosted by bare repositories."""
+    urls = []
+    for name in 'abc':
+        work = tmp_path / 'work' / name
+        work.mkdir(parents=True)
+        git(work, 'init', '-q')
+        (work / 'a.txt').write_text(name)
+        git(work, 'add', '-A')
+        git(work, 'commit', '-qm', name)
+        url = str(tmp_path / 'hosted' / (name + '.git'))
+        git(tmp_path, 'clone', '-q', '--bare', str(work), url)
+        remote_gists("[{}] notes".format(name), {'a.txt': name},
+                     git_pull_url=url)
+        urls.append(url)
+    return urls
+
+
+def journal(congist):
+    with open(congist._sync_journal.path) as f:
+        return [(r['id'][-1], r['phase']) for r in map(json.loads, f)]
+
+
+def test_resume_interrupted_download(run, congist, hosted, commands):
+    commands['interrupt'] = (hosted[1],)
+    with pytest.raises(KeyboardInterrupt):
+        run('sync', '-D')
+    assert journal(congist) == [('1', 'cloned')]
+
+    commands['interrupt'], commands['run'] = (), []
+    run('sync', '-D', '--resume')
+    assert [cmd.split()[-2] for cmd in commands['run']] == hosted[1:]
+    assert journal(congist) == [('1', 'cloned'), ('2', 'cloned'),
+                                ('3', 'cloned')]
+
+    commands['run'] = []
+    run('sync', '-D')  # start over
+    assert len(commands['run']) == 3
+    assert journal(congist) == [('1', 'pulled'), ('2', 'pulled'),
+                                ('3', 'pulled')]
+
+
+def test_resume_push_of_committed_gist(run, congist, hosted, commands):
+    run('sync', '-D')
+    local_dir = congist.get_local_dir('github', 'alice')
+    clone = os.path.join(local_dir, sorted(os.listdir(local_dir))[0])
+    with open(os.path.join(clone, 'a.txt'), 'w') as f:
+        f.write("changed")
+
+    git(clone, 'remote', 'set-url', '--push', 'origin', '/nonexistent')
+    run('sync', '-U')
+    assert journal(congist) == [('1', 'committed'), ('2', 'pushed'),
+                                ('3', 'pushed')]
+
+    git(clone, 'remote', 'set-url', '--push', 'origin', hosted[0])
+    commands['run'] = []
+    run('sync', '-U', '--resume')
+    assert [cmd.split('&&')[-1].split() for cmd in commands['run']] == [
+        ['git', 'push', '-q']]  # nothing committed again
+    assert git(hosted[0], 'show', 'HEAD:a.txt') == "changed"
+    assert journal(congist)[-1] == ('1', 'pushed')
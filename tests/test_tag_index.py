@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from congist import congist_cli
+
+
+@pytest.fixture
+def congist(congist):
+    congist._write_index('github', {'alice': [
+        {'api_url': '', 'description': "[{}] gist".format(i),
+         'public': True, 'starred': False, 'created': "2020-01-01T00:00:00",
+         'updated': "2020-01-0{}T00:00:00".format(i + 1),
+         'id': "{:020x}".format(i), 'tags': tags, 'files': {}}
+        for i, tags in enumerate([['py'], ['python', 'web'], ['web']])]})
+    return congist
+
+
+def ids(congist, *argv):
+    args = congist_cli.parser.parse_args(['lists', '-l'] + list(argv))
+    return [gist.id[-1] for gist in congist.get_gists(**vars(args))]
+
+
+def test_tag_postings_select_gists(congist, monkeypatch):
+    assert ids(congist, '-t', 'py*') == ['0', '1']
+    assert ids(congist, '-t', 'py*', 'web') == ['1']
+    assert ids(congist, '-t', 'web', '-d', '[2]') == ['2']
+
+    agent = congist.get_agents('github', local=True)['alice']
+    monkeypatch.setattr(type(agent), '_get_columns', None)  # not loaded
+    assert ids(congist, '-t', 'rust') == []
+    assert ids(congist, '-t', 'py', 'web') == []
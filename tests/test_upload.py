@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+import os
+import subprocess
+
+import pytest
+
+from congist.local.LocalGist import LocalGist
+from congist.utils import Git
+
+GIST_ID = "aaaaaa111"
+
+
+def git(cwd, *args):
+    return subprocess.run(('git',) + args, cwd=cwd, check=True,
+                          capture_output=True, text=True).stdout.strip()
+
+
+@pytest.fixture
+def gist(congist):
+    attrs = {'api_url': '', 'description': "[note] api upload",
+             'public': True, 'starred': False,
+             'created': "2020-01-01T00:00:00",
+             'updated': "2020-01-02T00:00:00", 'id': GIST_ID, 'tags': [],
+             'files': {}}
+    return LocalGist(attrs, 'alice', congist.get_local_dir('github', 'alice'),
+                     'github')
+
+
+@pytest.fixture
+def clones(tmp_path, congist, gist):
+    """Return (remote, local clone, another clone) of the gist."""
+    remote = tmp_path / 'remote.git'
+    git(tmp_path, 'init', '-q', '--bare', str(remote))
+    other = tmp_path / 'other'
+    git(tmp_path, 'clone', '-q', str(remote), str(other))
+    (other / 'a.txt').write_text("alpha\n")
+    (other / 'b.txt').write_text("beta\n")
+    git(other, 'add', '-A')
+    git(other, 'commit', '-qm', 'init')
+    git(other, 'push', '-q', 'origin', 'HEAD')
+    local = os.path.join(congist.get_local_dir('github', 'alice'),
+                         LocalGist.dir_name(gist))
+    git(tmp_path, 'clone', '-q', str(remote), local)
+    congist._manifest.record(local)
+    return remote, local, other
+
+
+def patch_by(other, calls):
+    """Return update_gist which applies files as the host would."""
+    def update_gist(agent, gist, files):
+        calls.append(files)
+        git(other, 'pull', '-q')
+        for name, attrs in files.items():
+            with open(os.path.join(other, name), 'w') as f:
+                f.write(attrs['content'])
+        git(other, 'commit', '-qam', 'api')
+        git(other, 'push', '-q')
+        return True
+    return update_gist
+
+
+def upload(congist, gist):
+    congist._upload_gist(gist, verbose=False, api=True)
+
+
+def test_api_upload_fast_forwards_clone(congist, gist, clones, monkeypatch):
+    remote, local, other = clones
+    calls = []
+    agent = congist.get_agents('github')['alice']
+    monkeypatch.setattr(type(agent), 'update_gist', patch_by(other, calls))
+    with open(os.path.join(local, 'a.txt'), 'w') as f:
+        f.write("ALPHA\n")
+
+    upload(congist, gist)
+    assert calls == [{'a.txt': {'content': "ALPHA\n"}}]
+    assert Git.head(local) == Git.upstream(local) == git(other, 'rev-parse',
+                                                         'HEAD')
+    assert git(local, 'status', '--porcelain') == ""
+    assert congist._manifest.is_clean(local)
+
+
+def test_api_upload_skips_moved_remote(congist, gist, clones, monkeypatch):
+    remote, local, other = clones
+    calls = []
+    agent = congist.get_agents('github')['alice']
+    monkeypatch.setattr(type(agent), 'update_gist', patch_by(other, calls))
+    (other / 'b.txt').write_text("remote edit\n")
+    git(other, 'commit', '-qam', 'remote edit')
+    git(other, 'push', '-q')
+    with open(os.path.join(local, 'a.txt'), 'w') as f:
+        f.write("ALPHA\n")
+
+    upload(congist, gist)
+    assert calls == []  # left to git, which refuses to push over it
+    assert git(remote, 'show', 'HEAD:b.txt') == "remote edit"
+    assert git(remote, 'show', 'HEAD:a.txt') == "alpha"
+    assert not congist._manifest.is_clean(local)